@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'userservice',
     'walletservice',
     'transactions',
+    'notificationservice',
     'rest_framework',
     'corsheaders',
     'rest_framework_simplejwt.token_blacklist',
@@ -219,6 +220,165 @@ REST_FRAMEWORK = {
 }
 
 
+# Outbound payment gateway HTTP transport (utils.http). Pools are per host;
+# "HOSTS" takes per-host overrides, e.g. {"api.paystack.co": {"POOL_MAXSIZE": 64}}.
+# The ASYNC_* limits cap in-flight connections for the aiohttp transport.
+GATEWAY_HTTP = {
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 32,
+    "POOL_BLOCK": False,
+    "CONNECT_TIMEOUT": 5,
+    "READ_TIMEOUT": 30,
+    "ASYNC_MAX_CONNECTIONS": 512,
+    "ASYNC_MAX_PER_HOST": 256,
+    "HOSTS": {},
+}
+
+# Circuit breakers and retry budgets for the same calls (utils.resilience).
+# A breaker opens per endpoint after FAILURE_THRESHOLD consecutive failures
+# and lets a probe through after RECOVERY_TIMEOUT seconds. Only the read-only
+# endpoints below are retried, within a budget of RETRY_BUDGET_RATIO retries
+# per call plus RETRY_BUDGET_MIN_PER_SECOND; "ENDPOINTS" takes per-endpoint
+# overrides, e.g. {"paystack.banks": {"FAILURE_THRESHOLD": 3}}.
+GATEWAY_RESILIENCE = {
+    "FAILURE_THRESHOLD": 5,
+    "RECOVERY_TIMEOUT": 30,
+    "HALF_OPEN_MAX_CALLS": 1,
+    "RETRY_ATTEMPTS": 2,
+    "RETRY_BACKOFF": 0.2,
+    "RETRY_BACKOFF_MAX": 2.0,
+    "RETRY_BUDGET_RATIO": 0.2,
+    "RETRY_BUDGET_MIN_PER_SECOND": 1,
+    "IDEMPOTENT_ENDPOINTS": (
+        "coralpay.authentication",
+        "coralpay.banks",
+        "coralpay.get_bank_list",
+        "coralpay.get_transaction_details",
+        "coralpay.get_transaction_status",
+        "coralpay.transaction_query",
+        "coralpay.transaction_status_query",
+        "coralpay.ussd_bank_list",
+        "exchangerate.latest",
+        "exchangerate.pair",
+        "paystack.banks",
+        "paystack.fetch_customer",
+        "paystack.resolve_account",
+        "paystack.verify_payment",
+        "paystack.verify_transfer",
+    ),
+    "ENDPOINTS": {},
+}
+
+# Request coalescing for the read-only lookups in utils.api (utils.singleflight).
+# Concurrent identical calls always share one upstream request; a successful
+# result is also reused for the seconds given here (0 or absent: in-flight only).
+GATEWAY_COALESCE_TTL = {
+    "coralpay.transaction_query": 1,
+    "paystack.banks": 30,
+    "paystack.resolve_account": 30,
+    "paystack.verify_payment": 1,
+    "paystack.verify_transfer": 1,
+}
+
+
+# Gateway base URLs used by utils.api (amaps.simulator points these at the
+# local gateway simulator)
+PAYSTACK_BASE_URL = "https://api.paystack.co"
+CORALPAY_GWAPI_URL = "https://testdev.coralpay.com:5000/GwApi/api/v1"
+CORALPAY_ACCOUNT_URL = "http://sandbox1.coralpay.com:8080/paywithtransfer/moneytransfer/apis"
+
+# Serve the CoralPay proxy endpoints in paymentgatewayservice from the async
+# views (non-blocking aiohttp client). Set to False to use the DRF views.
+PAYMENT_GATEWAY_ASYNC_VIEWS = True
+
+# CoralPay GwApi credentials are cached per process and refreshed this many
+# seconds before they expire; the TTL applies when the token carries no expiry.
+CORALPAY_TOKEN_TTL = 3600
+CORALPAY_TOKEN_REFRESH_MARGIN = 60
+
+# Exchange rates: update_exchange_rates fetches one /latest/<base> table per
+# run from exchangerate-api.com and derives every other pair from it
+EXCHANGE_RATE_API_URL = "https://v6.exchangerate-api.com/v6"
+EXCHANGE_RATE_API_KEY = env("EXCHANGE_RATE_API_KEY", default="")
+EXCHANGE_RATE_BASE_CURRENCY = "USD"
+# Seconds a process may serve its cached rate matrix (walletservice.rates)
+# before checking the version stamp kept in EXCHANGE_RATE_MATRIX_CACHE again
+EXCHANGE_RATE_MATRIX_CACHE = "default"
+EXCHANGE_RATE_MATRIX_CHECK_INTERVAL = 5
+# Seconds a cross-currency transfer quote (walletservice.quotes) stays valid in
+# FX_QUOTE_CACHE; matches the transfer OTP lifetime
+FX_QUOTE_CACHE = "default"
+FX_QUOTE_TTL = 300
+
+# GeoLite2 country database used to locate logins (utils.geo). It is
+# memory-mapped once per process; lookups are cached per IP in an LRU of
+# GEOIP_CACHE_SIZE entries.
+GEOIP_COUNTRY_DB = os.path.join(BASE_DIR, "staticfiles/geoip/GeoLite2-Country.mmdb")
+GEOIP_CACHE_SIZE = 4096
+
+
+# Cache shared by every web and Celery process: rate-matrix versions, FX
+# quotes, login rate limits and the lookup caches below. Defaults to its own
+# database on the Redis instance Celery uses; it must not be a per-process
+# backend (local memory) wherever more than one process serves the app.
+CACHES = {"default": env.cache("CACHE_URL", default="redis://localhost:6379/1")}
+# Cache alias holding the login sliding-window counters (userservice.ratelimit)
+LOGIN_RATE_LIMIT_CACHE = "default"
+
+# One-time passcodes (userservice.otp) are kept as keyed HMACs in the
+# OneTimePasscode table; OTP_HMAC_KEY defaults to SECRET_KEY.
+OTP_HMAC_KEY = env("OTP_HMAC_KEY", default="")
+OTP_TTL = 300
+OTP_MAX_ATTEMPTS = 5
+
+# Read-through user lookup cache (userservice.identity): the id and names of
+# users resolved by email, phone number, ojapay tag or id are kept here for
+# IDENTITY_CACHE_TTL seconds; Users.save/delete drop the entry.
+IDENTITY_CACHE = "default"
+IDENTITY_CACHE_TTL = 300
+
+# Ojapay tag autocomplete (userservice.tags): each process keeps an in-memory
+# prefix index, rebuilt in the background once it is older than
+# TAG_INDEX_MAX_AGE seconds to pick up changes saved by other processes.
+TAG_INDEX_MAX_AGE = 600
+
+# Bank directory (utils.banks): each provider's bank list is cached without
+# expiry; a copy older than BANK_DIRECTORY_TTL seconds is served while Celery
+# refetches it. Fuzzy bank-name matches need at least BANK_SEARCH_MIN_SCORE.
+BANK_DIRECTORY_CACHE = "default"
+BANK_DIRECTORY_TTL = 24 * 60 * 60
+BANK_SEARCH_MIN_SCORE = 75
+
+# Bank accounts resolved for payouts (userservice.recipients) keep their
+# account name and Paystack recipient code for RESOLVED_RECIPIENT_TTL seconds.
+RESOLVED_RECIPIENT_TTL = 30 * 24 * 60 * 60
+
+# Bulk payouts (transactions.payouts): at most PAYOUT_BATCH_MAX_ITEMS
+# transfers per batch, accounts resolved PAYOUT_RESOLVE_CONCURRENCY at a time
+# and submitted to Paystack's bulk transfer API PAYOUT_CHUNK_SIZE (max 100)
+# per call.
+PAYOUT_BATCH_MAX_ITEMS = 5000
+PAYOUT_RESOLVE_CONCURRENCY = 8
+PAYOUT_CHUNK_SIZE = 100
+# The sweep_payout_batches beat task re-queues batches still queued, and
+# resumes batches whose worker made no progress, after PAYOUT_STALE_AFTER
+# seconds. Unconfirmed transfers are looked up again PAYOUT_CONFIRM_AFTER
+# seconds after the batch was last worked on and refunded if Paystack still
+# does not know them.
+PAYOUT_STALE_AFTER = 15 * 60
+PAYOUT_CONFIRM_AFTER = 30 * 60
+
+# Email outbox (notificationservice.outbox): views queue messages and the
+# drain_outbox task, scheduled every 10 seconds by beat, sends them in batches
+# over one SMTP connection. Failed sends are retried after
+# EMAIL_OUTBOX_RETRY_BACKOFF seconds, doubling each time, up to
+# EMAIL_OUTBOX_MAX_ATTEMPTS; a worker's claim on a batch lapses after
+# EMAIL_OUTBOX_LEASE seconds.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BACKOFF = 60
+EMAIL_OUTBOX_LEASE = 300
+
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379'
@@ -18,6 +18,22 @@ app.conf.beat_schedule = {
         'schedule': crontab(hour=0, minute=0), 
         # 'schedule': crontab(minute='*/2'), 
     },
+    'refresh-bank-directory': {
+        'task': 'paymentgatewayservice.tasks.refresh_bank_directory',
+        'schedule': crontab(minute=0, hour='*/6'),
+    },
+    'drain-email-outbox': {
+        'task': 'notificationservice.tasks.drain_outbox',
+        'schedule': 10.0,
+    },
+    'purge-expired-otps': {
+        'task': 'userservice.tasks.purge_expired_otps',
+        'schedule': crontab(minute=15),
+    },
+    'sweep-payout-batches': {
+        'task': 'transactions.tasks.sweep_payout_batches',
+        'schedule': crontab(minute='*/5'),
+    },
 }
 
 
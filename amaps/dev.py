@@ -15,6 +15,10 @@ DATABASES = {
     }
 }
 
+# runserver and the test suite are a single process, so local memory is
+# enough unless CACHE_URL says otherwise
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 CURRENT_SITE = "http://127.0.0.1:8000"
 
 # BulkSMS otp settings
@@ -0,0 +1,14 @@
+"""
+Development settings wired to the local gateway simulator
+
+    python manage.py run_gateway_simulator --port 8765
+    DJANGO_SETTINGS_MODULE=amaps.simulator python manage.py runserver
+"""
+
+from paymentgatewayservice.simulator import gateway_url_overrides
+
+from .dev import *
+
+GATEWAY_SIMULATOR_URL = os.environ.get("GATEWAY_SIMULATOR_URL", "http://127.0.0.1:8765")
+
+globals().update(gateway_url_overrides(GATEWAY_SIMULATOR_URL, globals()))
@@ -3,6 +3,7 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 
+from userservice.identity import get_user
 from userservice.models import Users
 
 from .models import KYC
@@ -19,7 +20,7 @@ class RetrieveMerchantKyc(generics.ListAPIView):
 
     def get(self, request, *args, **kwargs) -> Response:
         try:
-            user = Users.objects.get(id=request.user.id)
+            user = get_user(id=request.user.id)
         except Users.DoesNotExist:
             return Response(
                 {"status": "error", "response": "Invalid user"},
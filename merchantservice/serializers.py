@@ -32,6 +32,15 @@ class RetrieveMerchantSerializer(serializers.ModelSerializer):
         exclude = ("password",)
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """The few user fields list endpoints show next to each row"""
+
+    class Meta:
+        model = Users
+        fields = ("id", "username", "first_name", "last_name", "business_name")
+        read_only_fields = fields
+
+
 # OTPVerification Serializer
 class OTPVerificationSerializer(serializers.ModelSerializer):
     class Meta:
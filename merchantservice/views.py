@@ -1,15 +1,12 @@
-import json
-import os
+import functools
 from urllib.parse import unquote
 
-import geoip2
 import pyotp
 import requests
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.tokens import default_token_generator
-from django.contrib.gis.geoip2 import GeoIP2
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -30,15 +27,19 @@ from phonenumbers.phonenumberutil import NumberParseException
 
 
 from amaps.sendmail import SendMail
+from utils.countries import countries
+from utils.geo import geolocator
+from userservice.identity import find_user, get_user
 from userservice.models import (
     Category,
-    LoginAttempt,
     OTPVerification,
     Users,
     Product,
     MerchantCountries,
     Recipient,
 )
+from userservice.ratelimit import audit, login_limiter
+from userservice.tasks import record_login_failure, reset_login_attempts
 from walletservice.models import Currency, Wallet
 from .serializers import CategorySerializer, ProductSerializer
 from . import constants
@@ -67,8 +68,8 @@ class CreateMerchantView(generics.CreateAPIView):
         password = request.data.get("password")
 
         # Check if the user already exists
-        try:
-            merchant = Users.objects.get(email=email)
+        merchant = find_user(email=email)
+        if merchant is not None:
             return Response(
                 {
                     "status": "error",
@@ -76,8 +77,6 @@ class CreateMerchantView(generics.CreateAPIView):
                 },
                 status=status.HTTP_200_OK,
             )
-        except Users.DoesNotExist:
-            merchant = None
 
         # If the merchant does not exist, create the merchant
         if merchant is None:
@@ -115,10 +114,7 @@ class SendEmailOTPView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs) -> Response:
         print("REQUEST DATA: ", request.data)
         email = request.data.get("email")
-        try:
-            merchant = Users.objects.get(email=email)
-        except Users.DoesNotExist:
-            merchant = None
+        merchant = find_user(email=email)
         # Generate email OTPs
         email_otp = pyotp.TOTP(pyotp.random_base32()).now()
 
@@ -191,10 +187,7 @@ class SendPhoneOTPView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            merchant = Users.objects.get(phone_number=mobile)
-        except Users.DoesNotExist:
-            merchant = None
+        merchant = find_user(phone_number=mobile)
         # generate phone OTP
         phone_otp = pyotp.TOTP(pyotp.random_base32()).now()
 
@@ -374,33 +367,28 @@ class MerchantLoginView(generics.CreateAPIView):
         email = request.data.get("email", "")
         password = request.data.get("password", "")
 
-        try:
-            merchant = authenticate(email=email, password=password)
-        except Users.DoesNotExist:
-            merchant = None
         # Check if the IP is locked
         remote_address = request.META.get("HTTP_X_FORWARDED_FOR")
         if remote_address:
             ip_address = remote_address.split(",")[-1].strip()
         else:
             ip_address = request.META.get("REMOTE_ADDR")
-        geopath = os.path.join(
-            settings.BASE_DIR, "staticfiles/geoip/GeoLite2-Country.mmdb"
-        )
+        # Refuse locked-out clients before paying for a password hash
+        limiter = login_limiter(self)
+        if limiter.is_locked(ip_address, email):
+            return Response(
+                {
+                    "status": "error",
+                    "response": "Your IP address is locked. Please contact support.",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         try:
-            g = GeoIP2(path=geopath)
-            countrycode = g.country_code(ip_address)
-        except geoip2.errors.AddressNotFoundError:
-            countrycode = "NG"
-        # Get the country name and code
-        with open(
-            os.path.join(settings.BASE_DIR, "staticfiles/json/countries.json"),
-            encoding="utf8",
-        ) as f:
-            data = json.load(f)
-            for keyval in data:
-                if countrycode == keyval["isoAlpha2"]:
-                    location = keyval["name"]
+            merchant = authenticate(email=email, password=password)
+        except Users.DoesNotExist:
+            merchant = None
+        countrycode = geolocator.country_code(ip_address, default="NG")
+        location = countries.name(countrycode, default=countrycode)
 
         # Get the merchant agent values
         browser = f"{request.user_agent.browser.family} {request.user_agent.browser.version_string}"
@@ -423,7 +411,8 @@ class MerchantLoginView(generics.CreateAPIView):
                 serializer = self.get_serializer(merchant, data=request.data)
                 if serializer.is_valid():
                     serializer.save()
-                LoginAttempt.reset_attempts(ip_address)
+                if limiter.reset(ip_address, email):
+                    audit(reset_login_attempts, ip_address)
                 # Check if the user logged in from a new device
                 if (
                     merchant.last_login_ip != ip_address
@@ -466,22 +455,19 @@ class MerchantLoginView(generics.CreateAPIView):
 
         else:
             # Login failed, increase login attempts
-            LoginAttempt.add_attempt(ip_address)
-            remaining_attempts = self.max_login_attempts - LoginAttempt.get_attempts(
-                ip_address
-            )
+            verdict = limiter.register_failure(ip_address, email)
+            audit(record_login_failure, ip_address, email, verdict.attempts, verdict.locked)
 
-            if remaining_attempts > 0:
+            if not verdict.locked:
                 return Response(
                     {
                         "status": "error",
-                        "response": f"Invalid login credentials. You have {remaining_attempts} attempts remaining.",
+                        "response": f"Invalid login credentials. You have {verdict.remaining} attempts remaining.",
                     },
                     status=status.HTTP_401_UNAUTHORIZED,
                 )
             else:
-                # Lock the user's account for 15 minutes
-                LoginAttempt.lock_merchant(ip_address)
+                # The limiter holds the lock for 15 minutes; the audit task locks the accounts
                 return Response(
                     {
                         "status": "error",
@@ -868,11 +854,11 @@ class ProductListCreateView(generics.ListCreateAPIView):
     serializer_class = ProductSerializer
 
     def get_queryset(self):
-        merchant = Users.objects.get(id=self.request.user.id)
+        merchant = get_user(id=self.request.user.id)
         return Product.objects.filter(user=merchant)
 
     def perform_create(self, serializer):
-        merchant = Users.objects.get(id=self.request.user.id)
+        merchant = get_user(id=self.request.user.id)
         serializer.save(user=merchant)
 
     def get(self, request, *args, **kwargs):
@@ -1023,9 +1009,24 @@ class CategoryListCreateView(generics.ListCreateAPIView):
     serializer_class = CategorySerializer
 
 
+@functools.cache
+def merchant_countries():
+    """Supported merchant countries with their currency and dialing code, built once per process"""
+    data = MerchantCountriesSerializer(MerchantCountries()).data
+    details = {}
+    for code, name in MerchantCountries.AFRICA_CHOICES + MerchantCountries.WORLD_CHOICES:
+        country = countries.get(code) or countries.by_name(name)
+        if country and country.alpha3 not in details:
+            details[country.alpha3] = {
+                "code": country.alpha3,
+                "name": name.strip(),
+                "currency": country.currency,
+                "dialing_code": country.dialing_code,
+            }
+    data["countries"] = list(details.values())
+    return data
+
+
 class MerchantCountriesView(APIView):
     def get(self, request):
-        country_choices = MerchantCountries.objects.all()
-        serializer = MerchantCountriesSerializer(country_choices)
-        print("MERCHANT COUNTRIES: ", serializer.data)
-        return Response(serializer.data)
+        return Response(merchant_countries())
@@ -0,0 +1,168 @@
+"""
+Transactional email outbox
+
+``enqueue`` stores a rendered message as an ``OutboxEmail`` row, in the
+caller's transaction, so a request never waits on SMTP and a message is only
+sent if the work that produced it commits. ``drain`` is run by the
+``drain_outbox`` Celery task: it claims due rows in batches (``SKIP LOCKED``
+where the database supports it, so several workers can drain side by side),
+sends each batch over one open connection from Django's mail backend and
+records the outcome per row. Failed rows are retried with exponential backoff
+until ``EMAIL_OUTBOX_MAX_ATTEMPTS``.
+
+Batch timings and counts are recorded in ``utils.metrics`` under
+``email.outbox``.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from utils.metrics import metrics
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def option(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(subject, body, to, from_email=None):
+    """Queue an HTML email to one address or a list of addresses"""
+    recipients = [to] if isinstance(to, str) else list(to)
+    rows = OutboxEmail.objects.bulk_create(
+        OutboxEmail(
+            from_email=from_email or settings.EMAIL_HOST_USER,
+            to=recipient,
+            subject=subject,
+            body=body,
+        )
+        for recipient in recipients
+    )
+    metrics.incr("email.outbox.enqueued", len(rows))
+    return rows
+
+
+def claim(batch_size):
+    """Lease up to ``batch_size`` due rows to this worker"""
+    now = timezone.now()
+    lease = timedelta(seconds=option("EMAIL_OUTBOX_LEASE", 300))
+    with transaction.atomic():
+        rows = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            # A SENDING row whose lease ran out belongs to a worker that died mid-batch
+            .filter(
+                status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING], available_at__lte=now
+            ).order_by("available_at", "id")[:batch_size]
+        )
+        OutboxEmail.objects.filter(id__in=[row.id for row in rows]).update(
+            status=OutboxEmail.SENDING, available_at=now + lease
+        )
+    return rows
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=option("EMAIL_OUTBOX_RETRY_BACKOFF", 60) * 2 ** (attempts - 1))
+
+
+def deliver(rows, connection):
+    """Send ``rows`` over ``connection`` and update them in place; returns the failed rows"""
+    failed = []
+    for row in rows:
+        message = EmailMessage(
+            row.subject, row.body, row.from_email, [row.to], connection=connection
+        )
+        message.content_subtype = "html"
+        row.attempts += 1
+        try:
+            message.send()
+        except Exception as e:
+            logger.warning(
+                f"Outbox email {row.id} to {row.to} failed (attempt {row.attempts}): {e}"
+            )
+            row.last_error = str(e)[:1000]
+            failed.append(row)
+            # The connection may be unusable after an error; start the next message on a fresh one
+            try:
+                connection.close()
+                connection.open()
+            except Exception:
+                pass
+        else:
+            row.status = OutboxEmail.SENT
+            row.sent_at = timezone.now()
+            row.last_error = ""
+    record(rows, failed)
+    return failed
+
+
+def fail(rows, error):
+    """Count a failed attempt against every row of a batch that could not be sent at all"""
+    logger.warning(f"Outbox batch of {len(rows)} emails failed: {error}")
+    for row in rows:
+        row.attempts += 1
+        row.last_error = str(error)[:1000]
+    record(rows, rows)
+    return rows
+
+
+def record(rows, failed):
+    """Save the outcome of a delivery attempt, scheduling a retry or giving up on ``failed``"""
+    now = timezone.now()
+    max_attempts = option("EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+    for row in failed:
+        if row.attempts >= max_attempts:
+            row.status = OutboxEmail.FAILED
+        else:
+            row.status = OutboxEmail.PENDING
+            row.available_at = now + retry_delay(row.attempts)
+    OutboxEmail.objects.bulk_update(
+        rows, ["status", "attempts", "last_error", "available_at", "sent_at"]
+    )
+
+
+def drain(batch_size=None, max_batches=None):
+    """Send due outbox rows until none are left; returns counts of sent, retrying and failed rows"""
+    batch_size = batch_size or option("EMAIL_OUTBOX_BATCH_SIZE", 100)
+    summary = {"sent": 0, "retrying": 0, "failed": 0}
+    batches = 0
+    connection = None
+    try:
+        while max_batches is None or batches < max_batches:
+            rows = claim(batch_size)
+            if not rows:
+                break
+            started = time.perf_counter()
+            if connection is None:
+                try:
+                    connection = get_connection()
+                    # One login per drain; messages in every batch reuse it
+                    connection.open()
+                except Exception as e:
+                    # Without a mail server the claimed rows wait for their retry like failed sends,
+                    # and this drain stops after them; the next one tries the server again
+                    connection = None
+                    failed = fail(rows, e)
+                    max_batches = batches + 1
+            if connection is not None:
+                failed = deliver(rows, connection)
+            metrics.observe("email.outbox.batch", time.perf_counter() - started, error=bool(failed))
+            given_up = sum(1 for row in failed if row.status == OutboxEmail.FAILED)
+            summary["sent"] += len(rows) - len(failed)
+            summary["retrying"] += len(failed) - given_up
+            summary["failed"] += given_up
+            batches += 1
+    finally:
+        if connection is not None:
+            connection.close()
+    for outcome, count in summary.items():
+        if count:
+            metrics.incr(f"email.outbox.{outcome}", count)
+    return summary
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .outbox import drain
+
+
+@shared_task
+def drain_outbox():
+    """Deliver queued emails; scheduled every few seconds by celery beat"""
+    return drain()
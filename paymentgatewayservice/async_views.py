@@ -0,0 +1,136 @@
+"""
+ASGI-native variants of the CoralPay proxy views in ``views.py``
+
+These send the same upstream requests (see ``calls.py``) through the aiohttp
+based ``async_gateway``, so a slow gateway response parks a coroutine rather
+than a worker thread. ``urls.py`` routes to them when
+``settings.PAYMENT_GATEWAY_ASYNC_VIEWS`` is enabled.
+"""
+
+import json
+from typing import Callable
+
+import requests
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from utils.banks import BankDirectoryUnavailable, bank_directory
+from utils.http import async_gateway
+from utils.resilience import retry_after
+
+from . import calls
+
+
+def request_data(request):
+    """Parse a JSON or form encoded body the way DRF's ``request.data`` does"""
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+    return request.POST.dict()
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class GatewayProxyView(View):
+    """Forward a POST to CoralPay and relay its response"""
+
+    http_method_names = ["post", "options"]
+    builder: Callable[[dict], calls.GatewayCall] | None = None
+    success_status = "success"
+    error_message: str | None = None
+
+    async def post(self, request, *args, **kwargs):
+        if self.builder is None:
+            raise ImproperlyConfigured(f"{type(self).__name__} does not define a builder")
+        call = self.builder(request_data(request))
+        try:
+            response = await async_gateway.send(call)
+        except requests.exceptions.RequestException as e:
+            unavailable = JsonResponse(
+                {"status": "error", "response": "Payment gateway unavailable"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            if retry_after(e):
+                unavailable["Retry-After"] = str(retry_after(e))
+            return unavailable
+
+        if response.status_code == 200:
+            return JsonResponse(
+                {"status": self.success_status, "response": response.json()},
+                status=status.HTTP_200_OK,
+            )
+        body = {"status": "error", "response": response.text}
+        if self.error_message:
+            body["message"] = self.error_message
+        return JsonResponse(body, status=status.HTTP_400_BAD_REQUEST)
+
+
+class InvokePayment(GatewayProxyView):
+    """This is the operation to initiate payment on the verge payment gateway consisting USSD, Bank Transfer, Card payment and NQR"""
+
+    builder = staticmethod(calls.invoke_payment)
+    error_message = "InvokePayment failed"
+
+
+class RequestPaymentWithCard(GatewayProxyView):
+    """Request Silos(only card) Card Payment"""
+
+    builder = staticmethod(calls.request_payment_with_card)
+    success_status = "request successful"
+
+
+class RequestPaymentWithTransfer(GatewayProxyView):
+    """Generate a dynamic bank account number for a customer to pay into"""
+
+    builder = staticmethod(calls.request_payment_with_transfer)
+
+
+class GetTransactionDetails(GatewayProxyView):
+    """Query the status of a pay-with-transfer transaction"""
+
+    builder = staticmethod(calls.get_transaction_details)
+
+
+class DirectPay(GatewayProxyView):
+    """Make a direct payment"""
+
+    builder = staticmethod(calls.direct_pay)
+
+
+class AuthenticationUSSD(GatewayProxyView):
+    builder = staticmethod(calls.ussd_authentication)
+
+
+class InvokeReference(GatewayProxyView):
+    builder = staticmethod(calls.invoke_reference)
+
+
+class TransactionStatusQuery(GatewayProxyView):
+    builder = staticmethod(calls.transaction_status_query)
+
+
+class Refund(GatewayProxyView):
+    builder = staticmethod(calls.refund)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class GetUSSDBankList(View):
+    """Served from the bank directory, which only calls CoralPay when it has no copy"""
+
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            banks = await sync_to_async(bank_directory.payload)("coralpay_ussd")
+        except BankDirectoryUnavailable:
+            return JsonResponse(
+                {"status": "error", "response": "Error fetching bank list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return JsonResponse({"status": "success", "response": banks}, status=status.HTTP_200_OK)
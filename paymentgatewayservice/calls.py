@@ -0,0 +1,292 @@
+"""
+Request builders for the CoralPay operations exposed by this app
+
+Each builder turns the incoming request data into a ``GatewayCall`` so the
+synchronous views (``views.py``) and their async counterparts
+(``async_views.py``) send exactly the same upstream request.
+"""
+
+import hashlib
+import json
+import secrets
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+from utils.helpers import (
+    encode_base64,
+    generate_current_timestamp,
+    generate_random_string,
+    generate_unique_reference,
+    generate_ussd_signature,
+    hash_sha512,
+)
+
+
+@dataclass
+class GatewayCall:
+    method: str
+    url: str
+    endpoint: str
+    headers: dict = field(default_factory=dict)
+    data: str | dict | None = None
+
+
+def dpwt_basic_auth(reference_no):
+    """Basic auth header value for the pay-with-transfer APIs"""
+    username = settings.CORALPAY_DPWT_USERNAME
+    hashed_value = hash_sha512(f"{reference_no}:{username}")
+    return encode_base64(f"{username}:{hashed_value}")
+
+
+def generate_trace_id(length=10) -> str:
+    lower_bound = 10 ** (length - 1)
+    upper_bound = 10**length - 1
+    return str(secrets.randbelow(upper_bound - lower_bound + 1) + lower_bound) + str(
+        int(time.time())
+    )
+
+
+def invoke_payment(data) -> GatewayCall:
+    merchant_id = settings.CORALPAY_MERCHANTID
+    trace_id = generate_trace_id()
+    timestamp = generate_current_timestamp()
+    signature_string = f"{merchant_id}{trace_id}{timestamp}{settings.CORALPAY_KEY}"
+    signature = hashlib.sha256(signature_string.encode("utf-8")).hexdigest()
+    payload = {
+        "requestHeader": {
+            "merchantId": merchant_id,
+            "timeStamp": timestamp,
+            "signature": signature,
+        },
+        "customer": {
+            "email": data.get("email"),
+            "name": data.get("name"),
+            "phone": data.get("phone"),
+            "tokenUserId": data.get("phone"),
+        },
+        "customization": {
+            "logoUrl": "https://images.app.goo.gl/A19dJZCBxZbewZFm9",
+            "title": data.get("title"),
+            "description": "Service Payment",
+        },
+        "metaData": {
+            "data1": "sample data",
+            "data2": "another sample data",
+            "data3": "sample info",
+        },
+        "traceId": trace_id,
+        "productId": settings.CORALPAY_PRODUCTID,
+        "amount": data.get("amount"),
+        "currency": "NGN",
+        "feeBearer": "M",
+        "returnUrl": settings.CORALPAY_RETURN_URL,
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_INVOKEPAYMENT_URL,
+        "coralpay.invoke_payment",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.CORALPAY_TOKEN}",
+        },
+        data=json.dumps(payload),
+    )
+
+
+def request_payment_with_card(data) -> GatewayCall:
+    payload = {
+        "merchantId": settings.CORALPAY_CARD_MERCHANTID,
+        "merchantRef": generate_random_string(25),
+        "amount": data.get("amount"),
+        "callBackUrlSuccess": settings.CORALPAY_CALLBACKURL_SUCCESS,
+        "callBackUrlFailed": settings.CORALPAY_CALLBACKURL_FAILURE,
+        "isTokenize": 0,
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_REQUESTPAYMENTWITHCARD_URL,
+        "coralpay.request_payment_with_card",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {settings.CORALPAY_PAYWITHCARD_TOKEN}",
+        },
+        data=json.dumps(payload),
+    )
+
+
+def request_payment_with_transfer(data) -> GatewayCall:
+    reference_no = generate_unique_reference()
+    payload = {
+        "requestHeader": {
+            "clientId": settings.CORALPAY_CLIENTID,
+            "requestType": "Bank Transfer",
+        },
+        "customerName": f"{data.get('firstname')} {data.get('lastname')}",
+        "referenceNumber": reference_no,
+        "transactionAmount": data.get("amount"),
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_DYNAMIC_PAYWITHTRANSFER_URL,
+        "coralpay.request_payment_with_transfer",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {dpwt_basic_auth(reference_no)}",
+        },
+        data=json.dumps(payload),
+    )
+
+
+def get_bank_list() -> GatewayCall:
+    reference_no = generate_unique_reference()
+    return GatewayCall(
+        "GET",
+        settings.CORALPAY_GET_BANK_LIST_URL,
+        "coralpay.get_bank_list",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {dpwt_basic_auth(reference_no)}",
+        },
+    )
+
+
+def get_transaction_details(data) -> GatewayCall:
+    reference_no = generate_unique_reference()
+    payload = {
+        "requestHeader": {
+            "clientId": settings.CORALPAY_CLIENTID,
+            "requestType": "Bank Transfer",
+        },
+        "referenceNumber": reference_no,
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_PAYWITHTRANSFER_REQUERY_URL,
+        "coralpay.get_transaction_details",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {dpwt_basic_auth(reference_no)}",
+        },
+        data=json.dumps(payload),
+    )
+
+
+def direct_pay(data) -> GatewayCall:
+    reference_no = generate_unique_reference()
+    payload = {
+        "requestHeader": {
+            "clientId": settings.CORALPAY_CLIENTID,
+            "requestType": "Bank Transfer",
+        },
+        "customerName": f"{data.get('firstname')} {data.get('lastname')}",
+        "referenceNumber": reference_no,
+        "transactionAmount": data.get("amount"),
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_PAYDIRECT_URL,
+        "coralpay.direct_pay",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {dpwt_basic_auth(reference_no)}",
+        },
+        data=json.dumps(payload),
+    )
+
+
+def ussd_authentication(data) -> GatewayCall:
+    payload = {
+        "Username": settings.CORALPAY_USSD_USERNAME,
+        "Password": settings.CORALPAY_USSD_PASSWORD,
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_USSD_AUTHENTICATION_URL,
+        "coralpay.ussd_authentication",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(payload),
+    )
+
+
+def ussd_headers():
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {settings.CORALPAY_INVOKEREFERENCE_TOKEN}",
+    }
+
+
+def invoke_reference(data) -> GatewayCall:
+    merchant_id = settings.CORALPAY_INVOKEREFERENCE_MERCHANTID
+    terminal_id = settings.CORALPAY_INVOKEREFERENCE_TERMINALID
+    timestamp = generate_current_timestamp()
+    signature = generate_ussd_signature(
+        f"{merchant_id}{terminal_id}{timestamp}{settings.CORALPAY_INVOKEREFERENCE_KEY}"
+    )
+    payload = {
+        "MerchantId": merchant_id,
+        "TerminalId": terminal_id,
+        "SubMerchantName": "",
+        "Amount": data.get("amount"),
+        "TraceId": generate_unique_reference(12),
+        "BankCode": data.get("bankCode"),
+        "TimeStamp": timestamp,
+        "Signature": signature,
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_INVOKEREFERENCE_URL,
+        "coralpay.invoke_reference",
+        headers=ussd_headers(),
+        data=json.dumps(payload),
+    )
+
+
+def transaction_status_query(data) -> GatewayCall:
+    # timestamp and signature are the ones returned by the last invoke-reference
+    payload = {
+        "MerchantId": settings.CORALPAY_INVOKEREFERENCE_MERCHANTID,
+        "TerminalId": settings.CORALPAY_INVOKEREFERENCE_TERMINALID,
+        "Amount": data.get("amount"),
+        "TransactionId": data.get("transId"),
+        "TimeStamp": data.get("timestamp"),
+        "Signature": data.get("signature"),
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_TRANSACTIONSTATUS_URL,
+        "coralpay.transaction_status_query",
+        headers=ussd_headers(),
+        data=json.dumps(payload),
+    )
+
+
+def refund(data) -> GatewayCall:
+    # timestamp and signature are the ones returned by the last invoke-reference
+    payload = {
+        "MerchantId": settings.CORALPAY_INVOKEREFERENCE_MERCHANTID,
+        "TerminalId": settings.CORALPAY_INVOKEREFERENCE_TERMINALID,
+        "Amount": data.get("amount"),
+        "Reference": data.get("ref"),
+        "TransactionId": data.get("transId"),
+        "TimeStamp": data.get("timestamp"),
+        "Signature": data.get("signature"),
+    }
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_USSD_REFUND_URL,
+        "coralpay.refund",
+        headers=ussd_headers(),
+        data=json.dumps(payload),
+    )
+
+
+def ussd_bank_list(data) -> GatewayCall:
+    return GatewayCall(
+        "POST",
+        settings.CORALPAY_GETBANKLIST_URL,
+        "coralpay.ussd_bank_list",
+        headers=ussd_headers(),
+        data={},
+    )
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from paymentgatewayservice import async_views, views
+from paymentgatewayservice.simulator import (
+    GATEWAY_URL_SETTINGS,
+    Behaviour,
+    SimulatorConfig,
+    SimulatorThread,
+    gateway_url_overrides,
+)
+from utils.http import async_gateway
+from utils.metrics import Timer
+
+ENDPOINTS = {
+    "invoke_payment": "InvokePayment",
+    "pay_with_card": "RequestPaymentWithCard",
+    "pay_with_transfer": "RequestPaymentWithTransfer",
+    "transaction_details": "GetTransactionDetails",
+    "direct_pay": "DirectPay",
+    "invoke_reference": "InvokeReference",
+    "transaction_status": "TransactionStatusQuery",
+    "refund": "Refund",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares concurrent throughput of the sync and async payment gateway views "
+        "against the bundled gateway simulator (or a running one via --gateway-url)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="direct_pay")
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument(
+            "--latency", default="fixed:0.2", help="Simulator latency spec, e.g. lognormal:0.15,0.5"
+        )
+        parser.add_argument("--gateway-url", help="Use a running simulator instead of starting one")
+        parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+
+    def handle(self, *args, **options):
+        simulator = None
+        base_url = options["gateway_url"]
+        if not base_url:
+            simulator = SimulatorThread(
+                SimulatorConfig(default=Behaviour(latency=options["latency"]), seed=1)
+            )
+            base_url = simulator.start()
+
+        current = {name: getattr(settings, name, None) for name in GATEWAY_URL_SETTINGS}
+        overrides = gateway_url_overrides(base_url, current)
+        view_name = ENDPOINTS[options["endpoint"]]
+        body = json.dumps(
+            {
+                "amount": "100.00",
+                "firstname": "Bench",
+                "lastname": "Mark",
+                "email": "bench@example.com",
+            }
+        )
+
+        try:
+            with override_settings(**overrides):
+                if options["mode"] in ("sync", "both"):
+                    view = getattr(views, view_name).as_view()
+                    self.report("sync", *self.run_sync(view, body, options))
+                if options["mode"] in ("async", "both"):
+                    view = getattr(async_views, view_name).as_view()
+                    self.report("async", *asyncio.run(self.run_async(view, body, options)))
+        finally:
+            if simulator:
+                simulator.stop()
+
+    def build_request(self, body):
+        return RequestFactory().post("/bench/", data=body, content_type="application/json")
+
+    def run_sync(self, view, body, options):
+        timer = Timer("sync")
+
+        def call(_):
+            started = time.perf_counter()
+            response = view(self.build_request(body))
+            timer.observe(time.perf_counter() - started, error=response.status_code != 200)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            list(pool.map(call, range(options["requests"])))
+        return timer, time.perf_counter() - started
+
+    async def run_async(self, view, body, options):
+        timer = Timer("async")
+        slots = asyncio.Semaphore(options["concurrency"])
+
+        async def call():
+            async with slots:
+                started = time.perf_counter()
+                response = await view(self.build_request(body))
+                timer.observe(time.perf_counter() - started, error=response.status_code != 200)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - started
+        await async_gateway.close()
+        return timer, elapsed
+
+    def report(self, mode, timer, elapsed):
+        stats = timer.snapshot()
+        self.stdout.write(
+            f"{mode:>5}: {stats['count']} requests in {elapsed:.2f}s "
+            f"({stats['count'] / elapsed:.1f} req/s), errors={stats['errors']}, "
+            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+        )
@@ -0,0 +1,65 @@
+import json
+
+from aiohttp import web
+from django.core.management.base import BaseCommand
+
+from paymentgatewayservice.simulator import GatewaySimulator, SimulatorConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the local CoralPay/Paystack simulator. Use with DJANGO_SETTINGS_MODULE=amaps.simulator "
+        "to send all gateway traffic to it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--config", help="JSON file with 'default', 'routes' and 'seed' keys")
+        parser.add_argument("--seed", type=int)
+        parser.add_argument(
+            "--latency",
+            help="Default latency spec, e.g. fixed:0.05, uniform:0.02,0.2, normal:0.1,0.03, "
+            "lognormal:0.08,0.6 (median, sigma) or exponential:0.1",
+        )
+        parser.add_argument(
+            "--error-rate", type=float, help="Fraction of requests answered with a 500"
+        )
+        parser.add_argument(
+            "--timeout-rate", type=float, help="Fraction of requests that hang past client timeouts"
+        )
+
+    def handle(self, *args, **options):
+        data = {}
+        if options["config"]:
+            with open(options["config"]) as config_file:
+                data = json.load(config_file)
+        default = data.setdefault("default", {})
+        for option, key in (
+            ("latency", "latency"),
+            ("error_rate", "error_rate"),
+            ("timeout_rate", "timeout_rate"),
+        ):
+            if options[option] is not None:
+                default[key] = options[option]
+        if options["seed"] is not None:
+            data["seed"] = options["seed"]
+        try:
+            config = SimulatorConfig.from_dict(data)
+        except (TypeError, ValueError) as exc:
+            self.stderr.write(self.style.ERROR(f"Invalid simulator config: {exc}"))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Gateway simulator on http://{options['host']}:{options['port']} "
+                f"(latency={config.default.latency}, error_rate={config.default.error_rate}, "
+                f"timeout_rate={config.default.timeout_rate}, seed={config.seed})"
+            )
+        )
+        web.run_app(
+            GatewaySimulator(config).build_app(),
+            host=options["host"],
+            port=options["port"],
+            print=None,
+        )
@@ -0,0 +1,738 @@
+"""
+Local CoralPay / Paystack simulator for offline load and latency testing
+
+The simulator serves the upstream endpoints used by ``utils.api`` and the
+views in this app under the same paths as the real gateways, so pointing a
+settings module at it only means swapping the host (see ``amaps.simulator``):
+
+    python manage.py run_gateway_simulator --latency lognormal:0.08,0.6 --error-rate 0.01
+    DJANGO_SETTINGS_MODULE=amaps.simulator python manage.py runserver
+
+Paystack routes live under ``/paystack``. Every route draws its response
+delay from a latency distribution and can fail with a 500 (``error_rate``) or
+hang past the client's read timeout (``timeout_rate``). Behaviour can be set
+per route name and the random stream is seeded, so runs are repeatable.
+
+Admin endpoints: ``GET /__simulator__/stats``, ``POST /__simulator__/config``
+(same shape as the JSON config file) and ``POST /__simulator__/reset``.
+"""
+
+import asyncio
+import base64
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Settings that hold upstream gateway URLs; the simulator mirrors their paths
+GATEWAY_URL_SETTINGS = (
+    "CORALPAY_GWAPI_URL",
+    "CORALPAY_ACCOUNT_URL",
+    "CORALPAY_INVOKEPAYMENT_URL",
+    "CORALPAY_TRANSACTIONQUERY_URL",
+    "CORALPAY_INVOKE_USSD_URL",
+    "CORALPAY_REQUESTPAYMENTWITHCARD_URL",
+    "CORALPAY_DYNAMIC_PAYWITHTRANSFER_URL",
+    "CORALPAY_STATIC_PAYWITHTRANSFER_URL",
+    "CORALPAY_PAYWITHTRANSFER_REQUERY_URL",
+    "CORALPAY_FETCH_ACCOUNT_TRANSACTIONS_URL",
+    "CORALPAY_FETCH_PARTNER_TRANSACTIONS_URL",
+    "CORALPAY_MERCHANT_PAYMENT_NOTIFICATION_URL",
+    "CORALPAY_GET_BANK_LIST_URL",
+    "CORALPAY_PAYDIRECT_URL",
+    "CORALPAY_USSD_AUTHENTICATION_URL",
+    "CORALPAY_INVOKEREFERENCE_URL",
+    "CORALPAY_USSD_REFUND_URL",
+    "CORALPAY_TRANSACTIONSTATUS_URL",
+    "CORALPAY_GETBANKLIST_URL",
+)
+
+BANKS = [
+    ("Access Bank", "access-bank", "044"),
+    ("Citibank Nigeria", "citibank-nigeria", "023"),
+    ("Ecobank Nigeria", "ecobank-nigeria", "050"),
+    ("Fidelity Bank", "fidelity-bank", "070"),
+    ("First Bank of Nigeria", "first-bank-of-nigeria", "011"),
+    ("First City Monument Bank", "first-city-monument-bank", "214"),
+    ("Guaranty Trust Bank", "guaranty-trust-bank", "058"),
+    ("Heritage Bank", "heritage-bank", "030"),
+    ("Keystone Bank", "keystone-bank", "082"),
+    ("Kuda Bank", "kuda-bank", "50211"),
+    ("Moniepoint MFB", "moniepoint-mfb-ng", "50515"),
+    ("OPay Digital Services", "paycom", "999992"),
+    ("PalmPay", "palmpay", "999991"),
+    ("Polaris Bank", "polaris-bank", "076"),
+    ("Providus Bank", "providus-bank", "101"),
+    ("Stanbic IBTC Bank", "stanbic-ibtc-bank", "221"),
+    ("Standard Chartered Bank", "standard-chartered-bank", "068"),
+    ("Sterling Bank", "sterling-bank", "232"),
+    ("Union Bank of Nigeria", "union-bank-of-nigeria", "032"),
+    ("United Bank For Africa", "united-bank-for-africa", "033"),
+    ("Unity Bank", "unity-bank", "215"),
+    ("Wema Bank", "wema-bank", "035"),
+    ("Zenith Bank", "zenith-bank", "057"),
+]
+
+
+def gateway_url_overrides(base_url, current):
+    """Map each gateway URL setting in ``current`` onto ``base_url``, keeping its path"""
+    base_url = base_url.rstrip("/")
+    overrides = {
+        name: base_url + urlsplit(current[name]).path
+        for name in GATEWAY_URL_SETTINGS
+        if current.get(name)
+    }
+    overrides["PAYSTACK_BASE_URL"] = f"{base_url}/paystack"
+    return overrides
+
+
+@dataclass
+class Behaviour:
+    """How a route responds: latency spec plus failure probabilities"""
+
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    hang_seconds: float = 120.0
+
+    def __post_init__(self):
+        kind, _, _ = self.latency.partition(":")
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{kind}', expected one of {DISTRIBUTIONS}"
+            )
+
+    def sample_latency(self, rng):
+        kind, _, args = self.latency.partition(":")
+        params = [float(value) for value in args.split(",") if value]
+        if kind == "fixed":
+            delay = params[0] if params else 0.0
+        elif kind == "uniform":
+            delay = rng.uniform(params[0], params[1])
+        elif kind == "normal":
+            delay = rng.gauss(params[0], params[1])
+        elif kind == "lognormal":
+            # median, sigma: a long right tail like real gateway latencies
+            delay = rng.lognormvariate(math.log(params[0]), params[1])
+        else:
+            delay = rng.expovariate(1 / params[0])
+        return max(0.0, delay)
+
+    @classmethod
+    def from_dict(cls, data, base=None):
+        merged = {**(vars(base) if base else {}), **data}
+        return cls(**{f.name: merged[f.name] for f in fields(cls) if f.name in merged})
+
+
+@dataclass
+class SimulatorConfig:
+    default: Behaviour = field(default_factory=Behaviour)
+    routes: dict = field(default_factory=dict)
+    seed: int | None = None
+
+    def behaviour_for(self, route):
+        return self.routes.get(route, self.default)
+
+    @classmethod
+    def from_dict(cls, data):
+        default = Behaviour.from_dict(data.get("default", {}))
+        routes = {
+            name: Behaviour.from_dict(spec, default)
+            for name, spec in data.get("routes", {}).items()
+        }
+        return cls(default=default, routes=routes, seed=data.get("seed"))
+
+
+def fake_jwt(lifetime=3600):
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+
+    payload = {
+        "jti": str(uuid.uuid4()),
+        "exp": int(time.time()) + lifetime,
+        "iss": "gateway-simulator",
+    }
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(payload)}.simulated"
+
+
+def coralpay_header(code="00", message="Successful"):
+    return {"responseCode": code, "responseMessage": message}
+
+
+async def read_payload(request):
+    body = await request.read()
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return dict(await request.post())
+    return payload if isinstance(payload, dict) else {"items": payload}
+
+
+class GatewaySimulator:
+    def __init__(self, config=None):
+        self.config = config or SimulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.stats = {}
+        self.reset_state()
+
+    def reset_state(self):
+        self.payments = {}
+        self.recipients = {}
+        self.transfers = {}
+        self.stats.clear()
+
+    def record(self, route, outcome):
+        counts = self.stats.setdefault(route, {"requests": 0, "errors": 0, "timeouts": 0})
+        counts["requests"] += 1
+        if outcome:
+            counts[outcome] += 1
+
+    @web.middleware
+    async def behaviour_middleware(self, request, handler):
+        route = request.match_info.route.name
+        if route is None or route.startswith("simulator."):
+            return await handler(request)
+        route = route.removesuffix(".slash")
+        behaviour = self.config.behaviour_for(route)
+        roll = self.rng.random()
+        delay = behaviour.sample_latency(self.rng)
+        if roll < behaviour.timeout_rate:
+            self.record(route, "timeouts")
+            await asyncio.sleep(behaviour.hang_seconds)
+            return web.json_response({"status": False, "message": "Simulated timeout"}, status=504)
+        await asyncio.sleep(delay)
+        if roll < behaviour.timeout_rate + behaviour.error_rate:
+            self.record(route, "errors")
+            return web.json_response(
+                {"status": False, "message": "Simulated gateway error"}, status=500
+            )
+        self.record(route, None)
+        return await handler(request)
+
+    # CoralPay GwApi
+
+    async def coralpay_authentication(self, request):
+        return web.json_response({"token": fake_jwt(), "key": str(uuid.uuid4()), "expiresIn": 3600})
+
+    async def coralpay_invoke_payment(self, request):
+        payload = await read_payload(request)
+        trace_id = payload.get("traceId") or uuid.uuid4().hex[:10]
+        transaction_id = uuid.uuid4().hex[:16].upper()
+        self.payments[trace_id] = {
+            "amount": str(payload.get("amount", "0")),
+            "transactionId": transaction_id,
+        }
+        return web.json_response(
+            {
+                "responseHeader": coralpay_header(),
+                "payPageLink": f"{request.url.origin()}/pay/{transaction_id}",
+                "traceId": trace_id,
+                "transactionId": transaction_id,
+            }
+        )
+
+    async def coralpay_transaction_query(self, request):
+        payload = await read_payload(request)
+        trace_id = payload.get("traceId")
+        payment = self.payments.get(trace_id)
+        if payment is None:
+            return web.json_response(
+                {
+                    "responseHeader": coralpay_header("25", "Transaction not found"),
+                    "traceId": trace_id,
+                    "responseCode": "25",
+                    "responseMessage": "Transaction not found",
+                }
+            )
+        return web.json_response(
+            {
+                "responseHeader": coralpay_header(),
+                "traceId": trace_id,
+                "transactionId": payment["transactionId"],
+                "amount": float(Decimal(payment["amount"])),
+                "channel": "Card",
+                "responseCode": "00",
+                "responseMessage": "Successful",
+            }
+        )
+
+    # CoralPay pay-with-transfer
+
+    async def coralpay_bank_list(self, request):
+        return web.json_response(
+            {
+                "responseHeader": coralpay_header(),
+                "banks": [{"bankCode": code, "bankName": name} for name, _, code in BANKS],
+            }
+        )
+
+    async def coralpay_reserved_account(self, request):
+        payload = await read_payload(request)
+        return web.json_response(
+            {
+                "responseHeader": coralpay_header(),
+                "customerName": payload.get("customerName"),
+                "referenceNumber": payload.get("referenceNumber"),
+                "accountName": f"OjaPay-{payload.get('customerName', 'Customer')}",
+                "accountNumber": f"{self.rng.randrange(10**9, 10**10)}",
+                "bankName": "Simulated Bank",
+                "transactionAmount": payload.get("transactionAmount"),
+            }
+        )
+
+    async def coralpay_echo(self, request):
+        payload = await read_payload(request)
+        return web.json_response(
+            {"responseHeader": coralpay_header(), "request": payload, "transactions": []}
+        )
+
+    # CoralPay cgate (USSD)
+
+    async def cgate_authentication(self, request):
+        return web.json_response({"Token": fake_jwt(), "Key": str(uuid.uuid4())})
+
+    async def cgate_response(self, request):
+        payload = await read_payload(request)
+        return web.json_response(
+            {
+                "ResponseHeader": {"ResponseCode": "00", "ResponseMessage": "Success"},
+                "ResponseDetails": {
+                    "Reference": f"*{self.rng.randrange(100, 999)}*000*{self.rng.randrange(10**5, 10**6)}#",
+                    "Amount": payload.get("Amount"),
+                    "TransactionId": payload.get("TransactionId") or uuid.uuid4().hex[:12],
+                    "TraceId": payload.get("TraceId"),
+                },
+            }
+        )
+
+    async def cgate_banks(self, request):
+        return web.json_response(
+            {
+                "ResponseHeader": {"ResponseCode": "00", "ResponseMessage": "Success"},
+                "Banks": [{"BankCode": code, "BankName": name} for name, _, code in BANKS],
+            }
+        )
+
+    # Paystack
+
+    async def paystack_banks(self, request):
+        data = [
+            {
+                "id": index,
+                "name": name,
+                "slug": slug,
+                "code": code,
+                "longcode": code,
+                "country": "Nigeria",
+                "currency": "NGN",
+                "type": "nuban",
+                "active": True,
+            }
+            for index, (name, slug, code) in enumerate(BANKS, start=1)
+        ]
+        return web.json_response({"status": True, "message": "Banks retrieved", "data": data})
+
+    async def paystack_resolve(self, request):
+        account_number = request.query.get("account_number", "")
+        if not (account_number.isdigit() and len(account_number) == 10):
+            return web.json_response(
+                {
+                    "status": False,
+                    "message": "Could not resolve account name. Check parameters or try again.",
+                },
+                status=422,
+            )
+        return web.json_response(
+            {
+                "status": True,
+                "message": "Account number resolved",
+                "data": {
+                    "account_number": account_number,
+                    "account_name": f"SIMULATED CUSTOMER {account_number[-4:]}",
+                    "bank_id": 1,
+                },
+            }
+        )
+
+    async def paystack_transfer_recipient(self, request):
+        payload = await read_payload(request)
+        code = f"RCP_{uuid.uuid4().hex[:14]}"
+        recipient = {
+            "active": True,
+            "currency": payload.get("currency", "NGN"),
+            "name": payload.get("name"),
+            "recipient_code": code,
+            "type": payload.get("type", "nuban"),
+            "details": {
+                "account_number": payload.get("account_number"),
+                "bank_code": payload.get("bank_code"),
+            },
+        }
+        self.recipients[code] = recipient
+        return web.json_response(
+            {
+                "status": True,
+                "message": "Transfer recipient created successfully",
+                "data": recipient,
+            }
+        )
+
+    def queue_transfer(self, payload):
+        transfer_code = f"TRF_{uuid.uuid4().hex[:14]}"
+        transfer = {
+            "reference": payload.get("reference"),
+            "amount": payload.get("amount"),
+            "currency": payload.get("currency", "NGN"),
+            "reason": payload.get("reason"),
+            "recipient": payload.get("recipient"),
+            "transfer_code": transfer_code,
+            "status": "otp",
+        }
+        self.transfers[transfer_code] = transfer
+        return transfer
+
+    async def paystack_transfer(self, request):
+        payload = await read_payload(request)
+        if payload.get("recipient") not in self.recipients:
+            return web.json_response(
+                {"status": False, "message": "Recipient specified is invalid"}, status=400
+            )
+        transfer = self.queue_transfer(payload)
+        return web.json_response(
+            {"status": True, "message": "Transfer requires OTP to continue", "data": transfer}
+        )
+
+    async def paystack_bulk_transfer(self, request):
+        payload = await read_payload(request)
+        transfers = payload.get("transfers") or []
+        if any(transfer.get("recipient") not in self.recipients for transfer in transfers):
+            return web.json_response(
+                {"status": False, "message": "Recipient specified is invalid"}, status=400
+            )
+        data = []
+        for transfer in transfers:
+            # Bulk transfers skip the OTP step
+            queued = self.queue_transfer({**transfer, "currency": payload.get("currency", "NGN")})
+            queued["status"] = "pending"
+            data.append(
+                {
+                    key: queued[key]
+                    for key in (
+                        "reference",
+                        "recipient",
+                        "amount",
+                        "transfer_code",
+                        "currency",
+                        "status",
+                    )
+                }
+            )
+        return web.json_response(
+            {"status": True, "message": f"{len(data)} transfers queued.", "data": data}
+        )
+
+    async def paystack_verify_transfer(self, request):
+        reference = request.match_info["reference"]
+        for transfer in self.transfers.values():
+            if transfer["reference"] == reference:
+                return web.json_response(
+                    {"status": True, "message": "Transfer retrieved", "data": transfer}
+                )
+        return web.json_response({"status": False, "message": "Transfer not found"}, status=404)
+
+    async def paystack_finalize_transfer(self, request):
+        payload = await read_payload(request)
+        transfer = self.transfers.get(payload.get("transfer_code"))
+        if transfer is None:
+            return web.json_response({"status": False, "message": "Transfer not found"}, status=404)
+        transfer["status"] = "success"
+        return web.json_response(
+            {"status": True, "message": "Transfer has been queued", "data": transfer}
+        )
+
+    async def paystack_verify(self, request):
+        reference = request.match_info["reference"]
+        return web.json_response(
+            {
+                "status": True,
+                "message": "Verification successful",
+                "data": {
+                    "reference": reference,
+                    "status": "success",
+                    "currency": "NGN",
+                    "channel": "card",
+                },
+            }
+        )
+
+    async def paystack_initialize(self, request):
+        payload = await read_payload(request)
+        reference = payload.get("reference") or uuid.uuid4().hex[:10]
+        return web.json_response(
+            {
+                "status": True,
+                "message": "Authorization URL created",
+                "data": {
+                    "authorization_url": f"{request.url.origin()}/checkout/{reference}",
+                    "access_code": uuid.uuid4().hex[:15],
+                    "reference": reference,
+                },
+            }
+        )
+
+    async def paystack_customer(self, request):
+        payload = await read_payload(request)
+        email = request.match_info.get("email") or payload.get("email")
+        return web.json_response(
+            {
+                "status": True,
+                "message": "Customer retrieved",
+                "data": {
+                    "email": email,
+                    "customer_code": f"CUS_{uuid.uuid5(uuid.NAMESPACE_DNS, str(email)).hex[:15]}",
+                    "first_name": payload.get("first_name"),
+                    "last_name": payload.get("last_name"),
+                    "phone": payload.get("phone"),
+                    "identified": True,
+                },
+            }
+        )
+
+    async def paystack_generic(self, request):
+        payload = await read_payload(request)
+        return web.json_response({"status": True, "message": "Request successful", "data": payload})
+
+    # Simulator admin
+
+    async def admin_stats(self, request):
+        return web.json_response(
+            {"routes": self.stats, "payments": len(self.payments), "transfers": len(self.transfers)}
+        )
+
+    async def admin_config(self, request):
+        self.config = SimulatorConfig.from_dict(await read_payload(request))
+        if self.config.seed is not None:
+            self.rng.seed(self.config.seed)
+        return web.json_response({"status": True})
+
+    async def admin_reset(self, request):
+        self.reset_state()
+        if self.config.seed is not None:
+            self.rng.seed(self.config.seed)
+        return web.json_response({"status": True})
+
+    def routes(self):
+        gwapi = "/GwApi/api/v1"
+        pwt = "/paywithtransfer/moneytransfer/apis"
+        cgate = "/cgateproxy/api/v2"
+        paystack = "/paystack"
+        return [
+            (
+                "POST",
+                f"{gwapi}/Authentication",
+                self.coralpay_authentication,
+                "coralpay.authentication",
+            ),
+            (
+                "POST",
+                f"{gwapi}/InvokePayment",
+                self.coralpay_invoke_payment,
+                "coralpay.invoke_payment",
+            ),
+            (
+                "POST",
+                f"{gwapi}/TransactionQuery",
+                self.coralpay_transaction_query,
+                "coralpay.transaction_query",
+            ),
+            ("GET", f"{pwt}/listOfBanks", self.coralpay_bank_list, "coralpay.banks"),
+            (
+                "POST",
+                f"{pwt}/staticAccount",
+                self.coralpay_reserved_account,
+                "coralpay.static_account",
+            ),
+            (
+                "POST",
+                f"{pwt}/dynamicAccount",
+                self.coralpay_reserved_account,
+                "coralpay.dynamic_account",
+            ),
+            (
+                "POST",
+                f"{pwt}/getTransactionDetails",
+                self.coralpay_echo,
+                "coralpay.transaction_details",
+            ),
+            (
+                "GET",
+                f"{pwt}/partners/getAccountTransactions",
+                self.coralpay_echo,
+                "coralpay.account_transactions",
+            ),
+            (
+                "GET",
+                f"{pwt}/partners/fetch-partner-transactions",
+                self.coralpay_echo,
+                "coralpay.partner_transactions",
+            ),
+            (
+                "POST",
+                f"{pwt}/testPartnerRequest",
+                self.coralpay_echo,
+                "coralpay.payment_notification",
+            ),
+            (
+                "POST",
+                "/paywithtransfer/v1/directpaywithaccount/apis/onetimepayment",
+                self.coralpay_echo,
+                "coralpay.direct_pay",
+            ),
+            ("POST", f"{cgate}/authentication", self.cgate_authentication, "cgate.authentication"),
+            ("POST", f"{cgate}/invokereference", self.cgate_response, "cgate.invoke_reference"),
+            ("POST", f"{cgate}/statusquery", self.cgate_response, "cgate.status_query"),
+            ("POST", f"{cgate}/refund", self.cgate_response, "cgate.refund"),
+            ("POST", f"{cgate}/getbanks", self.cgate_banks, "cgate.banks"),
+            ("POST", "/cgateproxy/api/invokereference", self.cgate_response, "cgate.invoke_ussd"),
+            ("POST", "/octoweb/cnp/requestPayment", self.coralpay_echo, "coralpay.card_payment"),
+            ("GET", f"{paystack}/bank", self.paystack_banks, "paystack.banks"),
+            ("GET", f"{paystack}/bank/resolve", self.paystack_resolve, "paystack.resolve_account"),
+            (
+                "POST",
+                f"{paystack}/transferrecipient",
+                self.paystack_transfer_recipient,
+                "paystack.transfer_recipient",
+            ),
+            ("POST", f"{paystack}/transfer", self.paystack_transfer, "paystack.transfer"),
+            (
+                "POST",
+                f"{paystack}/transfer/finalize_transfer",
+                self.paystack_finalize_transfer,
+                "paystack.finalize_transfer",
+            ),
+            (
+                "POST",
+                f"{paystack}/transfer/bulk",
+                self.paystack_bulk_transfer,
+                "paystack.bulk_transfer",
+            ),
+            (
+                "GET",
+                f"{paystack}/transfer/verify/{{reference}}",
+                self.paystack_verify_transfer,
+                "paystack.verify_transfer",
+            ),
+            (
+                "GET",
+                f"{paystack}/transaction/verify/{{reference}}",
+                self.paystack_verify,
+                "paystack.verify_payment",
+            ),
+            (
+                "POST",
+                f"{paystack}/transaction/initialize",
+                self.paystack_initialize,
+                "paystack.init_payment",
+            ),
+            (
+                "GET",
+                f"{paystack}/customer/{{email}}",
+                self.paystack_customer,
+                "paystack.fetch_customer",
+            ),
+            (
+                "PUT",
+                f"{paystack}/customer/{{email}}",
+                self.paystack_customer,
+                "paystack.update_customer",
+            ),
+            ("POST", f"{paystack}/customer", self.paystack_customer, "paystack.create_customer"),
+            (
+                "POST",
+                f"{paystack}/customer/{{customer}}/identification",
+                self.paystack_generic,
+                "paystack.validate_customer",
+            ),
+            (
+                "POST",
+                f"{paystack}/customer/set_risk_action",
+                self.paystack_generic,
+                "paystack.whitelist_customer",
+            ),
+            (
+                "POST",
+                f"{paystack}/dedicated_account",
+                self.paystack_generic,
+                "paystack.virtual_account",
+            ),
+            ("GET", "/__simulator__/stats", self.admin_stats, "simulator.stats"),
+            ("POST", "/__simulator__/config", self.admin_config, "simulator.config"),
+            ("POST", "/__simulator__/reset", self.admin_reset, "simulator.reset"),
+        ]
+
+    def build_app(self):
+        app = web.Application(middlewares=[self.behaviour_middleware])
+        for method, path, handler, name in self.routes():
+            app.router.add_route(method, path, handler, name=name)
+            # The configured gateway URLs are inconsistent about trailing slashes
+            app.router.add_route(method, f"{path}/", handler, name=f"{name}.slash")
+        return app
+
+
+class SimulatorThread:
+    """Runs a ``GatewaySimulator`` on a background event loop, e.g. inside a load test"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.simulator = GatewaySimulator(config)
+        self.host = host
+        if not port:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        runner = web.AppRunner(self.simulator.build_app(), access_log=None)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+        self.loop.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="gateway-simulator", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self.url
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from utils.banks import PROVIDERS, BankDirectoryUnavailable, bank_directory
+
+
+@shared_task
+def refresh_bank_directory(provider=None):
+    """Refetch one provider's bank list, or every provider's; a failure keeps the last good copy"""
+    refreshed = {}
+    for name in [provider] if provider else PROVIDERS:
+        try:
+            refreshed[name] = len(bank_directory.refresh(name).index)
+        except BankDirectoryUnavailable:
+            refreshed[name] = None
+    return refreshed
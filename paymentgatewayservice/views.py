@@ -1,9 +1,5 @@
-import hashlib
 import json
-import secrets
-import time
 from datetime import datetime
-from typing import Any
 
 import requests
 from asgiref.sync import async_to_sync
@@ -12,11 +8,29 @@ from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from utils.helpers import *
+from utils.banks import BankDirectoryUnavailable, bank_directory
+from utils.http import gateway
+from utils.metrics import metrics
+from utils.resilience import circuits, retry_after
+
+from . import calls
+
+
+def gateway_unavailable(error):
+    """503 for a gateway call that raised before any response came back"""
+    response = Response(
+        {"status": "error", "response": "Payment gateway unavailable"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    if retry_after(error):
+        response["Retry-After"] = str(retry_after(error))
+    return response
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -26,95 +40,17 @@ class InvokePayment(APIView):
     authentication_classes = []
     permission_classes = []
 
-    def generate_random_number(self, length=10) -> str:
-        lower_bound = 10 ** (length - 1)
-        upper_bound = 10**length - 1
-        randomnumber = str(secrets.randbelow(upper_bound - lower_bound + 1) + lower_bound) + str(
-            int(time.time())
-        )
-        return randomnumber
-
-    def generate_unix_time_seconds(self) -> str:
-        current_timestamp = str(int(time.time()))
-        return current_timestamp
-
-    def generate_sha256(self) -> tuple[str, str, str]:
-        merchantId = settings.CORALPAY_MERCHANTID
-        traceId = self.generate_random_number()
-        current_timestamp = self.generate_unix_time_seconds()
-        key = settings.CORALPAY_KEY
-        signature_string = f"{merchantId}{traceId}{current_timestamp}{key}"
-        signature = hashlib.sha256(signature_string.encode("utf-8")).hexdigest()
-        return traceId, current_timestamp, signature
-
-    def process_payment(
-        self, request, traceId, timeStamp, signature, merchantId
-    ) -> tuple[bool, Any] | tuple[bool, str]:
-        email = request.data.get("email")
-        name = request.data.get("name")
-        title = request.data.get("title")
-        amount = request.data.get("amount")
-        phone = request.data.get("phone")
-        token_user_id = phone
-
-        payload = json.dumps(
-            {
-                "requestHeader": {
-                    "merchantId": merchantId,
-                    "timeStamp": timeStamp,
-                    "signature": signature,
-                },
-                "customer": {
-                    "email": email,
-                    "name": name,
-                    "phone": phone,
-                    "tokenUserId": token_user_id,
-                },
-                "customization": {
-                    "logoUrl": "https://images.app.goo.gl/A19dJZCBxZbewZFm9",
-                    "title": title,
-                    "description": "Service Payment",
-                },
-                "metaData": {
-                    "data1": "sample data",
-                    "data2": "another sample data",
-                    "data3": "sample info",
-                },
-                "traceId": traceId,
-                "productId": settings.CORALPAY_PRODUCTID,
-                "amount": amount,
-                "currency": "NGN",
-                "feeBearer": "M",
-                "returnUrl": settings.CORALPAY_RETURN_URL,
-            }
-        )
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.CORALPAY_TOKEN}",
-        }
-
-        response = requests.post(
-            settings.CORALPAY_INVOKEPAYMENT_URL, headers=headers, data=payload, timeout=30
-        )
-
-        if response.status_code == 200:
-            return True, response.json()
-        else:
-            return False, response.text
-
     def post(self, request, *args, **kwargs) -> Response:
-        traceId, current_timestamp, signature = self.generate_sha256()
-
-        is_successful, invoke_data = self.process_payment(
-            request, traceId, current_timestamp, signature, settings.CORALPAY_MERCHANTID
-        )
+        try:
+            response = gateway.send(calls.invoke_payment(request.data))
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
-        if is_successful:
+        if response.status_code == 200:
             return Response(
                 {
                     "status": "success",
-                    "response": invoke_data,
+                    "response": response.json(),
                 },
                 status=status.HTTP_200_OK,
             )
@@ -124,7 +60,7 @@ class InvokePayment(APIView):
                 {
                     "status": "error",
                     "message": "InvokePayment failed",
-                    "response": invoke_data,
+                    "response": response.text,
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
@@ -162,30 +98,10 @@ class RequestPaymentWithCard(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs) -> Response:
-        amount = request.data.get("amount")
-        merchant_ref = generate_random_string(25)
-        payload = json.dumps(
-            {
-                "merchantId": settings.CORALPAY_CARD_MERCHANTID,
-                "merchantRef": merchant_ref,
-                "amount": amount,
-                "callBackUrlSuccess": settings.CORALPAY_CALLBACKURL_SUCCESS,
-                "callBackUrlFailed": settings.CORALPAY_CALLBACKURL_FAILURE,
-                "isTokenize": 0,
-            }
-        )
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {settings.CORALPAY_PAYWITHCARD_TOKEN}",
-        }
+        call = calls.request_payment_with_card(request.data)
 
         try:
-            response = requests.post(
-                settings.CORALPAY_REQUESTPAYMENTWITHCARD_URL,
-                headers=headers,
-                data=payload,
-                timeout=30,
-            )
+            response = gateway.send(call)
 
             if response.status_code == 200:
                 return Response(
@@ -197,14 +113,8 @@ class RequestPaymentWithCard(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {
-                    "status": "error",
-                    "response": "Error processing payment request.",
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -275,7 +185,7 @@ class BankLinkAuthentication(APIView):
             "TerminalId": settings.CORALPAY_TERMINALID
             })
         try:
-            response = requests.post(url, data=payload, headers=headersList, timeout=30)
+            response = gateway.post(url, data=payload, headers=headersList, endpoint="coralpay.bank_link_authentication")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -286,11 +196,8 @@ class BankLinkAuthentication(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 @method_decorator(csrf_exempt, name="dispatch")
 class RequestPaymentWithTransfer(APIView):
@@ -300,43 +207,10 @@ class RequestPaymentWithTransfer(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs) -> Response:
-        # Generate a unique reference number
-        reference_no = generate_unique_reference()
-        firstname = request.data.get("firstname")
-        lastname = request.data.get("lastname")
-        amount = request.data.get("amount")
-        customer_name = f"{firstname} {lastname}"
-        username = settings.CORALPAY_DPWT_USERNAME
-
-        # Combine username and reference_no
-        combined_string = f"{reference_no}:{username}"
-
-        # Hash the combined string using SHA-512 and get it in hexadecimal form
-        hashed_value = hash_sha512(combined_string)
-
-        # Basic auth
-        encoded_value = encode_base64(f"{username}:{hashed_value}")
-        reqUrl = settings.CORALPAY_DYNAMIC_PAYWITHTRANSFER_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {encoded_value}",
-        }
-
-        payload = json.dumps(
-            {
-                "requestHeader": {
-                    "clientId": settings.CORALPAY_CLIENTID,
-                    "requestType": "Bank Transfer",
-                },
-                "customerName": customer_name,
-                "referenceNumber": reference_no,
-                "transactionAmount": amount,
-            }
-        )
+        call = calls.request_payment_with_transfer(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -347,11 +221,8 @@ class RequestPaymentWithTransfer(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 class PayWithStaticBankAccount:
@@ -386,7 +257,7 @@ class PayWithStaticBankAccount:
         )
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.post(reqUrl, data=payload, headers=headersList, endpoint="coralpay.create_static_bank_account")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -398,10 +269,7 @@ class PayWithStaticBankAccount:
                     status=status.HTTP_400_BAD_REQUEST,
                 )
         except requests.exceptions.RequestException as e:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return gateway_unavailable(e)
 
     @staticmethod
     def process_payment_direct(firstname, lastname, amount, reference_no):
@@ -430,7 +298,7 @@ class PayWithStaticBankAccount:
         )
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.post(reqUrl, data=payload, headers=headersList, endpoint="coralpay.process_payment_direct")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -442,10 +310,7 @@ class PayWithStaticBankAccount:
                     status=status.HTTP_400_BAD_REQUEST,
                 )
         except requests.exceptions.RequestException as e:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return gateway_unavailable(e)
 
     @staticmethod
     def get_transaction_status(reference_no):
@@ -471,7 +336,7 @@ class PayWithStaticBankAccount:
         )
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.post(reqUrl, data=payload, headers=headersList, endpoint="coralpay.get_transaction_status")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -483,10 +348,7 @@ class PayWithStaticBankAccount:
                     status=status.HTTP_400_BAD_REQUEST,
                 )
         except requests.exceptions.RequestException as e:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -497,36 +359,10 @@ class GetTransactionDetails(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs) -> Response:
-        # Combine username and reference_no
-        reference_no = generate_unique_reference()
-        username = settings.CORALPAY_DPWT_USERNAME
-        combined_string = f"{reference_no}:{username}"
-
-        # Hash the combined string using SHA-512 and get it in hexadecimal form
-        hashed_value = hash_sha512(combined_string)
-
-        # Basic auth
-        encoded_value = encode_base64(f"{username}:{hashed_value}")
-
-        reqUrl = settings.CORALPAY_PAYWITHTRANSFER_REQUERY_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {encoded_value}",
-        }
-
-        payload = json.dumps(
-            {
-                "requestHeader": {
-                    "clientId": settings.CORALPAY_CLIENTID,
-                    "requestType": "Bank Transfer",
-                },
-                "referenceNumber": reference_no,
-            }
-        )
+        call = calls.get_transaction_details(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -537,11 +373,8 @@ class GetTransactionDetails(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -568,7 +401,7 @@ class FetchAccountTransactions(APIView):
         headersList = {"Authorization": f"Basic {encoded_value}"}
 
         try:
-            response = requests.get(reqUrl, headers=headersList, timeout=30)
+            response = gateway.get(reqUrl, headers=headersList, endpoint="coralpay.fetch_account_transactions")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -579,11 +412,8 @@ class FetchAccountTransactions(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -611,7 +441,7 @@ class FetchPartnerTransactions(APIView):
         }
 
         try:
-            response = requests.get(reqUrl, headers=headersList, timeout=30)
+            response = gateway.get(reqUrl, headers=headersList, endpoint="coralpay.fetch_partner_transactions")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -622,11 +452,8 @@ class FetchPartnerTransactions(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -678,7 +505,7 @@ class TransactionPaymentNotification(APIView):
         )
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.post(reqUrl, data=payload, headers=headersList, endpoint="coralpay.transaction_payment_notification")
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -689,11 +516,8 @@ class TransactionPaymentNotification(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -704,39 +528,22 @@ class GetBankList(APIView):
     permission_classes = []
 
     def get(self, request, *args, **kwargs):
-        reference_no = generate_unique_reference()
-        username = settings.CORALPAY_DPWT_USERNAME
-        combined_string = f"{reference_no}:{username}"
-
-        # Hash the combined string using SHA-512 and get it in hexadecimal form
-        hashed_value = hash_sha512(combined_string)
-
-        # Basic auth
-        encoded_value = encode_base64(f"{username}:{hashed_value}")
-        reqUrl = settings.CORALPAY_GET_BANK_LIST_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {encoded_value}",
-        }
-
+        # Served from the bank directory (utils.banks); ?q= searches it by bank name
+        query = request.query_params.get("q", "")
         try:
-            response = requests.get(reqUrl, headers=headersList, timeout=30)
-            if response.status_code == 200:
-                return Response(
-                    {"status": "success", "response": "Bank list fetched.", "data": response.json()},
-                    status=status.HTTP_200_OK,
-                )
+            if query:
+                data = [bank.data for bank in bank_directory.search("coralpay", query)]
             else:
-                return Response(
-                    {"status": "error", "response": "Error fetching bank list", "data": response.text},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        except requests.exceptions.RequestException:
+                data = bank_directory.payload("coralpay")
+        except BankDirectoryUnavailable:
             return Response(
                 {"status": "error", "response": "Error fetching bank list"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response(
+            {"status": "success", "response": "Bank list fetched.", "data": data},
+            status=status.HTTP_200_OK,
+        )
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -747,41 +554,10 @@ class DirectPay(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        client_id = settings.CORALPAY_CLIENTID
-        firstname = request.data.get("firstname")
-        lastname = request.data.get("lastname")
-        amount = request.data.get("amount")
-        customer_name = f"{firstname} {lastname}"
-        reference_no = generate_unique_reference()
-        username = settings.CORALPAY_DPWT_USERNAME
-        combined_string = f"{reference_no}:{username}"
-
-        # Hash the combined string using SHA-512 and get it in hexadecimal form
-        hashed_value = hash_sha512(combined_string)
-
-        # Basic auth
-        encoded_value = encode_base64(f"{username}:{hashed_value}")
-        reqUrl = settings.CORALPAY_PAYDIRECT_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {encoded_value}",
-        }
-
-        payload = json.dumps(
-            {
-                "requestHeader": {
-                    "clientId": client_id,
-                    "requestType": "Bank Transfer",
-                },
-                "customerName": customer_name,
-                "referenceNumber": reference_no,
-                "transactionAmount": amount,
-            }
-        )
+        call = calls.direct_pay(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -792,11 +568,8 @@ class DirectPay(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -805,16 +578,10 @@ class AuthenticationUSSD(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        reqUrl = settings.CORALPAY_USSD_AUTHENTICATION_URL
-        headersList = {"Content-Type": "application/json"}
-        payload = json.dumps(
-            {
-                "Username": settings.CORALPAY_USSD_USERNAME,
-                "Password": settings.CORALPAY_USSD_PASSWORD,
-            }
-        )
+        call = calls.ussd_authentication(request.data)
+
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -825,11 +592,8 @@ class AuthenticationUSSD(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -838,37 +602,10 @@ class InvokeReference(APIView):
     permission_classes = []
 
     def post(self, request):
-        amount = request.data.get("amount")
-        bankCode = request.data.get("bankCode")
-        traceId = generate_unique_reference(12)
-        current_timestamp = generate_current_timestamp()
-        merchantId = settings.CORALPAY_INVOKEREFERENCE_MERCHANTID
-        terminalId = settings.CORALPAY_INVOKEREFERENCE_TERMINALID
-        key = settings.CORALPAY_INVOKEREFERENCE_KEY
-        hash_string = f"{merchantId}{terminalId}{current_timestamp}{key}"
-        signature = generate_ussd_signature(hash_string)
-        reqUrl = settings.CORALPAY_INVOKEREFERENCE_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.CORALPAY_INVOKEREFERENCE_TOKEN}",
-        }
-
-        payload = json.dumps(
-            {
-                "MerchantId": settings.CORALPAY_INVOKEREFERENCE_MERCHANTID,
-                "TerminalId": settings.CORALPAY_INVOKEREFERENCE_TERMINALID,
-                "SubMerchantName": "",
-                "Amount": amount,
-                "TraceId": traceId,
-                "BankCode": bankCode,
-                "TimeStamp": current_timestamp,
-                "Signature": signature,
-            }
-        )
+        call = calls.invoke_reference(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -879,11 +616,8 @@ class InvokeReference(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -892,32 +626,10 @@ class TransactionStatusQuery(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        amount = request.data.get("amount")
-        transId = request.data.get("transId")
-        current_timestamp = request.data.get(
-            "timestamp"
-        )  # timestamp fromt he last invoke-reference
-        signature = request.data.get("signature")  # signature from the last invoke-reference
-        reqUrl = settings.CORALPAY_TRANSACTIONSTATUS_URL
-
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.CORALPAY_INVOKEREFERENCE_TOKEN}",
-        }
-
-        payload = json.dumps(
-            {
-                "MerchantId": settings.CORALPAY_INVOKEREFERENCE_MERCHANTID,
-                "TerminalId": settings.CORALPAY_INVOKEREFERENCE_TERMINALID,
-                "Amount": amount,
-                "TransactionId": transId,
-                "TimeStamp": current_timestamp,
-                "Signature": signature,
-            }
-        )
+        call = calls.transaction_status_query(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -928,11 +640,8 @@ class TransactionStatusQuery(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -955,33 +664,10 @@ class Refund(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        amount = request.data.get("amount")
-        ref = request.data.get("ref")
-        transId = request.data.get("transId")
-        current_timestamp = request.data.get(
-            "timestamp"
-        )  # timestamp from the last invoke-reference
-        signature = request.data.get("signature")  # signature from the last invoke-reference
-        reqUrl = settings.CORALPAY_USSD_REFUND_URL
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.CORALPAY_INVOKEREFERENCE_TOKEN}",
-        }
-
-        payload = json.dumps(
-            {
-                "MerchantId": settings.CORALPAY_INVOKEREFERENCE_MERCHANTID,
-                "TerminalId": settings.CORALPAY_INVOKEREFERENCE_TERMINALID,
-                "Amount": amount,
-                "Reference": ref,
-                "TransactionId": transId,
-                "TimeStamp": current_timestamp,
-                "Signature": signature,
-            }
-        )
+        call = calls.refund(request.data)
 
         try:
-            response = requests.post(reqUrl, data=payload, headers=headersList, timeout=30)
+            response = gateway.send(call)
             if response.status_code == 200:
                 return Response(
                     {"status": "success", "response": response.json()},
@@ -992,11 +678,8 @@ class Refund(APIView):
                     {"status": "error", "response": response.text},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except requests.exceptions.RequestException:
-            return Response(
-                {"status": "error", "response": response.text},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except requests.exceptions.RequestException as e:
+            return gateway_unavailable(e)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -1005,25 +688,25 @@ class GetUSSDBankList(APIView):
     permission_classes = []
 
     def post(self, request, *args, **kwargs):
-        reqUrl = settings.CORALPAY_GETBANKLIST_URL
-        headersList = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {settings.CORALPAY_INVOKEREFERENCE_TOKEN}",
-        }
+        # The request body is not used upstream; the list comes from the bank directory
         try:
-            response = requests.post(reqUrl, data={}, headers=headersList, timeout=30)
-            if response.status_code == 200:
-                return Response(
-                    {"status": "success", "response": response.json()},
-                    status=status.HTTP_200_OK,
-                )
-            else:
-                return Response(
-                    {"status": "error", "response": response.text},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        except requests.exceptions.RequestException:
+            banks = bank_directory.payload("coralpay_ussd")
+        except BankDirectoryUnavailable:
             return Response(
-                {"status": "error", "response": response.text},
+                {"status": "error", "response": "Error fetching bank list"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response({"status": "success", "response": banks}, status=status.HTTP_200_OK)
+
+
+class GatewayMetricsView(APIView):
+    """Latency, error counts and circuit breaker states for outbound gateway calls made by this process"""
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(
+            {"status": "success", "response": {**metrics.snapshot(prefix="gateway."), "circuits": circuits.states()}},
+            status=status.HTTP_200_OK,
+        )
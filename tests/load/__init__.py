@@ -0,0 +1,11 @@
+"""
+End-to-end load tests for the wallet flows
+
+Runs login, deposit, wallet transfer and bank payout flows through the real
+URLconf against a freshly seeded test database and the bundled gateway
+simulator, then reports throughput, latency percentiles and DB queries per
+request. These are not collected by pytest; run them with:
+
+    python -m tests.load.run --users 16 --concurrency 8 --iterations 20 --output load.json
+    python -m tests.load.run --output after.json --compare load.json
+"""
@@ -0,0 +1,110 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .mailbox import latest_otp
+from .seed import PASSWORD, WALLET_PIN
+
+API = "/api/v1"
+
+
+class FlowError(Exception):
+    def __init__(self, step, status_code, body):
+        super().__init__(f"{step} failed with {status_code}: {body[:200]}")
+        self.step = step
+
+
+class VirtualUser:
+    """One seeded customer driving flows sequentially through the test client"""
+
+    def __init__(self, user, recipient, recorder, currency="NGN"):
+        self.email = user.email
+        self.recipient_tag = recipient.username
+        self.recorder = recorder
+        self.currency = currency
+        self.client = Client()
+        self.token = None
+
+    def request(self, step, method, path, data=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"} if self.token else {}
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            started = time.perf_counter()
+            if method == "GET":
+                response = self.client.get(path, **headers)
+            else:
+                response = self.client.post(
+                    path, data or {}, content_type="application/json", **headers
+                )
+            elapsed = time.perf_counter() - started
+        ok = response.status_code == 200
+        self.recorder.record(step, elapsed, len(queries), ok, response.status_code)
+        if not ok:
+            raise FlowError(step, response.status_code, response.content.decode(errors="replace"))
+        return response.json()
+
+    def otp(self, step):
+        code = latest_otp(self.email)
+        if code is None:
+            raise FlowError(step, 0, "no OTP delivered")
+        return code
+
+    def login(self):
+        body = self.request(
+            "login", "POST", f"{API}/auth/login/", {"email": self.email, "password": PASSWORD}
+        )
+        self.token = body["data"]["access_token"]
+
+    def fund(self):
+        body = self.request(
+            "fund.validation",
+            "POST",
+            f"{API}/user/wallet/fund/validation/",
+            {
+                "amount": "500.00",
+                "currency": self.currency,
+                "return_url": "http://testserver/return/",
+            },
+        )
+        reference = body["data"]["reference"]
+        self.request(
+            "fund.verify", "GET", f"{API}/user/wallet/verify-deposit/{reference}/{self.currency}/"
+        )
+
+    def transfer(self):
+        payload = {
+            "ojapay_tag": self.recipient_tag,
+            "amount": "100.00",
+            "note": "load test",
+            "wallet_pin": WALLET_PIN,
+            "donor_currency": self.currency,
+        }
+        self.request("transfer.otp", "POST", f"{API}/user/wallet/transfer/", payload)
+        payload["otp"] = self.otp("transfer.otp")
+        self.request(
+            "transfer.validation", "POST", f"{API}/user/wallet/transfer/validation", payload
+        )
+
+    def payout(self):
+        payload = {
+            "wallet_pin": WALLET_PIN,
+            "amount": "50.00",
+            "bank_code": "058",
+            "bank_name": "Guaranty Trust Bank",
+            "account_number": "0123456789",
+            "currency": self.currency,
+        }
+        self.request("payout.otp", "POST", f"{API}/user/wallet/bank-transfer/", payload)
+        payload["otp"] = self.otp("payout.otp")
+        self.request(
+            "payout.validation", "POST", f"{API}/user/wallet/bank-otp-validation/", payload
+        )
+
+
+FLOWS = {
+    "login": VirtualUser.login,
+    "fund": VirtualUser.fund,
+    "transfer": VirtualUser.transfer,
+    "payout": VirtualUser.payout,
+}
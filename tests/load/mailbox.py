@@ -0,0 +1,128 @@
+"""
+Mail capture for load runs
+
+The views queue mail in the outbox (``notificationservice``); ``OutboxWorker``
+plays the Celery worker and drains it through Django's SMTP backend, with
+``CapturingSMTP`` standing in for ``smtplib.SMTP``. It can add a
+per-connection delay to model a real mail server, which now lands on the
+worker rather than on request latency.
+"""
+
+import re
+import threading
+import time
+from email import message_from_bytes, message_from_string
+
+from django.db import connections
+
+from notificationservice.models import OutboxEmail
+from notificationservice.outbox import drain
+
+OTP_PATTERN = re.compile(r"OTP code is (\d{4,8})")
+
+
+class CapturingSMTP:
+    latency = 0.0
+    sent = []
+    connections = 0
+    _lock = threading.Lock()
+
+    def __init__(self, host=None, port=None, *args, **kwargs):
+        with CapturingSMTP._lock:
+            CapturingSMTP.connections += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.quit()
+
+    def starttls(self, *args, **kwargs):
+        return (220, b"ready")
+
+    def ehlo(self, *args, **kwargs):
+        return (250, b"ok")
+
+    def login(self, user, password):
+        return (235, b"ok")
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        with CapturingSMTP._lock:
+            CapturingSMTP.sent.append((from_addr, to_addrs, msg))
+        return {}
+
+    def send_message(self, msg, from_addr=None, to_addrs=None, *args, **kwargs):
+        return self.sendmail(from_addr or msg["From"], to_addrs or msg["To"], msg.as_string())
+
+    def noop(self):
+        return (250, b"ok")
+
+    def quit(self):
+        return (221, b"bye")
+
+    close = quit
+
+    @classmethod
+    def reset(cls, latency=0.0):
+        cls.latency = latency
+        cls.sent = []
+        cls.connections = 0
+
+
+class OutboxWorker(threading.Thread):
+    """Drains the outbox every ``interval`` seconds until stopped, then once more"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                drain()
+            drain()
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        if self.is_alive():
+            self.stopped.set()
+            self.join()
+
+
+def smtp_bodies(recipient):
+    for _, to_addrs, raw in reversed(CapturingSMTP.sent):
+        recipients = [to_addrs] if isinstance(to_addrs, str) else list(to_addrs)
+        if recipient in recipients:
+            message = (
+                message_from_bytes(raw) if isinstance(raw, bytes) else message_from_string(raw)
+            )
+            for part in message.walk():
+                if not part.is_multipart():
+                    yield part.get_payload(decode=True).decode("utf-8", errors="replace")
+
+
+def outbox_bodies(recipient):
+    # Queued rows are committed before the response, delivered or not
+    return (
+        OutboxEmail.objects.filter(to=recipient)
+        .order_by("-id")
+        .values_list("body", flat=True)
+        .iterator()
+    )
+
+
+def latest_otp(recipient):
+    """Most recent OTP mailed to ``recipient``"""
+    for body in outbox_bodies(recipient):
+        match = OTP_PATTERN.search(body)
+        if match:
+            return match.group(1)
+    return None
+
+
+def sent_count():
+    return len(CapturingSMTP.sent)
@@ -0,0 +1,118 @@
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+        self.statuses = Counter()
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+            "max_ms": round(max(self.latencies, default=0) * 1000, 2),
+            "queries_mean": round(sum(self.queries) / count, 2) if count else 0.0,
+            "queries_max": max(self.queries, default=0),
+            "statuses": dict(self.statuses),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.steps = defaultdict(StepStats)
+        self.flows = defaultdict(StepStats)
+        self.failures = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds, queries, ok, status_code):
+        with self._lock:
+            stats = self.steps[step]
+            stats.latencies.append(seconds)
+            stats.queries.append(queries)
+            stats.statuses[status_code] += 1
+            if not ok:
+                stats.errors += 1
+
+    def record_flow(self, flow, seconds, error=None):
+        with self._lock:
+            stats = self.flows[flow]
+            stats.latencies.append(seconds)
+            if error:
+                stats.errors += 1
+                self.failures[str(error)[:160]] += 1
+
+    def summary(self, elapsed, meta):
+        requests = sum(len(stats.latencies) for stats in self.steps.values())
+        return {
+            "meta": meta,
+            "duration_s": round(elapsed, 3),
+            "requests": requests,
+            "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            "steps": {name: stats.summary(elapsed) for name, stats in sorted(self.steps.items())},
+            "flows": {name: stats.summary(elapsed) for name, stats in sorted(self.flows.items())},
+            "top_failures": dict(self.failures.most_common(10)),
+        }
+
+
+def format_table(results):
+    lines = [
+        f"{'step':<22}{'count':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}"
+    ]
+    for section in ("steps", "flows"):
+        for name, stats in results[section].items():
+            label = name if section == "steps" else f"[flow] {name}"
+            lines.append(
+                f"{label:<22}{stats['count']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+                f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['queries_mean']:>9}"
+            )
+    lines.append(
+        f"total: {results['requests']} requests in {results['duration_s']}s = {results['throughput_rps']} req/s"
+    )
+    return "\n".join(lines)
+
+
+def compare(results, baseline):
+    """Per-step deltas against a previous results file, as printable lines"""
+    lines = [
+        f"{'step':<22}{'p50 Δ%':>10}{'p95 Δ%':>10}{'p99 Δ%':>10}{'queries Δ':>11}{'rps Δ%':>10}"
+    ]
+
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+.1f}" if old else "n/a"
+
+    for name, stats in results["steps"].items():
+        old = baseline.get("steps", {}).get(name)
+        if not old:
+            lines.append(f"{name:<22}{'(new)':>10}")
+            continue
+        lines.append(
+            f"{name:<22}{delta(stats['p50_ms'], old['p50_ms']):>10}{delta(stats['p95_ms'], old['p95_ms']):>10}"
+            f"{delta(stats['p99_ms'], old['p99_ms']):>10}{stats['queries_mean'] - old['queries_mean']:>+11.2f}"
+            f"{delta(stats['throughput_rps'], old['throughput_rps']):>10}"
+        )
+    lines.append(
+        f"overall throughput Δ%: {delta(results['throughput_rps'], baseline.get('throughput_rps', 0))}"
+    )
+    return "\n".join(lines)
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
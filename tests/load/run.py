@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from paymentgatewayservice.simulator import (  # noqa: E402
+    GATEWAY_URL_SETTINGS,
+    SimulatorConfig,
+    SimulatorThread,
+    gateway_url_overrides,
+)
+
+from .flows import FLOWS, VirtualUser  # noqa: E402
+from .mailbox import CapturingSMTP, OutboxWorker, sent_count  # noqa: E402
+from .report import Recorder, compare, format_table, load_results  # noqa: E402
+from .seed import seed_users  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the wallet flows under concurrent load")
+    parser.add_argument("--users", type=int, default=16, help="seeded customers")
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users running at once")
+    parser.add_argument("--iterations", type=int, default=10, help="flow rounds per virtual user")
+    parser.add_argument(
+        "--flows",
+        default="fund,transfer,payout",
+        help="comma separated subset of fund,transfer,payout",
+    )
+    parser.add_argument("--balance", default="1000000.00", help="starting NGN balance per user")
+    parser.add_argument(
+        "--gateway-latency",
+        default="fixed:0",
+        help="simulator latency spec in seconds, e.g. normal:0.08,0.02",
+    )
+    parser.add_argument(
+        "--smtp-latency", type=float, default=0.0, help="seconds per SMTP connection"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="simulator random seed")
+    parser.add_argument("--verbose", action="store_true", help="keep the views' stdout output")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="previous JSON results to diff against")
+    return parser.parse_args(argv)
+
+
+def ensure_geoip_database():
+    """The repo ships the GeoLite2 database gzipped; the login views need it inflated"""
+    target = Path(settings.GEOIP_COUNTRY_DB)
+    archive = target.with_name(target.name + ".gz")
+    if not target.exists() and archive.exists():
+        with gzip.open(archive, "rb") as source, open(target, "wb") as destination:
+            shutil.copyfileobj(source, destination)
+
+
+def virtual_user(user, recipient, flows, iterations, recorder):
+    client = VirtualUser(user, recipient, recorder)
+    try:
+        started = time.perf_counter()
+        try:
+            client.login()
+            recorder.record_flow("login", time.perf_counter() - started)
+        except Exception as exc:
+            recorder.record_flow("login", time.perf_counter() - started, error=exc)
+            return
+        for _ in range(iterations):
+            for name in flows:
+                started = time.perf_counter()
+                try:
+                    FLOWS[name](client)
+                except Exception as exc:
+                    recorder.record_flow(name, time.perf_counter() - started, error=exc)
+                else:
+                    recorder.record_flow(name, time.perf_counter() - started)
+    finally:
+        connections.close_all()
+
+
+def run(options):
+    flows = [name for name in options.flows.split(",") if name]
+    unknown = set(flows) - set(FLOWS)
+    if unknown:
+        raise SystemExit(f"unknown flows: {', '.join(sorted(unknown))}")
+
+    ensure_geoip_database()
+    setup_test_environment()
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    # A file database so every worker thread sees the seeded rows
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(workdir, "load.sqlite3")
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    CapturingSMTP.reset(options.smtp_latency)
+    simulator = SimulatorThread(
+        SimulatorConfig.from_dict(
+            {"default": {"latency": options.gateway_latency}, "seed": options.seed}
+        )
+    )
+    current_urls = {name: getattr(settings, name, None) for name in GATEWAY_URL_SETTINGS}
+    outbox_worker = OutboxWorker()
+    try:
+        with simulator, mock.patch(
+            "django.core.mail.backends.smtp.smtplib.SMTP", CapturingSMTP
+        ), override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            **gateway_url_overrides(simulator.url, current_urls),
+        ):
+            users = seed_users(options.users, options.balance)
+            connections.close_all()
+            outbox_worker.start()
+            recorder = Recorder()
+            started = time.perf_counter()
+            pending = list(range(len(users)))
+            active = []
+            while pending or active:
+                while pending and len(active) < options.concurrency:
+                    index = pending.pop(0)
+                    worker = threading.Thread(
+                        target=virtual_user,
+                        args=(
+                            users[index],
+                            users[(index + 1) % len(users)],
+                            flows,
+                            options.iterations,
+                            recorder,
+                        ),
+                    )
+                    worker.start()
+                    active.append(worker)
+                active[0].join()
+                active = [worker for worker in active if worker.is_alive()]
+            elapsed = time.perf_counter() - started
+            # Let the worker deliver what is still queued before reading the counts
+            outbox_worker.stop()
+    finally:
+        outbox_worker.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    meta = {
+        "users": options.users,
+        "concurrency": options.concurrency,
+        "iterations": options.iterations,
+        "flows": flows,
+        "gateway_latency": options.gateway_latency,
+        "smtp_latency": options.smtp_latency,
+        "emails_sent": sent_count(),
+        "smtp_connections": CapturingSMTP.connections,
+        "python": sys.version.split()[0],
+        "database": connection.vendor,
+    }
+    return recorder.summary(elapsed, meta)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    # The views print request payloads; keep them out of the report unless asked
+    quiet = (
+        contextlib.nullcontext()
+        if options.verbose
+        else contextlib.redirect_stdout(open(os.devnull, "w"))
+    )
+    with quiet:
+        results = run(options)
+    print(format_table(results))
+    if results["top_failures"]:
+        print("failures:")
+        for message, count in results["top_failures"].items():
+            print(f"  {count:>5}  {message}")
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if options.compare:
+        print(compare(results, load_results(options.compare)))
+
+
+if __name__ == "__main__":
+    main()
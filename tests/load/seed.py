@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+
+from userservice.models import Users
+from walletservice.models import Currency, Wallet
+
+PASSWORD = "LoadTest#2024"
+WALLET_PIN = "1234"
+
+
+def seed_users(count, balance, currency="NGN"):
+    """Create ``count`` active customers, each with a funded wallet and a PIN"""
+    Currency.objects.get_or_create(code=currency, defaults={"name": currency})
+    password_hash = make_password(PASSWORD)
+    pin_hash = make_password(WALLET_PIN)
+    users = []
+    for index in range(count):
+        user = Users(
+            email=f"load{index}@example.com",
+            username=f"load{index}",
+            phone_number=f"0803{index:07d}",
+            first_name=f"Load{index}",
+            last_name="Tester",
+            password=password_hash,
+            wallet_pin=pin_hash,
+            user_type="Customer",
+            is_active=True,
+            is_activated=True,
+            country="Nigeria",
+        )
+        user.save()
+        users.append(user)
+    Wallet.objects.bulk_create(
+        Wallet(user=user, currency=currency, name="Nigeria", balance=Decimal(balance))
+        for user in users
+    )
+    return users
@@ -0,0 +1,107 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.utils import timezone
+
+from amaps.sendmail import PlainEmail, SendMail
+from notificationservice.models import OutboxEmail
+from notificationservice.outbox import drain
+from notificationservice.tasks import drain_outbox
+
+
+class FlakyBackend(EmailBackend):
+    """Locmem backend that counts connections and rejects one address"""
+
+    opened = 0
+    reject = "bounce@example.com"
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any(self.reject in message.to for message in messages):
+            raise ConnectionError("451 try again later")
+        return super().send_messages(messages)
+
+
+@pytest.fixture
+def backend():
+    FlakyBackend.opened = 0
+    with mock.patch("notificationservice.outbox.get_connection", FlakyBackend):
+        yield FlakyBackend
+
+
+@pytest.mark.django_db
+class TestOutbox:
+    def test_views_enqueue_instead_of_sending(self):
+        SendMail("New Device Login Notification", "<p>Hello</p>", "user@example.com")
+        PlainEmail("Your OTP code is 123456", "user@example.com", "OjaPay: Your OTP has arrived.")
+        assert mail.outbox == []
+        assert list(OutboxEmail.objects.values_list("subject", "status")) == [
+            ("New Device Login Notification", OutboxEmail.PENDING),
+            ("OjaPay: Your OTP has arrived.", OutboxEmail.PENDING),
+        ]
+
+    def test_drain_sends_every_batch_over_one_connection(self, backend):
+        for number in range(5):
+            SendMail(f"Message {number}", "<p>Hello</p>", f"user{number}@example.com")
+        assert drain_outbox() == {"sent": 5, "retrying": 0, "failed": 0}
+        assert backend.opened == 1
+        assert [message.subject for message in mail.outbox] == [
+            f"Message {number}" for number in range(5)
+        ]
+        assert mail.outbox[0].content_subtype == "html"
+        assert not OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists()
+        # Nothing left to claim
+        assert drain(batch_size=2) == {"sent": 0, "retrying": 0, "failed": 0}
+
+    def test_failures_back_off_then_give_up(self, backend, settings):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        SendMail("Hello", "<p>Hello</p>", "bounce@example.com")
+        SendMail("Hello", "<p>Hello</p>", "user@example.com")
+        assert drain() == {"sent": 1, "retrying": 1, "failed": 0}
+        row = OutboxEmail.objects.get(to="bounce@example.com")
+        assert (row.status, row.attempts) == (OutboxEmail.PENDING, 1)
+        assert "451" in row.last_error and row.available_at > timezone.now()
+        # Not due again until the backoff has passed
+        assert drain() == {"sent": 0, "retrying": 0, "failed": 0}
+
+        later = timezone.now() + timedelta(minutes=5)
+        with mock.patch("notificationservice.outbox.timezone.now", return_value=later):
+            assert drain() == {"sent": 0, "retrying": 0, "failed": 1}
+        assert OutboxEmail.objects.get(to="bounce@example.com").status == OutboxEmail.FAILED
+
+    def test_abandoned_claims_are_picked_up_after_the_lease(self, backend):
+        SendMail("Hello", "<p>Hello</p>", "user@example.com")
+        OutboxEmail.objects.update(
+            status=OutboxEmail.SENDING, available_at=timezone.now() + timedelta(minutes=5)
+        )
+        assert drain()["sent"] == 0
+        OutboxEmail.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        assert drain()["sent"] == 1
+
+    def test_unreachable_mail_server_schedules_claimed_rows_for_retry(self, backend, settings):
+        settings.EMAIL_OUTBOX_BATCH_SIZE = 2
+        for number in range(3):
+            SendMail(f"Message {number}", "<p>Hello</p>", f"user{number}@example.com")
+        with mock.patch.object(
+            FlakyBackend, "open", side_effect=ConnectionRefusedError("connection refused")
+        ):
+            assert drain() == {"sent": 0, "retrying": 2, "failed": 0}
+        claimed = OutboxEmail.objects.filter(attempts=1)
+        assert claimed.count() == 2
+        assert not claimed.exclude(status=OutboxEmail.PENDING).exists()
+        assert "refused" in claimed.first().last_error
+        # The batch after the failure was never claimed
+        assert OutboxEmail.objects.get(attempts=0).status == OutboxEmail.PENDING
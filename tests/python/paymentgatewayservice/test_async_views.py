@@ -0,0 +1,50 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import asyncio
+import json
+
+from django.test import RequestFactory
+
+from paymentgatewayservice import async_views
+from paymentgatewayservice.simulator import SimulatorThread
+from utils.http import async_gateway
+
+
+async def post(view_class, body):
+    request = RequestFactory().post("/", data=json.dumps(body), content_type="application/json")
+    try:
+        return await view_class.as_view()(request)
+    finally:
+        await async_gateway.close()
+
+
+class TestAsyncGatewayViews:
+    def test_relays_gateway_response(self, settings):
+        """
+        The async view forwards the built call and relays the JSON body.
+        """
+        with SimulatorThread() as simulator:
+            settings.CORALPAY_PAYDIRECT_URL = (
+                f"{simulator.url}/paywithtransfer/v1/directpaywithaccount/apis/onetimepayment/"
+            )
+            response = asyncio.run(
+                post(async_views.DirectPay, {"amount": "50", "firstname": "Ada"})
+            )
+        assert response.status_code == 200
+        body = json.loads(response.content)
+        assert body["status"] == "success"
+        assert body["response"]["responseHeader"]["responseCode"] == "00"
+
+    def test_unreachable_gateway_returns_error(self, settings):
+        """
+        Connection failures surface as a 503 instead of an unhandled exception.
+        """
+        settings.CORALPAY_USSD_REFUND_URL = "http://127.0.0.1:9/refund/"
+        response = asyncio.run(post(async_views.Refund, {"amount": "50"}))
+        assert response.status_code == 503
+        assert json.loads(response.content)["status"] == "error"
@@ -0,0 +1,84 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import pytest
+import requests
+
+from paymentgatewayservice.simulator import (
+    GATEWAY_URL_SETTINGS,
+    Behaviour,
+    SimulatorConfig,
+    SimulatorThread,
+    gateway_url_overrides,
+)
+from utils.api import CoralPay, Paystack, coralpay_tokens
+
+
+@pytest.fixture
+def simulator(settings):
+    config = SimulatorConfig(routes={"paystack.banks": Behaviour(error_rate=1.0)}, seed=7)
+    with SimulatorThread(config) as running:
+        current = {name: getattr(settings, name, None) for name in GATEWAY_URL_SETTINGS}
+        for name, value in gateway_url_overrides(running.url, current).items():
+            setattr(settings, name, value)
+        coralpay_tokens.invalidate()
+        yield running
+    coralpay_tokens.invalidate()
+
+
+class TestGatewaySimulator:
+    def test_wallet_to_bank_flow(self, simulator):
+        """
+        The Paystack payout calls used by WalletToBankOTPValidation succeed end to end.
+        """
+        resolved = Paystack.resolveAccount("058", "0123456789")
+        assert resolved["data"]["account_name"] == "SIMULATED CUSTOMER 6789"
+        recipient = Paystack.init_transfer_rec(
+            resolved["data"]["account_name"], "0123456789", "058"
+        )
+        transfer = Paystack.init_transfer(
+            recipient["data"]["recipient_code"], "10000", "REF1", "test"
+        )
+        assert transfer["data"]["status"] == "otp"
+        finalized = Paystack.finalize_transfer(transfer["data"]["transfer_code"])
+        assert finalized["data"]["status"] == "success"
+
+    def test_deposit_flow(self, simulator):
+        """
+        A CoralPay payment invoked on the simulator verifies with the invoked amount.
+        """
+        coralpay = CoralPay()
+        invoked = coralpay.invoke_payment(
+            "a@example.com",
+            "Ada L",
+            "0800",
+            "uid",
+            "title",
+            "desc",
+            "TRACE1",
+            "PROD1",
+            "2500.00",
+            "NGN",
+            "http://x",
+        )
+        assert invoked["traceId"] == "TRACE1"
+        verified = coralpay.verify_payment("TRACE1")
+        assert verified["responseMessage"] == "Successful"
+        assert verified["amount"] == 2500.0
+
+    def test_route_behaviour_and_stats(self, simulator):
+        """
+        Per-route error rates apply and are counted in the stats endpoint.
+        """
+        response = requests.get(f"{simulator.url}/paystack/bank", timeout=5)
+        assert response.status_code == 500
+        stats = requests.get(f"{simulator.url}/__simulator__/stats", timeout=5).json()
+        assert stats["routes"]["paystack.banks"] == {"requests": 1, "errors": 1, "timeouts": 0}
+
+    def test_rejects_unknown_latency_distribution(self):
+        with pytest.raises(ValueError):
+            SimulatorConfig.from_dict({"default": {"latency": "pareto:1"}})
@@ -0,0 +1,122 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection, connections
+
+from transactions import engine
+from transactions.models import WalletTransaction
+from userservice.models import Users
+from utils.metrics import metrics
+from walletservice.models import Wallet
+
+
+def make_wallet(index, balance):
+    user = Users.objects.create_user(
+        username=f"engine{index}",
+        email=f"engine{index}@example.com",
+        password="testpassword",
+        phone_number=f"0801{index:07d}",
+    )
+    return Wallet.objects.create(user=user, currency="NGN", balance=Decimal(balance))
+
+
+@pytest.mark.django_db
+class TestTransfer:
+    def test_moves_funds_and_records_both_legs(self):
+        """
+        Balances move atomically and one ledger row is written per leg.
+        """
+        sender, recipient = make_wallet(1, "100.00"), make_wallet(2, "5.00")
+        result = engine.transfer(sender.id, recipient.id, "40.00", reference="ref-1", note="rent")
+
+        sender.refresh_from_db()
+        recipient.refresh_from_db()
+        assert sender.balance == Decimal("60.00")
+        assert recipient.balance == Decimal("45.00")
+        entries = WalletTransaction.objects.filter(reference="ref-1").order_by("id")
+        assert [(e.balance_before, e.balance_after) for e in entries] == [
+            (Decimal("100.00"), Decimal("60.00")),
+            (Decimal("5.00"), Decimal("45.00")),
+        ]
+        assert result.sender.balance_after == Decimal("60.00")
+
+    def test_insufficient_funds_changes_nothing(self):
+        """
+        An overdraft is refused without touching either wallet or the ledger.
+        """
+        sender, recipient = make_wallet(1, "10.00"), make_wallet(2, "0.00")
+        with pytest.raises(engine.InsufficientFunds):
+            engine.transfer(sender.id, recipient.id, "10.00", fee="0.01")
+
+        sender.refresh_from_db()
+        recipient.refresh_from_db()
+        assert (sender.balance, recipient.balance) == (Decimal("10.00"), Decimal("0.00"))
+        assert not WalletTransaction.objects.exists()
+
+    def test_debit_and_credit_record_lock_wait(self):
+        metrics.reset()
+        wallet = make_wallet(1, "20.00")
+        assert engine.credit(wallet.id, "5.00").balance_after == Decimal("25.00")
+        assert engine.debit(wallet.id, "25.00").balance_after == Decimal("0.00")
+        with pytest.raises(engine.InsufficientFunds):
+            engine.debit(wallet.id, "0.01")
+        assert metrics.snapshot("wallet.")["timers"]["wallet.lock_wait"]["count"] == 3
+
+
+@pytest.mark.skipif(
+    not connection.features.has_select_for_update,
+    reason="needs a database with row locks (e.g. PostgreSQL)",
+)
+@pytest.mark.django_db(transaction=True)
+class TestTransferUnderContention:
+    def test_parallel_transfers_conserve_money(self):
+        """
+        120 concurrent transfers around a ring of wallets, with one hot
+        wallet that cannot cover all of its debits, never lose or create
+        money and never overdraw.
+        """
+        wallets = [make_wallet(index, "1000.00") for index in range(8)]
+        hot = make_wallet(99, "50.00")
+        ids = [wallet.id for wallet in wallets]
+        jobs = [(ids[i % 8], ids[(i + 1) % 8], Decimal("7.00")) for i in range(100)]
+        jobs += [(hot.id, ids[i % 8], Decimal("5.00")) for i in range(20)]
+        outcomes = {"ok": 0, "refused": 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(jobs))
+
+        def run(sender_id, recipient_id, amount):
+            barrier.wait()
+            try:
+                engine.transfer(sender_id, recipient_id, amount)
+                key = "ok"
+            except engine.InsufficientFunds:
+                key = "refused"
+            finally:
+                connections.close_all()
+            with lock:
+                outcomes[key] += 1
+
+        threads = [threading.Thread(target=run, args=job) for job in jobs]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        balances = dict(Wallet.objects.values_list("id", "balance"))
+        assert sum(balances.values()) == Decimal("8050.00")
+        assert min(balances.values()) >= 0
+        assert balances[hot.id] == Decimal("0.00")
+        assert outcomes == {"ok": 110, "refused": 10}
+        assert WalletTransaction.objects.count() == 2 * 110
+        assert len(jobs) / elapsed > 20
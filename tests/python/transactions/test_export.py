@@ -0,0 +1,115 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transactions import export
+from transactions.models import Deposit, Transaction, WalletTransaction
+from userservice.models import Users
+from utils.helpers import parse_bound
+from walletservice.models import Wallet
+
+
+@pytest.fixture
+def tables():
+    """Twelve rows across the three tables, one per day from 2024-01-01, interleaved"""
+    user = Users.objects.create_user(
+        username="exporter",
+        email="exporter@example.com",
+        password="testpassword",
+        phone_number="08030000001",
+    )
+    wallet = Wallet.objects.create(user=user, currency="NGN")
+    first = timezone.make_aware(datetime(2024, 1, 1, 12))
+    models = [Deposit, WalletTransaction, Transaction]
+    for day in range(12):
+        model = models[day % 3]
+        owner = {"sender_wallet": wallet} if model is WalletTransaction else {"user": user}
+        row = model.objects.create(
+            amount=Decimal(day), reference=f"ref-{day}", note='say "hi", ok', **owner
+        )
+        model.objects.filter(pk=row.pk).update(date=first + timedelta(days=day))
+    return user
+
+
+@pytest.mark.django_db
+class TestExport:
+    def test_ndjson_rows_are_merged_oldest_first(self, tables):
+        lines = b"".join(export.export("ndjson", chunk_size=2)).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row["reference"] for row in rows] == [f"ref-{day}" for day in range(12)]
+        assert rows[1]["kind"] == "transfer" and rows[1]["user_id"] is None
+        assert rows[0]["amount"] == "0.00"
+
+    def test_csv_with_date_range_and_gzip(self, tables):
+        start = parse_bound("2024-01-03")
+        end = parse_bound("2024-01-05", end=True)
+        body = gzip.decompress(b"".join(export.export("csv", start, end, compress=True)))
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        assert [row["reference"] for row in rows] == ["ref-2", "ref-3", "ref-4"]
+        assert rows[0]["note"] == 'say "hi", ok'
+
+    def test_rows_are_produced_lazily(self, tables):
+        """
+        The first row comes out before the tables have been read to the end.
+        """
+        rows = export.stream_rows(chunk_size=1)
+        assert next(rows)["reference"] == "ref-0"
+
+    def test_rejects_bad_input(self):
+        with pytest.raises(ValueError):
+            parse_bound("yesterday")
+        with pytest.raises(ValueError):
+            export.export("xml")
+
+
+@pytest.mark.django_db
+class TestExportEndpoints:
+    def test_view_streams_an_attachment(self, tables):
+        tables.is_staff = True
+        tables.save()
+        client = APIClient()
+        client.force_authenticate(tables)
+        response = client.get(
+            "/transaction/all-transactions/export/", {"output": "csv", "start": "2024-01-11"}
+        )
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Disposition"] == 'attachment; filename="transactions.csv"'
+        body = b"".join(response.streaming_content).decode()
+        assert body.splitlines()[0].startswith("kind,id,date")
+        assert len(body.splitlines()) == 3
+
+    def test_view_is_staff_only(self, tables):
+        client = APIClient()
+        client.force_authenticate(tables)
+        response = client.get("/transaction/all-transactions/export/")
+        assert response.status_code == 403
+
+    def test_command_writes_a_file(self, tables, tmp_path):
+        target = tmp_path / "out.ndjson.gz"
+        call_command(
+            "export_transactions",
+            "--gzip",
+            "--end",
+            "2024-01-02",
+            "-o",
+            str(target),
+            stderr=io.StringIO(),
+        )
+        lines = gzip.decompress(target.read_bytes()).decode().splitlines()
+        assert [json.loads(line)["reference"] for line in lines] == ["ref-0", "ref-1"]
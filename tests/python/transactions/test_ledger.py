@@ -0,0 +1,126 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transactions.ledger import InvalidCursor, ledger_page
+from transactions.models import Deposit, Transaction, WalletTransaction
+from userservice.models import Users
+from walletservice.models import Wallet
+
+
+def make_user(index):
+    user = Users.objects.create_user(
+        username=f"ledger{index}",
+        email=f"ledger{index}@example.com",
+        password="testpassword",
+        phone_number=f"0802{index:07d}",
+    )
+    return user, Wallet.objects.create(user=user, currency="NGN")
+
+
+@pytest.fixture
+def history():
+    """A user with 30 ledger rows spread across all three tables, some sharing a timestamp"""
+    user, wallet = make_user(1)
+    other, other_wallet = make_user(2)
+    savings = Wallet.objects.create(user=user, currency="USD")
+    start = timezone.now() - timedelta(days=30)
+    for index in range(10):
+        when = start + timedelta(hours=index // 2)
+        deposit = Deposit.objects.create(user=user, amount=Decimal(index), reference=f"dep-{index}")
+        withdrawal = Transaction.objects.create(
+            user=user, amount=Decimal(index), reference=f"wd-{index}"
+        )
+        sender, recipient = (wallet, other_wallet) if index % 2 else (other_wallet, wallet)
+        transfer = WalletTransaction.objects.create(
+            sender_wallet=sender,
+            recipient_wallet=recipient,
+            amount=Decimal(index),
+            reference=f"tr-{index}",
+        )
+        Deposit.objects.filter(pk=deposit.pk).update(date=when)
+        Transaction.objects.filter(pk=withdrawal.pk).update(date=when)
+        WalletTransaction.objects.filter(pk=transfer.pk).update(date=when)
+    # Between the user's own wallets: listed once, not once per side
+    own = WalletTransaction.objects.create(
+        sender_wallet=wallet, recipient_wallet=savings, reference="own"
+    )
+    # Someone else's activity never shows up
+    Deposit.objects.create(user=other, reference="foreign")
+    return user, own
+
+
+@pytest.mark.django_db
+class TestLedgerPage:
+    def test_pages_cover_the_history_once_in_order(self, history):
+        user, _ = history
+        seen, cursor = [], None
+        while True:
+            rows, cursor = ledger_page(user, cursor=cursor, page_size=7)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        keys = [(row["date"], row["kind"], row["id"]) for row in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert len(set(keys)) == len(keys) == 31
+        assert "foreign" not in {row["reference"] for row in seen}
+        assert [row["reference"] for row in seen].count("own") == 1
+
+    def test_page_cost_does_not_grow_with_depth(self, history):
+        """
+        Each page is one query for the user's wallets plus one UNION ALL.
+        """
+        user, _ = history
+        _, cursor = ledger_page(user, page_size=5)
+        for _ in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                rows, cursor = ledger_page(user, cursor=cursor, page_size=5)
+            assert len(rows) == 5
+            assert len(queries) == 2
+            assert "UNION ALL" in queries[-1]["sql"]
+
+    def test_search_applies_to_every_branch(self, history):
+        user, _ = history
+        rows, cursor = ledger_page(user, search="-3")
+        assert sorted(row["reference"] for row in rows) == ["dep-3", "tr-3", "wd-3"]
+        assert cursor is None
+
+    def test_rejects_a_tampered_cursor(self, history):
+        user, _ = history
+        with pytest.raises(InvalidCursor):
+            ledger_page(user, cursor="bm90LWpzb24=")
+
+
+@pytest.mark.django_db
+class TestCombinedTransactionView:
+    def test_returns_a_page_and_a_next_link(self, history):
+        user, _ = history
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/transaction/transactions/", {"page_size": 20})
+        assert response.status_code == 200
+        assert len(response.data["results"]) == 20
+        assert "cursor=" in response.data["next"]
+
+        response = client.get(response.data["next"])
+        assert len(response.data["results"]) == 11
+        assert response.data["next"] is None
+
+    def test_bad_cursor_is_a_client_error(self, history):
+        user, _ = history
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get("/transaction/transactions/", {"cursor": "nope"})
+        assert response.status_code == 400
@@ -0,0 +1,325 @@
+import os
+import re
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+import requests
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from notificationservice.models import OutboxEmail
+from paymentgatewayservice.simulator import (
+    GATEWAY_URL_SETTINGS,
+    SimulatorThread,
+    gateway_url_overrides,
+)
+from transactions import payouts as bulk_payouts
+from transactions.models import PayoutBatch, PayoutItem, Transaction
+from transactions.tasks import process_payout_batch, sweep_payout_batches
+from userservice.models import ResolvedRecipient, Users
+from utils.api import Paystack
+from walletservice.models import Wallet
+
+URL = "/api/v1/user/wallet/bulk-payouts/"
+
+
+@pytest.fixture
+def simulator(settings):
+    with SimulatorThread() as running:
+        current = {name: getattr(settings, name, None) for name in GATEWAY_URL_SETTINGS}
+        for name, value in gateway_url_overrides(running.url, current).items():
+            setattr(settings, name, value)
+        yield running
+
+
+@pytest.fixture
+def merchant():
+    user = Users.objects.create(
+        username="merchant",
+        email="merchant@example.com",
+        phone_number="+2348010000001",
+        wallet_pin=make_password("1234"),
+    )
+    wallet = Wallet.objects.create(user=user, currency="NGN", balance=Decimal("1000.00"))
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, wallet
+
+
+def payouts(count, amount="10.00"):
+    return [
+        {"bank_code": "058", "account_number": f"01234567{index:02d}", "amount": amount}
+        for index in range(count)
+    ]
+
+
+def prepare(client, items, pin="1234"):
+    response = client.post(
+        f"{URL}prepare/", {"wallet_pin": pin, "currency": "NGN", "payouts": items}, format="json"
+    )
+    if response.status_code != 200:
+        return response, None
+    return response, re.search(r"OTP code is (\d+)", OutboxEmail.objects.latest("id").body).group(1)
+
+
+def create(client, items, pin="1234"):
+    response, otp = prepare(client, items, pin)
+    if otp is None:
+        return response
+    return client.post(
+        URL, {"wallet_pin": pin, "currency": "NGN", "payouts": items, "otp": otp}, format="json"
+    )
+
+
+def seed_recipients(count):
+    for index in range(count):
+        ResolvedRecipient.objects.create(
+            bank_code="058",
+            account_number=f"01234567{index:02d}",
+            account_name="ADA",
+            recipient_code=f"RCP_{index}",
+        )
+
+
+def accept(transfers, currency):
+    return {
+        "status": True,
+        "data": [
+            {"reference": transfer["reference"], "transfer_code": "TRF_x", "status": "pending"}
+            for transfer in transfers
+        ],
+    }
+
+
+def later(**delta):
+    return timezone.now() + timedelta(**delta)
+
+
+def route_requests(simulator, name):
+    stats = requests.get(f"{simulator.url}/__simulator__/stats", timeout=5).json()
+    return stats["routes"].get(name, {}).get("requests", 0)
+
+
+@pytest.mark.django_db
+class TestBulkPayouts:
+    def test_batch_is_debited_once_and_submitted_in_chunks(self, merchant, simulator, settings):
+        settings.PAYOUT_CHUNK_SIZE = 2
+        client, wallet = merchant
+        response = create(client, payouts(5))
+        assert response.status_code == 202
+        reference = response.data["data"]["reference"]
+        wallet.refresh_from_db()
+        assert wallet.balance == Decimal("950.00")
+        assert Transaction.objects.get(reference=reference).amount == Decimal("50.00")
+
+        batch = PayoutBatch.objects.get(reference=reference)
+        assert process_payout_batch(batch.id) == {PayoutItem.SUBMITTED: 5}
+        assert route_requests(simulator, "paystack.bulk_transfer") == 3
+        # Already processed
+        assert process_payout_batch(batch.id) == {}
+
+        response = client.get(f"{URL}{reference}/")
+        assert response.data["response"]["status"] == PayoutBatch.COMPLETED
+        assert response.data["response"]["summary"] == {PayoutItem.SUBMITTED: 5}
+        item = response.data["response"]["items"][0]
+        assert item["transfer_code"].startswith("TRF_") and item["provider_status"] == "pending"
+        assert item["account_name"] == "SIMULATED CUSTOMER 6700"
+
+        # The same accounts again: recipient codes come from the cache
+        batch = PayoutBatch.objects.get(
+            reference=create(client, payouts(5)).data["data"]["reference"]
+        )
+        process_payout_batch(batch.id)
+        assert route_requests(simulator, "paystack.resolve_account") == 5
+        assert route_requests(simulator, "paystack.transfer_recipient") == 5
+
+    def test_failed_items_are_refunded_in_one_credit(self, merchant):
+        client, wallet = merchant
+        batch = PayoutBatch.objects.get(
+            reference=create(client, payouts(3)).data["data"]["reference"]
+        )
+
+        def resolve(bank_code, account_number):
+            if account_number.endswith("01"):
+                return {"status": False, "message": "Could not resolve account name."}
+            return {"status": True, "data": {"account_name": "ADA OKAFOR"}}
+
+        with mock.patch.object(Paystack, "resolveAccount", side_effect=resolve), mock.patch.object(
+            Paystack,
+            "init_transfer_rec",
+            return_value={"status": True, "data": {"recipient_code": "RCP_1"}},
+        ), mock.patch.object(Paystack, "bulk_transfer", side_effect=accept):
+            assert process_payout_batch(batch.id) == {PayoutItem.SUBMITTED: 2, PayoutItem.FAILED: 1}
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert (batch.status, batch.refunded_amount) == (PayoutBatch.PARTIAL, Decimal("10.00"))
+        assert wallet.balance == Decimal("980.00")
+        assert batch.items.get(status=PayoutItem.FAILED).error == "Could not resolve account name."
+        assert Transaction.objects.get(reference=f"{batch.reference}-refund").amount == Decimal(
+            "10.00"
+        )
+
+    def test_unanswered_chunks_are_left_unconfirmed_until_settled(self, merchant):
+        client, wallet = merchant
+        batch = PayoutBatch.objects.get(
+            reference=create(client, payouts(3)).data["data"]["reference"]
+        )
+        seed_recipients(3)
+
+        def verify(reference):
+            if reference.endswith("1"):
+                return {"status": True, "data": {"transfer_code": "TRF_1", "status": "success"}}
+            if reference.endswith("2"):
+                raise requests.ReadTimeout("timed out")
+            return {"status": False, "message": "Transfer not found"}
+
+        with mock.patch.object(
+            Paystack, "bulk_transfer", side_effect=requests.ReadTimeout("timed out")
+        ), mock.patch.object(Paystack, "verify_transfer", side_effect=verify):
+            counts = process_payout_batch(batch.id)
+        # Paystack may not have queued a transfer it does not know yet: nothing is refunded
+        assert counts == {PayoutItem.SUBMITTED: 1, PayoutItem.UNCONFIRMED: 2}
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert (batch.status, batch.completed_at) == (PayoutBatch.UNCONFIRMED, None)
+        assert wallet.balance == Decimal("970.00")
+
+        # Too early to settle
+        assert sweep_payout_batches() == {"requeued": 0, "resumed": 0, "confirmed": 0}
+
+        def verify_later(reference):
+            if reference.endswith("2"):
+                return {"status": True, "data": {"transfer_code": "TRF_2", "status": "success"}}
+            return {"status": False, "message": "Transfer not found"}
+
+        with mock.patch.object(Paystack, "verify_transfer", side_effect=verify_later):
+            assert bulk_payouts.sweep(later(hours=1))["confirmed"] == 1
+            assert bulk_payouts.sweep(later(hours=2))["confirmed"] == 0
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert (batch.status, batch.refunded_amount) == (PayoutBatch.PARTIAL, Decimal("10.00"))
+        assert wallet.balance == Decimal("980.00")
+        assert dict(batch.items.values_list("reference", "status")) == {
+            f"{batch.reference}-00001": PayoutItem.SUBMITTED,
+            f"{batch.reference}-00002": PayoutItem.SUBMITTED,
+            f"{batch.reference}-00003": PayoutItem.FAILED,
+        }
+
+    def test_sweep_requeues_batches_whose_task_was_lost(self, merchant):
+        client, wallet = merchant
+        batch = PayoutBatch.objects.get(
+            reference=create(client, payouts(2)).data["data"]["reference"]
+        )
+        seed_recipients(2)
+        with mock.patch.object(
+            process_payout_batch, "delay", side_effect=ConnectionError("broker down")
+        ):
+            bulk_payouts.queue(batch.id)
+        batch.refresh_from_db()
+        assert batch.status == PayoutBatch.QUEUED
+
+        with mock.patch.object(
+            process_payout_batch, "delay", side_effect=process_payout_batch
+        ), mock.patch.object(Paystack, "bulk_transfer", side_effect=accept):
+            assert bulk_payouts.sweep()["requeued"] == 0
+            assert bulk_payouts.sweep(later(hours=1))["requeued"] == 1
+            assert bulk_payouts.sweep(later(hours=1))["requeued"] == 0
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert batch.status == PayoutBatch.COMPLETED
+        assert batch.items.filter(status=PayoutItem.SUBMITTED).count() == 2
+        assert wallet.balance == Decimal("980.00")
+
+    def test_sweep_resumes_batches_whose_worker_died(self, merchant, settings):
+        settings.PAYOUT_CHUNK_SIZE = 1
+        client, wallet = merchant
+        batch = PayoutBatch.objects.get(
+            reference=create(client, payouts(3)).data["data"]["reference"]
+        )
+        seed_recipients(3)
+
+        # The worker dies while the second chunk is on the wire
+        first = accept([{"reference": f"{batch.reference}-00001"}], "NGN")
+        with mock.patch.object(
+            Paystack, "bulk_transfer", side_effect=[first, SystemExit]
+        ), pytest.raises(SystemExit):
+            process_payout_batch(batch.id)
+        batch.refresh_from_db()
+        assert batch.status == PayoutBatch.PROCESSING
+        assert process_payout_batch(batch.id) == {}
+
+        with mock.patch.object(Paystack, "bulk_transfer", side_effect=accept) as bulk:
+            assert bulk_payouts.sweep(later(minutes=20)) == {
+                "requeued": 0,
+                "resumed": 1,
+                "confirmed": 0,
+            }
+            assert bulk_payouts.sweep(later(minutes=20))["resumed"] == 0
+        # Only the chunk that never went out is sent again
+        assert [call.args[0][0]["reference"] for call in bulk.call_args_list] == [
+            f"{batch.reference}-00003"
+        ]
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert batch.status == PayoutBatch.UNCONFIRMED
+        assert (
+            batch.items.get(reference=f"{batch.reference}-00002").status == PayoutItem.UNCONFIRMED
+        )
+        assert wallet.balance == Decimal("970.00")
+
+        missing = {"status": False, "message": "Transfer not found"}
+        with mock.patch.object(Paystack, "verify_transfer", return_value=missing):
+            assert bulk_payouts.sweep(later(hours=1))["confirmed"] == 1
+            assert bulk_payouts.sweep(later(hours=2))["confirmed"] == 0
+        batch.refresh_from_db()
+        wallet.refresh_from_db()
+        assert (batch.status, batch.refunded_amount) == (PayoutBatch.PARTIAL, Decimal("10.00"))
+        assert wallet.balance == Decimal("980.00")
+        assert (
+            Transaction.objects.filter(
+                order=batch.reference, transaction_type="Bulk Payout Refund"
+            ).count()
+            == 1
+        )
+
+    def test_rejects_bad_requests(self, merchant):
+        client, wallet = merchant
+        assert create(client, payouts(1), pin="0000").status_code == 400
+        assert (
+            create(
+                client, [{"bank_code": "058", "account_number": "123", "amount": "5"}]
+            ).status_code
+            == 400
+        )
+        assert create(client, []).status_code == 400
+        response = create(client, payouts(2, amount="600.00"))
+        assert (response.status_code, response.data["response"]) == (
+            400,
+            "Insufficient fund. Please recharge and try again",
+        )
+        wallet.refresh_from_db()
+        assert wallet.balance == Decimal("1000.00")
+        assert not PayoutBatch.objects.exists()
+
+    def test_otp_approves_only_the_prepared_batch(self, merchant):
+        client, wallet = merchant
+        items = payouts(2)
+        _, otp = prepare(client, items)
+        body = {"wallet_pin": "1234", "currency": "NGN", "payouts": items}
+        assert client.post(URL, body, format="json").status_code == 400
+        changed = {**body, "payouts": payouts(2, amount="20.00"), "otp": otp}
+        assert client.post(URL, changed, format="json").status_code == 400
+        assert client.post(URL, {**body, "otp": otp}, format="json").status_code == 202
+        assert client.post(URL, {**body, "otp": otp}, format="json").status_code == 400
+        wallet.refresh_from_db()
+        assert wallet.balance == Decimal("980.00")
+        assert PayoutBatch.objects.count() == 1
@@ -0,0 +1,77 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from transactions.models import Deposit, Transaction, WalletTransaction
+from userservice.models import Users
+from walletservice.models import Wallet
+
+
+def make_history(count, start=0):
+    for index in range(start, start + count):
+        user = Users.objects.create_user(
+            username=f"lean{index}",
+            email=f"lean{index}@example.com",
+            password="testpassword",
+            phone_number=f"0803{index:07d}",
+            bvn="12345678901",
+        )
+        wallet = Wallet.objects.create(user=user, currency="NGN")
+        Deposit.objects.create(user=user, amount=Decimal("10.00"), reference=f"dep-{index}")
+        Transaction.objects.create(user=user, amount=Decimal("5.00"), reference=f"wd-{index}")
+        WalletTransaction.objects.create(
+            sender_wallet=wallet, recipient_wallet=wallet, amount=Decimal("1.00")
+        )
+
+
+def queries_for(client, url, **params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == 200
+    return len(queries), response
+
+
+@pytest.mark.django_db
+class TestLeanLists:
+    def test_deposit_list_is_compact_and_constant_cost(self):
+        client = APIClient()
+        make_history(2)
+        few, _ = queries_for(client, "/transaction/deposit/")
+        make_history(10, start=2)
+        many, response = queries_for(client, "/transaction/deposit/")
+        assert len(response.data["data"]) == 12
+        assert many == few
+        row = response.data["data"][0]
+        assert "bvn" not in row["user"] and set(row["user"]) == {
+            "id",
+            "username",
+            "first_name",
+            "last_name",
+            "business_name",
+        }
+
+    def test_fields_selects_a_sparse_payload(self):
+        make_history(3)
+        _, response = queries_for(
+            APIClient(), "/transaction/deposit/", fields="reference,amount,nope"
+        )
+        assert all(set(row) == {"reference", "amount"} for row in response.data["data"])
+
+    def test_all_transactions_serializes_each_kind(self):
+        make_history(3)
+        count, response = queries_for(APIClient(), "/transaction/all-transactions/")
+        rows = response.data["results"]
+        assert len(rows) == 9
+        assert {row["reference"] for row in rows if "user" in row} >= {"dep-0", "wd-0"}
+        assert all("sender_wallet" in row for row in rows if "user" not in row)
+        assert count == 3
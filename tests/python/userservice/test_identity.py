@@ -0,0 +1,103 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from userservice.identity import find_user, get_user
+from userservice.models import LoginAttempt, Users
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    return Users.objects.create(
+        username="ada",
+        email="ada@example.com",
+        phone_number="+2348010000001",
+        last_login_ip="10.0.0.1",
+    )
+
+
+@pytest.mark.django_db
+class TestIdentityCache:
+    def test_every_identifier_hits_after_one_lookup(self, user):
+        assert get_user(username="ada").pk == user.pk
+        with CaptureQueriesContext(connection) as queries:
+            assert get_user(username="ada").pk == user.pk
+            assert get_user(email="ada@example.com").pk == user.pk
+            assert get_user(phone_number="+2348010000001").pk == user.pk
+            assert get_user(id=user.pk).pk == user.pk
+        assert len(queries) == 0
+
+    def test_unknown_users_raise_like_the_manager(self, user):
+        with pytest.raises(Users.DoesNotExist):
+            get_user(username="nobody")
+        assert find_user(email="nobody@example.com") is None
+
+    def test_save_invalidates(self, user):
+        get_user(email="ada@example.com")
+        user.first_name = "Ada"
+        user.save()
+        assert get_user(email="ada@example.com").first_name == "Ada"
+
+    def test_changed_identifier_no_longer_resolves(self, user):
+        get_user(email="ada@example.com")
+        user.email = "lovelace@example.com"
+        user.save()
+        get_user(email="lovelace@example.com")
+        with pytest.raises(Users.DoesNotExist):
+            get_user(email="ada@example.com")
+
+    def test_hashes_stay_out_of_the_cache(self, user):
+        user.set_password("s3cret-pass")
+        user.save()
+        get_user(email="ada@example.com")
+        cached = get_user(email="ada@example.com")
+        assert "password" in cached.get_deferred_fields()
+        assert "s3cret" not in str(cache.get(f"userservice:identity:user:{user.pk}"))
+        assert cached.check_password("s3cret-pass")
+
+    def test_saving_a_hit_keeps_fields_it_did_not_change(self, user):
+        get_user(username="ada")
+        Users.objects.filter(pk=user.pk).update(last_login_ip="10.0.0.2")
+        cached = get_user(username="ada")
+        cached.is_activated = True
+        cached.save(update_fields=["is_activated"])
+        user.refresh_from_db()
+        assert (user.is_activated, user.last_login_ip) == (True, "10.0.0.2")
+
+    def test_queryset_updates_invalidate(self, user):
+        get_user(username="ada")
+        LoginAttempt.lock_user("10.0.0.1")
+        assert get_user(username="ada").is_locked
+        LoginAttempt.reset_attempts("10.0.0.1")
+        assert not get_user(username="ada").is_locked
+
+    def test_queryset_updates_invalidate_again_on_commit(
+        self, user, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            LoginAttempt.lock_user("10.0.0.1")
+            # A reader caching the user before the update commits
+            get_user(username="ada")
+        assert callbacks
+        assert cache.get(f"userservice:identity:user:{user.pk}") is None
+
+    def test_only_identifiers_are_accepted(self):
+        with pytest.raises(TypeError):
+            get_user(first_name="Ada")
+        with pytest.raises(TypeError):
+            get_user(email="a@example.com", username="a")
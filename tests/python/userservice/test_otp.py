@@ -0,0 +1,124 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import re
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from notificationservice.models import OutboxEmail
+from userservice import otp as otps
+from userservice.models import OneTimePasscode, Users
+from walletservice.models import Wallet
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestOTPStore:
+    def test_codes_are_single_use_and_scoped(self):
+        code = otps.issue(7, "wallet_transfer", context=3)
+        assert re.fullmatch(r"\d{6}", code)
+        with pytest.raises(otps.OTPExpired):
+            otps.verify(7, "bank_transfer", code, context=3)
+        with pytest.raises(otps.OTPExpired):
+            otps.verify(7, "wallet_transfer", code, context=4)
+        with pytest.raises(otps.OTPExpired):
+            otps.verify(8, "wallet_transfer", code, context=3)
+        assert otps.verify(7, "wallet_transfer", code, context=3)
+        with pytest.raises(otps.OTPExpired):
+            otps.verify(7, "wallet_transfer", code, context=3)
+
+    def test_only_a_digest_is_stored(self):
+        code = otps.issue(7, "signup")
+        stored = OneTimePasscode.objects.get(scope=otps._scope(7, "signup", ""))
+        assert code not in f"{stored.scope}{stored.digest}"
+
+    def test_reissuing_replaces_the_previous_code(self):
+        with mock.patch("userservice.otp.generate", side_effect=["111111", "222222"]):
+            otps.issue(7, "signup")
+            otps.issue(7, "signup")
+        with pytest.raises(otps.OTPInvalid):
+            otps.verify(7, "signup", "111111")
+        assert otps.verify(7, "signup", "222222")
+
+    def test_wrong_guesses_discard_the_code(self, settings):
+        settings.OTP_MAX_ATTEMPTS = 3
+        code = otps.issue(7, "signup", length=4)
+        wrong = f"{(int(code) + 1) % 10000:04d}"
+        for _ in range(3):
+            with pytest.raises(otps.OTPInvalid):
+                otps.verify(7, "signup", wrong)
+        assert not OneTimePasscode.objects.exists()
+        with pytest.raises(otps.OTPExpired):
+            otps.verify(7, "signup", code)
+
+    def test_codes_expire(self):
+        code = otps.issue(7, "signup", ttl=60)
+        later = otps.timezone.now() + otps.timedelta(seconds=61)
+        with mock.patch("userservice.otp.timezone.now", return_value=later):
+            with pytest.raises(otps.OTPExpired):
+                otps.verify(7, "signup", code)
+            assert otps.purge_expired() == 1
+
+    def test_codes_survive_cache_churn(self):
+        code = otps.issue(7, "signup", ttl=24 * 60 * 60)
+        for index in range(400):
+            cache.set(f"churn:{index}", index)
+        assert otps.verify(7, "signup", code)
+
+
+@pytest.mark.django_db
+class TestWalletOTP:
+    def test_transfer_otp_never_writes_the_wallet(self):
+        donor = Users.objects.create(
+            username="donor",
+            email="donor@example.com",
+            phone_number="+2348010000001",
+            wallet_pin=make_password("1234"),
+        )
+        recipient = Users.objects.create(
+            username="recipient", email="recipient@example.com", phone_number="+2348010000002"
+        )
+        Wallet.objects.create(user=donor, currency="NGN", balance=Decimal("100.00"))
+        Wallet.objects.create(user=recipient, currency="NGN", balance=Decimal("0.00"))
+        client = APIClient()
+        client.force_authenticate(donor)
+        payload = {
+            "ojapay_tag": "recipient",
+            "amount": "10.00",
+            "wallet_pin": "1234",
+            "donor_currency": "NGN",
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post("/api/v1/user/wallet/transfer/", payload, format="json")
+        assert response.status_code == 200
+        assert not [query for query in queries if query["sql"].startswith("UPDATE")]
+
+        payload["otp"] = "not-the-code"
+        response = client.post("/api/v1/user/wallet/transfer/validation", payload, format="json")
+        assert (response.status_code, response.data["response"]) == (400, "Invalid OTP")
+
+        payload["otp"] = re.search(
+            r"OTP code is (\d+)", OutboxEmail.objects.latest("id").body
+        ).group(1)
+        response = client.post("/api/v1/user/wallet/transfer/validation", payload, format="json")
+        assert response.status_code == 200
+        response = client.post("/api/v1/user/wallet/transfer/validation", payload, format="json")
+        assert (response.status_code, response.data["response"]) == (400, "OTP expired")
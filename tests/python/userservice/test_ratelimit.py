@@ -0,0 +1,111 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from userservice.models import LoginAttempt, Users
+from userservice.ratelimit import LoginRateLimiter
+from userservice.tasks import record_login_failure, reset_login_attempts
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class TestLoginRateLimiter:
+    def test_locks_the_ip_and_account_at_the_limit(self):
+        limiter = LoginRateLimiter(limit=3, window=900)
+        assert [
+            limiter.register_failure("10.0.0.1", "a@example.com").remaining for _ in range(2)
+        ] == [2, 1]
+        verdict = limiter.register_failure("10.0.0.1", "a@example.com")
+        assert verdict.locked and verdict.remaining == 0
+        assert limiter.is_locked("10.0.0.1")
+        # The account stays locked from another address, and the IP for another account
+        assert limiter.is_locked("10.0.0.2", "A@example.com")
+        assert limiter.is_locked("10.0.0.1", "b@example.com")
+        assert not limiter.is_locked("10.0.0.2", "b@example.com")
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        limiter = LoginRateLimiter(limit=5, window=100)
+        with patch("userservice.ratelimit.time.time", return_value=1000.0):
+            for _ in range(4):
+                limiter.register_failure("10.0.0.1")
+        # A quarter into the next window three quarters of the old count still applies
+        with patch("userservice.ratelimit.time.time", return_value=1125.0):
+            assert limiter.register_failure("10.0.0.1").attempts == 4
+        # Two windows later it has aged out completely
+        with patch("userservice.ratelimit.time.time", return_value=1300.0):
+            assert limiter.register_failure("10.0.0.1").attempts == 1
+
+    def test_reset_reports_whether_there_was_anything_to_clear(self):
+        limiter = LoginRateLimiter(limit=3, window=900)
+        assert limiter.reset("10.0.0.1", "a@example.com") is False
+        limiter.register_failure("10.0.0.1", "a@example.com")
+        assert limiter.reset("10.0.0.1", "a@example.com") is True
+        assert limiter.register_failure("10.0.0.1", "a@example.com").attempts == 1
+
+
+@pytest.mark.django_db
+class TestLoginLockout:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = Users.objects.create(
+            email="user@example.com",
+            phone_number="+2348012345678",
+            password=make_password("password123"),
+        )
+
+    @patch("userservice.views.audit")
+    def test_failures_are_counted_in_the_cache_and_audited_asynchronously(self, audit):
+        data = {"email": self.user.email, "password": "wrong"}
+        responses = [self.client.post(reverse("login"), data) for _ in range(4)]
+        assert [response.status_code for response in responses] == [401, 401, 401, 400]
+        assert "locked for 15 minutes" in responses[2].data["response"]
+        assert LoginAttempt.objects.count() == 0
+        assert [call.args[1:] for call in audit.call_args_list] == [
+            ("127.0.0.1", self.user.email, 1, False),
+            ("127.0.0.1", self.user.email, 2, False),
+            ("127.0.0.1", self.user.email, 3, True),
+        ]
+        # Locked out before the password is even checked
+        with patch("userservice.views.authenticate") as authenticate:
+            response = self.client.post(
+                reverse("login"), {"email": self.user.email, "password": "password123"}
+            )
+        assert response.status_code == 400
+        authenticate.assert_not_called()
+
+
+@pytest.mark.django_db
+class TestLoginAuditTasks:
+    def test_failures_are_recorded_and_lock_accounts_seen_on_the_ip(self):
+        user = Users.objects.create(
+            email="user@example.com", phone_number="+2348012345678", last_login_ip="10.0.0.1"
+        )
+        record_login_failure("10.0.0.1", "someone@example.com", 1, False)
+        record_login_failure("10.0.0.1", "someone@example.com", 2, False)
+        attempt = LoginAttempt.objects.get(ip_address="10.0.0.1")
+        assert attempt.attempts == 2 and attempt.user_id == user.id
+
+        record_login_failure("10.0.0.1", "user@example.com", 3, True)
+        user.refresh_from_db()
+        assert user.is_locked
+
+        reset_login_attempts("10.0.0.1")
+        user.refresh_from_db()
+        assert LoginAttempt.objects.get(ip_address="10.0.0.1").attempts == 0
+        assert not user.is_locked
@@ -0,0 +1,189 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+import requests
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from transactions.models import Transaction
+from userservice import otp as otps
+from userservice import recipients
+from userservice.models import ResolvedRecipient, Users
+from utils.api import Paystack
+from utils.resilience import CircuitOpenError
+from walletservice.models import Wallet
+
+RESOLVED = {"status": True, "data": {"account_name": "ADA OKAFOR"}}
+REGISTERED = {"status": True, "data": {"recipient_code": "RCP_1"}}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def paystack():
+    with mock.patch.object(
+        Paystack, "resolveAccount", return_value=RESOLVED
+    ) as resolve, mock.patch.object(
+        Paystack, "init_transfer_rec", return_value=REGISTERED
+    ) as register:
+        yield resolve, register
+
+
+@pytest.mark.django_db
+class TestResolve:
+    def test_repeat_lookups_skip_the_gateway(self, paystack):
+        resolve, register = paystack
+        first = recipients.resolve("058", "0123456789")
+        second = recipients.resolve("058", "0123456789")
+        assert (second.account_name, second.recipient_code) == ("ADA OKAFOR", "RCP_1")
+        assert first.pk == second.pk
+        assert (resolve.call_count, register.call_count) == (1, 1)
+
+    def test_expired_and_invalidated_entries_are_resolved_again(self, paystack):
+        resolve, _ = paystack
+        recipients.resolve("058", "0123456789")
+        ResolvedRecipient.objects.update(resolved_at=timezone.now() - timedelta(days=31))
+        recipients.resolve("058", "0123456789")
+        recipients.invalidate("058", "0123456789")
+        recipients.resolve("058", "0123456789")
+        assert resolve.call_count == 3
+        assert ResolvedRecipient.objects.count() == 1
+
+    def test_unresolvable_accounts_raise(self, paystack):
+        resolve, register = paystack
+        resolve.return_value = {"status": False, "message": "Could not resolve account name."}
+        with pytest.raises(recipients.RecipientError, match="Could not resolve"):
+            recipients.resolve("058", "0000000000")
+        assert not register.called
+        assert not ResolvedRecipient.objects.exists()
+
+
+@pytest.mark.django_db
+class TestBankPayout:
+    def test_second_payout_makes_only_the_transfer_calls(self, paystack):
+        resolve, register = paystack
+        user = Users.objects.create(
+            username="payer",
+            email="payer@example.com",
+            phone_number="+2348010000001",
+            wallet_pin=make_password("1234"),
+        )
+        wallet = Wallet.objects.create(user=user, currency="NGN", balance=Decimal("100.00"))
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            "bank_code": "058",
+            "bank_name": "GTBank",
+            "account_number": "0123456789",
+            "amount": "10.00",
+            "wallet_pin": "1234",
+            "currency": "NGN",
+        }
+        transfer = {
+            "status": True,
+            "data": {"transfer_code": "TRF_1", "status": "otp", "reason": "payout"},
+        }
+        with mock.patch.object(
+            Paystack, "init_transfer", return_value=transfer
+        ) as init_transfer, mock.patch.object(
+            Paystack, "finalize_transfer", return_value={"status": True}
+        ):
+            for _ in range(2):
+                payload["otp"] = otps.issue(user.id, "bank_transfer", wallet.id)
+                response = client.post(
+                    "/api/v1/user/wallet/bank-otp-validation/", payload, format="json"
+                )
+                assert response.status_code == 200
+                assert response.data["data"]["recipient"]["account_name"] == "ADA OKAFOR"
+
+            init_transfer.return_value = {"status": False, "message": "Invalid recipient"}
+            payload["otp"] = otps.issue(user.id, "bank_transfer", wallet.id)
+            response = client.post(
+                "/api/v1/user/wallet/bank-otp-validation/", payload, format="json"
+            )
+        assert response.status_code == 400
+        assert (resolve.call_count, register.call_count) == (1, 1)
+        assert init_transfer.call_args_list[0].args[0] == "RCP_1"
+        assert not ResolvedRecipient.objects.exists()
+
+    def test_unreachable_gateway_answers_503_before_the_debit(self, paystack):
+        user = Users.objects.create(
+            username="payer",
+            email="payer@example.com",
+            phone_number="+2348010000001",
+            wallet_pin=make_password("1234"),
+        )
+        wallet = Wallet.objects.create(user=user, currency="NGN", balance=Decimal("100.00"))
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            "bank_code": "058",
+            "bank_name": "GTBank",
+            "account_number": "0123456789",
+            "amount": "10.00",
+            "wallet_pin": "1234",
+            "currency": "NGN",
+            "otp": otps.issue(user.id, "bank_transfer", wallet.id),
+        }
+        with mock.patch.object(
+            Paystack, "init_transfer", side_effect=CircuitOpenError("paystack.init_transfer", 20)
+        ):
+            response = client.post(
+                "/api/v1/user/wallet/bank-otp-validation/", payload, format="json"
+            )
+        assert (response.status_code, response["Retry-After"]) == (503, "20")
+        wallet.refresh_from_db()
+        assert wallet.balance == Decimal("100.00")
+
+    def test_unfinalized_transfer_is_left_unconfirmed(self, paystack):
+        user = Users.objects.create(
+            username="payer",
+            email="payer@example.com",
+            phone_number="+2348010000001",
+            wallet_pin=make_password("1234"),
+        )
+        wallet = Wallet.objects.create(user=user, currency="NGN", balance=Decimal("100.00"))
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            "bank_code": "058",
+            "bank_name": "GTBank",
+            "account_number": "0123456789",
+            "amount": "10.00",
+            "wallet_pin": "1234",
+            "currency": "NGN",
+            "otp": otps.issue(user.id, "bank_transfer", wallet.id),
+        }
+        transfer = {
+            "status": True,
+            "data": {"transfer_code": "TRF_1", "status": "otp", "reason": "payout"},
+        }
+        with mock.patch.object(Paystack, "init_transfer", return_value=transfer), mock.patch.object(
+            Paystack, "finalize_transfer", side_effect=requests.ReadTimeout("timed out")
+        ):
+            response = client.post(
+                "/api/v1/user/wallet/bank-otp-validation/", payload, format="json"
+            )
+        assert (response.status_code, response.data["status"]) == (202, "pending")
+        wallet.refresh_from_db()
+        assert wallet.balance == Decimal("90.00")
+        assert (
+            Transaction.objects.get(reference=response.data["data"]["reference"]).status
+            == "unconfirmed"
+        )
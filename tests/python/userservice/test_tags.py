@@ -0,0 +1,97 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from rest_framework.test import APIClient
+
+from transactions.models import WalletTransaction
+from userservice.models import Users
+from userservice.tags import suggest, tag_index
+from walletservice.models import Wallet
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    tag_index.clear()
+    yield
+    tag_index.clear()
+
+
+def make_user(tag, number, **fields):
+    return Users.objects.create(
+        username=tag,
+        email=f"{tag or number}@example.com",
+        phone_number=f"+23480100000{number:02d}",
+        **fields,
+    )
+
+
+@pytest.mark.django_db
+class TestTagIndex:
+    def test_prefix_matches_tags_and_business_names(self):
+        make_user("adaeze", 1)
+        make_user("adamu", 2)
+        make_user("bola", 3, business_name="Mama Put Foods", user_type="Merchant")
+        assert sorted(s.tag for s in tag_index.matches("ADA", 10)) == ["adaeze", "adamu"]
+        assert [s.business_name for s in tag_index.matches("foo", 10)] == ["Mama Put Foods"]
+        assert tag_index.matches("zz", 10) == []
+
+    def test_signals_keep_the_index_current(self):
+        user = make_user("adaeze", 1)
+        assert [s.tag for s in tag_index.matches("ada", 10)] == ["adaeze"]
+        make_user("adamu", 2)
+        user.username = "ezinne"
+        user.save()
+        assert [s.tag for s in tag_index.matches("ada", 10)] == ["adamu"]
+        assert [s.tag for s in tag_index.matches("ezi", 10)] == ["ezinne"]
+        user.delete()
+        assert tag_index.matches("ezi", 10) == []
+
+    def test_saves_during_a_build_reach_the_new_index(self):
+        user = make_user("adaeze", 1)
+        load = tag_index._load
+
+        def load_then_rename():
+            built = load()
+            user.username = "ezinne"
+            user.save()
+            return built
+
+        with mock.patch.object(tag_index, "_load", side_effect=load_then_rename):
+            assert tag_index.matches("ada", 10) == []
+        assert [s.tag for s in tag_index.matches("ezi", 10)] == ["ezinne"]
+
+    def test_counterparties_rank_first(self):
+        caller = make_user("caller", 1)
+        make_user("ada", 2)
+        friend = make_user("adaobi", 3)
+        sender = Wallet.objects.create(user=caller, currency="NGN", balance=Decimal("10.00"))
+        receiver = Wallet.objects.create(user=friend, currency="NGN")
+        WalletTransaction.objects.create(
+            sender_wallet=sender, recipient_wallet=receiver, amount=Decimal("1.00")
+        )
+        assert [s.tag for s in suggest(caller, "@ad")] == ["adaobi", "ada"]
+        assert suggest(caller, "cal") == []
+
+
+@pytest.mark.django_db
+class TestRecipientSearch:
+    def test_search(self):
+        caller = make_user("caller", 1)
+        make_user("adaeze", 2, first_name="Adaeze", last_name="Okafor")
+        client = APIClient()
+        client.force_authenticate(caller)
+        response = client.get("/api/v1/user/wallet/recipients/search/", {"q": "ada"})
+        assert response.status_code == 200
+        assert response.data["response"] == [
+            {"ojapay_tag": "adaeze", "name": "Adaeze Okafor", "business_name": ""}
+        ]
+        response = client.get("/api/v1/user/wallet/recipients/search/", {"q": "a"})
+        assert response.status_code == 400
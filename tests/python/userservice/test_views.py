@@ -14,6 +14,7 @@ import pytest
 import requests_mock
 from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -27,6 +28,14 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from userservice.models import OTPVerification, Users
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Users are looked up through the identity cache, which outlives each test's rollback
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.mark.django_db
 class TestSignupView:
     def setup_method(self):
@@ -250,9 +259,9 @@ class TestLoginView:
         )
 
     @patch("userservice.views.SendMail")
-    @patch("userservice.views.GeoIP2")
+    @patch("userservice.views.geolocator")
     @patch("rest_framework.request.Request")
-    def test_successful_login(self, mock_request, mock_geoip2, mock_send_mail):
+    def test_successful_login(self, mock_request, mock_geolocator, mock_send_mail):
         # Set up mock user_agent
         mock_request.user_agent = MagicMock()
         mock_request.user_agent.browser.family = "Test Browser"
@@ -260,8 +269,8 @@ class TestLoginView:
         mock_request.user_agent.os.family = "Test OS"
         mock_request.user_agent.os.version_string = "1.0"
 
-        # Mocking GeoIP2 and SendMail
-        mock_geoip2.return_value.country_code.return_value = "NG"
+        # Mocking the geolocator and SendMail
+        mock_geolocator.country_code.return_value = "NG"
         mock_send_mail.return_value = None
 
         data = {"email": self.user.email, "password": self.user_password}
@@ -271,9 +280,9 @@ class TestLoginView:
         assert "access_token" in response.data["response"]
 
     @patch("userservice.views.SendMail")
-    @patch("userservice.views.GeoIP2")
+    @patch("userservice.views.geolocator")
     @patch("rest_framework.request.Request")
-    def test_failed_login(self, mock_request, mock_geoip2, mock_send_mail):
+    def test_failed_login(self, mock_request, mock_geolocator, mock_send_mail):
         # Set up mock user_agent
         mock_request.user_agent = MagicMock()
         mock_request.user_agent.browser.family = "Test Browser"
@@ -281,7 +290,7 @@ class TestLoginView:
         mock_request.user_agent.os.family = "Test OS"
         mock_request.user_agent.os.version_string = "1.0"
 
-        mock_geoip2.return_value.country_code.return_value = "NG"
+        mock_geolocator.country_code.return_value = "NG"
         mock_send_mail.return_value = None
 
         data = {"email": self.user.email, "password": "wrongpassword"}
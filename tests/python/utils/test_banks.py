@@ -0,0 +1,135 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import time
+from unittest import mock
+
+import pytest
+import requests
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from userservice.models import Users
+from utils.banks import BankDirectory, BankDirectoryUnavailable, bank_directory
+
+PAYSTACK = {
+    "status": True,
+    "data": [
+        {"name": "Access Bank", "code": "044"},
+        {"name": "First Bank of Nigeria", "code": "011"},
+        {"name": "First City Monument Bank", "code": "214"},
+        {"name": "Guaranty Trust Bank", "code": "058"},
+        {"name": "Zenith Bank", "code": "057"},
+    ],
+}
+
+
+class Provider:
+    def __init__(self, payload=PAYSTACK):
+        self.payload = payload
+        self.calls = 0
+        self.down = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.down:
+            raise requests.ConnectionError("provider down")
+        return self.payload
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    bank_directory.clear()
+    yield
+    cache.clear()
+    bank_directory.clear()
+
+
+@pytest.fixture
+def provider():
+    return Provider()
+
+
+@pytest.fixture
+def directory(provider):
+    return BankDirectory({"paystack": provider})
+
+
+class TestBankDirectory:
+    def test_fetches_once_then_serves_from_memory(self, directory, provider):
+        assert directory.payload("paystack") == PAYSTACK
+        assert directory.lookup("paystack", "058").name == "Guaranty Trust Bank"
+        assert len(directory.search("paystack", "zen")) == 1
+        assert provider.calls == 1
+
+    def test_other_processes_share_the_cached_copy(self, directory, provider):
+        directory.payload("paystack")
+        other = BankDirectory({"paystack": provider})
+        assert other.lookup("paystack", "044").name == "Access Bank"
+        assert provider.calls == 1
+
+    def test_stale_copies_are_served_while_celery_refreshes(self, directory, provider, settings):
+        directory.payload("paystack")
+        settings.BANK_DIRECTORY_TTL = 60
+        with mock.patch("utils.banks.time.time", return_value=time.time() + 61), mock.patch(
+            "paymentgatewayservice.tasks.refresh_bank_directory.delay"
+        ) as delay:
+            assert directory.payload("paystack") == PAYSTACK
+            assert directory.payload("paystack") == PAYSTACK
+        delay.assert_called_once_with("paystack")
+        assert provider.calls == 1
+
+    def test_the_last_good_copy_survives_an_outage(self, directory, provider):
+        directory.payload("paystack")
+        provider.down = True
+        with pytest.raises(BankDirectoryUnavailable):
+            directory.refresh("paystack")
+        assert directory.payload("paystack") == PAYSTACK
+        assert BankDirectory({"paystack": provider}).payload("paystack") == PAYSTACK
+
+    def test_no_copy_and_no_provider(self, directory, provider):
+        provider.down = True
+        with pytest.raises(BankDirectoryUnavailable):
+            directory.payload("paystack")
+        provider.payload, provider.down = {"status": False, "message": "Invalid key"}, False
+        with pytest.raises(BankDirectoryUnavailable):
+            directory.payload("paystack")
+
+
+class TestBankSearch:
+    def test_prefix_matches_any_word_and_come_first(self, directory):
+        names = [bank.name for bank in directory.search("paystack", "first")]
+        assert names[:2] == ["First Bank of Nigeria", "First City Monument Bank"]
+        assert [bank.name for bank in directory.search("paystack", "monu")] == [
+            "First City Monument Bank"
+        ]
+
+    def test_fuzzy_matches_typos(self, directory):
+        assert directory.search("paystack", "guarantee trust")[0].code == "058"
+        assert directory.search("paystack", "xyzzy") == []
+
+
+@pytest.mark.django_db
+class TestBankListView:
+    def test_wallet_bank_list_is_served_from_the_directory(self, provider):
+        user = Users.objects.create(
+            username="banker", email="banker@example.com", phone_number="+2348010000001"
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.dict(bank_directory.providers, {"paystack": provider}):
+            response = client.get("/api/v1/user/wallet/fetch-banks/")
+            assert response.data["data"] == PAYSTACK["data"]
+            response = client.get("/api/v1/user/wallet/fetch-banks/", {"q": "access"})
+            assert response.data["data"] == [{"name": "Access Bank", "code": "044"}]
+            provider.down = True
+            bank_directory.clear()
+            cache.clear()
+            response = client.get("/api/v1/user/wallet/fetch-banks/")
+        assert response.status_code == 503
+        assert provider.calls == 2
@@ -0,0 +1,37 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import json
+from unittest import mock
+
+from utils.countries import CountryRegistry
+
+
+class TestCountryRegistry:
+    def test_codes_and_names_resolve_to_the_same_country(self):
+        registry = CountryRegistry()
+        nigeria = registry.get("NG")
+        assert nigeria is registry.get("nga") is registry.by_name(" nigeria ")
+        assert (nigeria.name, nigeria.currency, nigeria.dialing_code) == ("Nigeria", "NGN", 234)
+        assert registry.lookup("United Kingdom").alpha2 == "GB"
+
+    def test_unknown_values_fall_back_to_the_default(self):
+        registry = CountryRegistry()
+        assert registry.get("ZZ") is None
+        assert registry.name("ZZ", default="ZZ") == "ZZ"
+        assert registry.currency("Atlantis", default="NGN") == "NGN"
+        # Antarctica has no currency in the source data
+        assert registry.currency("AQ", default="USD") == "USD"
+
+    def test_file_is_parsed_once(self):
+        registry = CountryRegistry()
+        with mock.patch("utils.countries.json.load", wraps=json.load) as load:
+            registry.get("NG")
+            registry.get("GH")
+            registry.by_name("Kenya")
+        assert load.call_count == 1
+        assert len(registry) > 200
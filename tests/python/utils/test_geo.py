@@ -0,0 +1,53 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import gzip
+import shutil
+from pathlib import Path
+from unittest import mock
+
+import geoip2.database
+import pytest
+from django.conf import settings
+
+from utils.geo import GeoLocator
+
+ARCHIVE = Path(settings.BASE_DIR) / "staticfiles/geoip/GeoLite2-Country.mmdb.gz"
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    target = tmp_path_factory.mktemp("geoip") / "GeoLite2-Country.mmdb"
+    with gzip.open(ARCHIVE, "rb") as source, open(target, "wb") as destination:
+        shutil.copyfileobj(source, destination)
+    return target
+
+
+class TestGeoLocator:
+    def test_repeat_lookups_are_served_from_the_cache(self, database):
+        locator = GeoLocator(path=database, cache_size=2)
+        assert locator.country_code("8.8.8.8") == "US"
+        with mock.patch.object(locator, "reader", side_effect=AssertionError("database read")):
+            assert locator.country_code("8.8.8.8") == "US"
+        assert locator.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 2}
+
+    def test_unlocatable_addresses_fall_back_to_the_default(self, database):
+        locator = GeoLocator(path=database)
+        assert locator.country_code("127.0.0.1", default="NG") == "NG"
+        assert locator.country_code("not-an-ip", default="NG") == "NG"
+        assert locator.country_code(None, default="NG") == "NG"
+
+    def test_opens_the_database_once(self, database):
+        locator = GeoLocator(path=database)
+        with mock.patch("utils.geo.geoip2.database.Reader", wraps=geoip2.database.Reader) as reader:
+            locator.country_code("8.8.8.8")
+            locator.country_code("1.1.1.1")
+        assert reader.call_count == 1
+
+    def test_missing_database_does_not_break_logins(self, tmp_path):
+        locator = GeoLocator(path=tmp_path / "missing.mmdb")
+        assert locator.country_code("8.8.8.8", default="NG") == "NG"
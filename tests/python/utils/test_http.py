@@ -0,0 +1,58 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import pytest
+import requests
+import requests_mock
+
+from utils.http import GatewayTransport
+from utils.metrics import metrics
+
+
+class TestGatewayTransport:
+    def setup_method(self):
+        self.transport = GatewayTransport()
+        metrics.reset()
+
+    def teardown_method(self):
+        self.transport.close()
+
+    def test_session_is_reused_per_host(self):
+        """
+        Calls to the same host share a pooled session; other hosts get their own.
+        """
+        first = self.transport.session_for("https://api.paystack.co/bank")
+        second = self.transport.session_for("https://api.paystack.co/transfer")
+        other = self.transport.session_for("https://testdev.coralpay.com:5000/GwApi")
+        assert first is second
+        assert first is not other
+
+    def test_default_timeouts_and_latency_metrics(self, settings):
+        """
+        Calls get (connect, read) timeouts from settings and are timed per endpoint.
+        """
+        settings.GATEWAY_HTTP = {"CONNECT_TIMEOUT": 2, "READ_TIMEOUT": 7}
+        with requests_mock.Mocker() as mocker:
+            mocker.get("https://api.paystack.co/bank", json={"status": True})
+            response = self.transport.get("https://api.paystack.co/bank", endpoint="paystack.banks")
+            assert response.json() == {"status": True}
+            assert mocker.last_request.timeout == (2, 7)
+        snapshot = metrics.snapshot(prefix="gateway.")
+        assert snapshot["timers"]["gateway.paystack.banks"]["count"] == 1
+        assert snapshot["timers"]["gateway.paystack.banks"]["errors"] == 0
+
+    def test_connection_errors_are_recorded_and_raised(self):
+        """
+        Transport failures still raise RequestException so existing handlers work.
+        """
+        with requests_mock.Mocker() as mocker:
+            mocker.post("https://api.paystack.co/transfer", exc=requests.exceptions.ConnectTimeout)
+            with pytest.raises(requests.exceptions.RequestException):
+                self.transport.post(
+                    "https://api.paystack.co/transfer", endpoint="paystack.init_transfer"
+                )
+        assert metrics.timer("gateway.paystack.init_transfer").errors == 1
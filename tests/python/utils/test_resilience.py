@@ -0,0 +1,186 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import asyncio
+from unittest import mock
+
+import pytest
+import requests
+import requests_mock
+from rest_framework.test import APIRequestFactory
+
+from paymentgatewayservice import async_views, views
+from utils.http import AsyncGatewayTransport, GatewayTransport
+from utils.metrics import metrics
+from utils.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    circuits,
+)
+
+BANKS = "https://api.paystack.co/bank"
+TRANSFER = "https://api.paystack.co/transfer"
+
+
+@pytest.fixture(autouse=True)
+def fresh_circuits(settings):
+    settings.GATEWAY_RESILIENCE = {
+        "FAILURE_THRESHOLD": 3,
+        "RECOVERY_TIMEOUT": 30,
+        "RETRY_ATTEMPTS": 2,
+        "RETRY_BUDGET_MIN_PER_SECOND": 5,
+        "IDEMPOTENT_ENDPOINTS": ("paystack.banks",),
+    }
+    circuits.reset()
+    metrics.reset()
+    with mock.patch("utils.http.time.sleep") as sleep:
+        yield sleep
+    circuits.reset()
+
+
+@pytest.fixture
+def transport():
+    transport = GatewayTransport()
+    yield transport
+    transport.close()
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures_and_probes_after_recovery(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before()
+
+        with mock.patch("utils.resilience.time.monotonic", return_value=breaker._opened_at + 11):
+            assert breaker.state == HALF_OPEN
+            breaker.before()
+            # Only one probe at a time
+            with pytest.raises(CircuitOpenError):
+                breaker.before()
+            breaker.record_failure()
+            assert breaker.state == OPEN
+        assert metrics.counter("gateway.circuit.test.opened") == 2
+        assert metrics.snapshot(prefix="gateway.")["gauges"]["gateway.circuit.test.state"] == 2
+
+    def test_a_successful_probe_closes_it(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+        breaker.before()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_circuit_open_error_is_a_request_exception(self):
+        assert issubclass(CircuitOpenError, requests.exceptions.RequestException)
+
+
+class TestRetryBudget:
+    def test_retries_are_a_share_of_calls(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0)
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+
+
+class TestGatewayResilience:
+    def test_idempotent_calls_are_retried_with_backoff(self, transport, fresh_circuits):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                BANKS,
+                [
+                    {"status_code": 503},
+                    {"exc": requests.exceptions.ConnectTimeout},
+                    {"json": {"status": True}},
+                ],
+            )
+            response = transport.get(BANKS, endpoint="paystack.banks")
+        assert response.json() == {"status": True}
+        assert mocker.call_count == 3
+        assert fresh_circuits.call_count == 2
+        assert all(0 <= call.args[0] <= 0.4 for call in fresh_circuits.call_args_list)
+        assert metrics.counter("gateway.retries.paystack.banks") == 2
+
+    def test_other_calls_are_not_retried(self, transport):
+        with requests_mock.Mocker() as mocker:
+            mocker.post(TRANSFER, status_code=502)
+            assert transport.post(TRANSFER, endpoint="paystack.init_transfer").status_code == 502
+        assert mocker.call_count == 1
+
+    def test_retries_stop_when_the_budget_runs_out(self, transport, settings):
+        settings.GATEWAY_RESILIENCE = {
+            **settings.GATEWAY_RESILIENCE,
+            "RETRY_BUDGET_RATIO": 0.5,
+            "RETRY_BUDGET_MIN_PER_SECOND": 0,
+        }
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                BANKS, [{"status_code": 503}, {"status_code": 503}, {"json": {"status": True}}]
+            )
+            transport.get(BANKS, endpoint="paystack.banks")
+            assert mocker.call_count == 1
+            transport.get(BANKS, endpoint="paystack.banks")
+            assert mocker.call_count == 3
+        assert metrics.counter("gateway.retry_budget_exhausted.paystack.banks") == 1
+
+    def test_open_circuit_fails_fast(self, transport):
+        with requests_mock.Mocker() as mocker:
+            mocker.post(TRANSFER, exc=requests.exceptions.ReadTimeout)
+            for _ in range(3):
+                with pytest.raises(requests.exceptions.ReadTimeout):
+                    transport.post(TRANSFER, endpoint="paystack.init_transfer")
+            with pytest.raises(CircuitOpenError):
+                transport.post(TRANSFER, endpoint="paystack.init_transfer")
+            assert mocker.call_count == 3
+        assert circuits.states() == {"paystack.init_transfer": OPEN}
+        # Other endpoints are unaffected
+        with requests_mock.Mocker() as mocker:
+            mocker.get(BANKS, json={"status": True})
+            assert transport.get(BANKS, endpoint="paystack.banks").status_code == 200
+
+    def test_async_transport_shares_the_breakers(self):
+        circuits.breaker("coralpay.invoke_payment").record_failure()
+        for _ in range(2):
+            circuits.breaker("coralpay.invoke_payment").record_failure()
+
+        async def call():
+            return await AsyncGatewayTransport().request(
+                "POST", "http://127.0.0.1:9/x", endpoint="coralpay.invoke_payment"
+            )
+
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(call())
+
+
+class TestOpenCircuitResponses:
+    @pytest.mark.parametrize("name", ["InvokePayment", "DirectPay", "Refund"])
+    def test_views_answer_503_with_retry_after(self, name):
+        request = APIRequestFactory().post("/", {"amount": "50"}, format="json")
+        with mock.patch(
+            "paymentgatewayservice.views.gateway.send", side_effect=CircuitOpenError(name, 12.2)
+        ):
+            response = getattr(views, name).as_view()(request)
+        assert (response.status_code, response["Retry-After"]) == (503, "13")
+        assert response.data == {"status": "error", "response": "Payment gateway unavailable"}
+
+        request = APIRequestFactory().post("/", {"amount": "50"}, format="json")
+        with mock.patch(
+            "paymentgatewayservice.async_views.async_gateway.send",
+            side_effect=CircuitOpenError(name, 12.2),
+        ):
+            response = asyncio.run(getattr(async_views, name).as_view()(request))
+        assert (response.status_code, response["Retry-After"]) == (503, "13")
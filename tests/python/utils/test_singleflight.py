@@ -0,0 +1,123 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests_mock
+
+from utils.api import Paystack
+from utils.metrics import metrics
+from utils.singleflight import SingleFlight, flights
+
+VERIFY = "https://api.paystack.co/transaction/verify/ref-1"
+
+
+@pytest.fixture(autouse=True)
+def fresh_flights():
+    flights.reset()
+    metrics.reset()
+    yield
+    flights.reset()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def blocking(release, calls, result="ok"):
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return result
+
+    return fetch
+
+
+def run_concurrently(group, key, fn, callers):
+    pool = ThreadPoolExecutor(callers)
+    futures = [pool.submit(group.do, key, fn) for _ in range(callers)]
+    pool.shutdown(wait=False)
+    return futures
+
+
+class TestSingleFlight:
+    def test_concurrent_callers_share_one_call(self):
+        group, release, calls = SingleFlight("test"), threading.Event(), []
+        futures = run_concurrently(group, "key", blocking(release, calls), 8)
+        # Let every caller queue up behind the first before it returns
+        while metrics.counter("singleflight.test.shared") < 7:
+            threading.Event().wait(0.01)
+        release.set()
+        assert [future.result() for future in futures] == ["ok"] * 8
+        assert len(calls) == 1
+        assert metrics.counter("singleflight.test.calls") == 1
+
+    def test_waiters_get_the_leaders_exception(self):
+        group, release = SingleFlight("test"), threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError("upstream down")
+
+        futures = run_concurrently(group, "key", fail, 4)
+        while metrics.counter("singleflight.test.shared") < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+    def test_different_keys_are_not_coalesced(self):
+        group = SingleFlight("test")
+        assert group.do("a", lambda: 1) == 1
+        assert group.do("b", lambda: 2) == 2
+
+    def test_results_are_kept_for_the_ttl_only(self):
+        clock, calls = Clock(), []
+        group = SingleFlight("test", clock=clock)
+
+        def fetch():
+            calls.append(1)
+            return len(calls)
+
+        assert group.do("key", fetch, ttl=5) == 1
+        clock.now = 4
+        assert group.do("key", fetch, ttl=5) == 1
+        clock.now = 5
+        assert group.do("key", fetch, ttl=5) == 2
+        assert metrics.counter("singleflight.test.cached") == 1
+
+    def test_failures_are_not_kept(self):
+        group = SingleFlight("test")
+        with pytest.raises(ValueError):
+            group.do("key", lambda: (_ for _ in ()).throw(ValueError()), ttl=60)
+        assert group.do("key", lambda: "ok", ttl=60) == "ok"
+
+
+class TestCoalescedLookups:
+    def test_verify_payment_is_cached_for_its_window(self, settings):
+        settings.GATEWAY_COALESCE_TTL = {"paystack.verify_payment": 60}
+        with requests_mock.Mocker() as m:
+            m.get(VERIFY, json={"status": True, "data": {"status": "success"}})
+            first = Paystack.verify_payment("ref-1")
+            second = Paystack.verify_payment("ref-1")
+        assert first == second == {"status": True, "data": {"status": "success"}}
+        assert m.call_count == 1
+
+    def test_without_a_window_sequential_calls_reach_the_gateway(self, settings):
+        settings.GATEWAY_COALESCE_TTL = {}
+        with requests_mock.Mocker() as m:
+            m.get(VERIFY, json={"status": True})
+            Paystack.verify_payment("ref-1")
+            Paystack.verify_payment("ref-1")
+        assert m.call_count == 2
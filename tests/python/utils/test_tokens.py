@@ -0,0 +1,97 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import threading
+import time
+
+import requests_mock
+
+from utils.api import CoralPay, coralpay_tokens
+from utils.tokens import TokenManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenManager:
+    def test_concurrent_callers_share_one_refresh(self):
+        """
+        A burst of callers on a cold cache triggers a single fetch.
+        """
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"token": "t1", "key": "k1"}
+
+        manager = TokenManager("test", fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(manager.get())) for _ in range(25)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert all(result == {"token": "t1", "key": "k1"} for result in results)
+
+    def test_refreshes_shortly_before_expiry(self):
+        """
+        Credentials are reused until the refresh margin before their expiry.
+        """
+        clock = FakeClock()
+        issued = iter(["t1", "t2"])
+        manager = TokenManager(
+            "test",
+            lambda: {"token": next(issued), "expiresIn": 300},
+            refresh_margin=30,
+            clock=clock,
+        )
+        assert manager.get()["token"] == "t1"
+        clock.now += 269
+        assert manager.get()["token"] == "t1"
+        clock.now += 2
+        assert manager.get()["token"] == "t2"
+
+    def test_invalidate_ignores_superseded_credentials(self):
+        """
+        Invalidating an old token does not throw away a newer one.
+        """
+        issued = iter(["t1", "t2", "t3"])
+        manager = TokenManager("test", lambda: {"token": next(issued)})
+        stale = manager.get()
+        manager.invalidate(stale)
+        fresh = manager.get()
+        manager.invalidate(stale)
+        assert manager.get() is fresh
+
+
+class TestCoralPayTokens:
+    def setup_method(self):
+        coralpay_tokens.invalidate()
+
+    def test_deposits_reuse_cached_token(self):
+        """
+        Building CoralPay clients and querying payments authenticates once.
+        """
+        base_url = "https://testdev.coralpay.com:5000/GwApi/api/v1"
+        with requests_mock.Mocker() as mocker:
+            auth = mocker.post(f"{base_url}/Authentication", json={"token": "abc", "key": "secret"})
+            mocker.post(
+                f"{base_url}/TransactionQuery", json={"responseHeader": {"responseCode": "00"}}
+            )
+            for trace_id in ("T1", "T2", "T3"):
+                CoralPay().verify_payment(trace_id)
+            assert auth.call_count == 1
+            assert mocker.last_request.headers["Authorization"] == "Bearer abc"
@@ -0,0 +1,129 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from userservice.models import Users
+from walletservice.history import pick_resolution, rate_series, record_rates
+from walletservice.models import Currency, ExchangeRateHistory, ExchangeRateRollup
+
+START = datetime(2024, 3, 1, 9, 0, 10, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def pair():
+    usd = Currency.objects.create(code="USD", name="US Dollar")
+    ngn = Currency.objects.create(code="NGN", name="Naira")
+    return usd.id, ngn.id
+
+
+def observe(pair, samples):
+    for offset, rate in samples:
+        record_rates({pair: Decimal(rate)}, START + offset)
+
+
+@pytest.mark.django_db
+class TestRecordRates:
+    def test_builds_ohlc_buckets_at_every_resolution(self, pair):
+        observe(
+            pair,
+            [
+                (timedelta(seconds=0), "1500"),
+                (timedelta(seconds=20), "1520"),
+                (timedelta(seconds=40), "1490"),
+                (timedelta(minutes=5), "1510"),
+                (timedelta(hours=2), "1530"),
+            ],
+        )
+        assert ExchangeRateHistory.objects.count() == 5
+        first_minute = ExchangeRateRollup.objects.get(
+            resolution="minute", bucket=START.replace(second=0)
+        )
+        assert (
+            first_minute.open,
+            first_minute.high,
+            first_minute.low,
+            first_minute.close,
+            first_minute.samples,
+        ) == (
+            Decimal("1500"),
+            Decimal("1520"),
+            Decimal("1490"),
+            Decimal("1490"),
+            3,
+        )
+        hours = ExchangeRateRollup.objects.filter(resolution="hour").order_by("bucket")
+        assert [(row.samples, row.close) for row in hours] == [
+            (4, Decimal("1510")),
+            (1, Decimal("1530")),
+        ]
+        day = ExchangeRateRollup.objects.get(resolution="day")
+        assert (day.open, day.high, day.low, day.close, day.samples) == (
+            Decimal("1500"),
+            Decimal("1530"),
+            Decimal("1490"),
+            Decimal("1530"),
+            5,
+        )
+
+    def test_one_refresh_is_three_statements(self, pair):
+        with CaptureQueriesContext(connection) as queries:
+            record_rates({pair: Decimal("1500"), pair[::-1]: Decimal("0.0007")}, START)
+        assert len(queries) == 3
+
+
+@pytest.mark.django_db
+class TestRateSeries:
+    def test_picks_a_resolution_that_fits_the_window(self):
+        assert pick_resolution(START, START + timedelta(hours=3)) == "minute"
+        assert pick_resolution(START, START + timedelta(days=30)) == "hour"
+        assert pick_resolution(START, START + timedelta(days=3 * 365)) == "day"
+
+    def test_view_returns_the_range(self, pair):
+        observe(pair, [(timedelta(days=day), str(1500 + day)) for day in range(10)])
+        user = Users.objects.create_user(
+            username="charts",
+            email="charts@example.com",
+            password="testpassword",
+            phone_number="08030000077",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(
+            "/walletservice/exchange-rate/history/",
+            {
+                "from": "USD",
+                "to": "NGN",
+                "start": "2024-03-03",
+                "end": "2024-03-05",
+                "resolution": "day",
+            },
+        )
+        assert response.status_code == 200
+        data = response.data["data"]
+        assert data["resolution"] == "day"
+        assert [point["close"] for point in data["points"]] == [
+            "1502.0000",
+            "1503.0000",
+            "1504.0000",
+        ]
+
+        _, rows = rate_series("USD", "NGN", START, START + timedelta(days=10))
+        assert len(rows) == 10
+
+        response = client.get(
+            "/walletservice/exchange-rate/history/",
+            {"from": "USD", "to": "NGN", "start": "2020-01-01", "resolution": "minute"},
+        )
+        assert response.status_code == 400
@@ -0,0 +1,115 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import io
+import re
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from notificationservice.models import OutboxEmail
+from transactions.models import WalletTransaction
+from userservice.models import Users
+from walletservice.models import ExchangeRate, Wallet
+from walletservice.quotes import QuoteError, issue_quote, peek_quote, release_quote, take_quote
+from walletservice.rates import rate_matrix
+
+
+@pytest.fixture
+def usd_ngn(settings):
+    call_command("initialize_currencies", stdout=io.StringIO())
+    ExchangeRate.objects.filter(from_currency__code="USD", to_currency__code="NGN").update(
+        rate=Decimal("1550.2500")
+    )
+    rate_matrix.invalidate()
+    yield
+    rate_matrix.invalidate()
+
+
+@pytest.mark.django_db
+class TestQuotes:
+    def test_a_quote_is_single_use_and_per_user(self, usd_ngn):
+        quote = issue_quote(7, "USD", "NGN", "20")
+        assert quote.converted == Decimal("31005.00")
+        with pytest.raises(QuoteError):
+            take_quote(quote.id, 8)
+        assert take_quote(quote.id, 7).rate == Decimal("1550.2500")
+        with pytest.raises(QuoteError):
+            take_quote(quote.id, 7)
+
+    def test_peeking_or_releasing_leaves_the_quote_usable(self, usd_ngn):
+        quote = issue_quote(7, "USD", "NGN", "20")
+        assert peek_quote(quote.id, 7) == quote
+        release_quote(take_quote(quote.id, 7))
+        assert take_quote(quote.id, 7) == quote
+
+    def test_expired_quotes_are_refused(self, usd_ngn, settings):
+        settings.FX_QUOTE_TTL = 0
+        quote = issue_quote(7, "USD", "NGN", "20")
+        with pytest.raises(QuoteError):
+            take_quote(quote.id, 7)
+
+
+def make_user(name, currency, balance):
+    user = Users.objects.create_user(
+        username=name,
+        email=f"{name}@example.com",
+        password="testpassword",
+        phone_number=f"0803{len(name):07d}",
+    )
+    user.wallet_pin = make_password("1234")
+    user.save()
+    wallet = Wallet.objects.create(user=user, currency=currency, balance=Decimal(balance))
+    return user, wallet
+
+
+@pytest.mark.django_db
+class TestCrossCurrencyTransfer:
+    def test_settles_at_the_quoted_rate(self, usd_ngn):
+        donor, usd = make_user("donor", "USD", "100.00")
+        _, ngn = make_user("recipient", "NGN", "0.00")
+        client = APIClient()
+        client.force_authenticate(donor)
+        payload = {
+            "ojapay_tag": "recipient",
+            "amount": "20.00",
+            "wallet_pin": "1234",
+            "donor_currency": "USD",
+            "recipient_currency": "NGN",
+        }
+        response = client.post("/api/v1/user/wallet/transfer/", payload, format="json")
+        assert response.status_code == 200
+        data = response.data["data"]
+        assert data["recipient_amount"] == "NGN 31,005.00"
+
+        # A rate change between the two steps does not move the settled amount
+        ExchangeRate.objects.filter(from_currency__code="USD", to_currency__code="NGN").update(
+            rate=Decimal("1600")
+        )
+        rate_matrix.invalidate()
+
+        otp = re.search(r"OTP code is (\d+)", OutboxEmail.objects.latest("id").body).group(1)
+        payload.update(otp=otp, quote_id=data["quote_id"])
+        response = client.post("/api/v1/user/wallet/transfer/validation", payload, format="json")
+        assert response.status_code == 200
+
+        usd.refresh_from_db()
+        ngn.refresh_from_db()
+        assert (usd.balance, ngn.balance) == (Decimal("80.00"), Decimal("31005.00"))
+        assert sorted(WalletTransaction.objects.values_list("amount", flat=True)) == [
+            Decimal("20.00"),
+            Decimal("31005.00"),
+        ]
+
+        # Replaying the validation cannot reuse the quote
+        response = client.post("/api/v1/user/wallet/transfer/validation", payload, format="json")
+        assert response.status_code == 400
+        usd.refresh_from_db()
+        assert usd.balance == Decimal("80.00")
@@ -0,0 +1,105 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import io
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from userservice.models import Users
+from walletservice.models import ExchangeRate
+from walletservice.rates import UnknownCurrency, current_version, get_rate_matrix, rate_matrix
+
+
+@pytest.fixture
+def rates(settings):
+    settings.EXCHANGE_RATE_MATRIX_CHECK_INTERVAL = 60
+    call_command("initialize_currencies", stdout=io.StringIO())
+    ExchangeRate.objects.filter(from_currency__code="USD", to_currency__code="NGN").update(
+        rate=Decimal("1550.2500")
+    )
+    ExchangeRate.objects.filter(from_currency__code="NGN", to_currency__code="USD").update(
+        rate=Decimal("0.0006")
+    )
+    rate_matrix.invalidate()
+    yield
+    rate_matrix.invalidate()
+
+
+@pytest.mark.django_db
+class TestRateMatrix:
+    def test_lookups_and_conversions(self, rates):
+        matrix = get_rate_matrix()
+        assert matrix.rate("USD", "NGN") == Decimal("1550.2500")
+        assert matrix.rate("NGN", "NGN") == Decimal("1")
+        assert matrix.convert("10.50", "USD", "NGN") == Decimal("16277.63")
+        assert matrix.convert_many(["1", "2.5", Decimal("100")], "USD", "NGN") == [
+            Decimal("1550.25"),
+            Decimal("3875.63"),
+            Decimal("155025.00"),
+        ]
+        assert matrix.convert_batch([("100000", "NGN", "USD"), ("1", "USD", "USD")]) == [
+            Decimal("60.00"),
+            Decimal("1.00"),
+        ]
+        with pytest.raises(UnknownCurrency):
+            matrix.rate("USD", "JPY")
+
+    def test_served_from_memory_until_the_version_changes(self, rates):
+        get_rate_matrix()
+        with CaptureQueriesContext(connection) as queries:
+            get_rate_matrix().rate("USD", "NGN")
+        assert len(queries) == 0
+
+        # bulk writes do not send signals; a stale matrix is served until the stamp moves
+        ExchangeRate.objects.filter(from_currency__code="USD", to_currency__code="NGN").update(
+            rate=Decimal("1600")
+        )
+        assert get_rate_matrix().rate("USD", "NGN") == Decimal("1550.2500")
+        rate_matrix.invalidate()
+        assert get_rate_matrix().rate("USD", "NGN") == Decimal("1600.0000")
+
+    def test_saving_a_rate_invalidates_once_committed(
+        self, rates, django_capture_on_commit_callbacks
+    ):
+        version = get_rate_matrix().version
+        exchange_rate = ExchangeRate.objects.get(from_currency__code="EUR", to_currency__code="GBP")
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            exchange_rate.rate = Decimal("0.8612")
+            exchange_rate.save()
+            # Not stamped while the transaction is open
+            assert current_version() == version
+        assert len(callbacks) == 1
+        assert current_version() != version
+        assert get_rate_matrix().rate("EUR", "GBP") == Decimal("0.8612")
+
+
+@pytest.mark.django_db
+class TestExchangeRateView:
+    def test_answers_without_queries(self, rates):
+        user = Users.objects.create_user(
+            username="fx",
+            email="fx@example.com",
+            password="testpassword",
+            phone_number="08030000009",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        get_rate_matrix()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/walletservice/exchange-rate/", {"from": "USD", "to": "NGN"})
+        assert response.status_code == 200
+        assert len(queries) == 0
+        assert response.data["data"]["rate"] == "1550.2500"
+        assert response.data["data"]["from_currency"] == {"code": "USD", "name": ""}
+
+        response = client.get("/walletservice/exchange-rate/", {"from": "USD", "to": "XYZ"})
+        assert response.status_code == 400
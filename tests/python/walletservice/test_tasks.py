@@ -0,0 +1,92 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "amaps.dev")
+django.setup()
+
+import io
+from decimal import Decimal
+
+import pytest
+import requests_mock
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from utils.metrics import metrics
+from walletservice.models import ExchangeRate, ExchangeRateHistory, ExchangeRateRollup
+from walletservice.tasks import update_exchange_rates
+from walletservice.utils.cross_rates import cross_rates
+
+TABLE = {
+    "USD": 1,
+    "NGN": 1550.25,
+    "GHS": 15.1,
+    "KES": 129.0,
+    "XOF": 601.5,
+    "XAF": 601.5,
+    "CDF": 2840.0,
+    "GNF": 8600.0,
+    "LRD": 193.7,
+    "MZN": 63.9,
+    "SLL": 22500.0,
+    "TZS": 2700.0,
+    "UGX": 3700.0,
+    "ZMW": 26.4,
+    "EUR": 0.917,
+    "GBP": 0.79,
+    "AED": 3.6725,
+}
+
+
+class TestCrossRates:
+    def test_derives_pairs_from_the_base_table(self):
+        table = {code: Decimal(str(rate)) for code, rate in TABLE.items()}
+        rates, missing = cross_rates(
+            table, [("USD", "NGN"), ("GBP", "NGN"), ("NGN", "GHS"), ("NGN", "JPY")]
+        )
+        assert rates[("USD", "NGN")] == Decimal("1550.2500")
+        assert rates[("GBP", "NGN")] == Decimal("1962.3418")
+        assert rates[("NGN", "GHS")] == Decimal("0.0097")
+        assert missing == [("NGN", "JPY")]
+
+
+@pytest.mark.django_db
+class TestUpdateExchangeRates:
+    def test_one_request_and_one_bulk_write(self, settings):
+        settings.EXCHANGE_RATE_API_KEY = "key"
+        call_command("initialize_currencies", stdout=io.StringIO())
+        metrics.reset()
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                "https://v6.exchangerate-api.com/v6/key/latest/USD",
+                json={"result": "success", "base_code": "USD", "conversion_rates": TABLE},
+            )
+            with CaptureQueriesContext(connection) as queries:
+                result = update_exchange_rates()
+
+        assert mocker.call_count == 1
+        assert result == {"updated": 272, "missing": []}
+        # A handful of bulk statements, not one per pair; SQLite splits the
+        # history inserts into batches of at most 999 parameters
+        assert len(queries) < 20
+        assert ExchangeRateHistory.objects.count() == 272
+        assert ExchangeRateRollup.objects.filter(resolution="day").count() == 272
+        rate = ExchangeRate.objects.get(from_currency__code="EUR", to_currency__code="NGN")
+        assert rate.rate == Decimal("1690.5671")
+        assert metrics.snapshot("fx.")["gauges"]["fx.refresh.pairs_updated"] == 272
+
+    def test_failed_fetch_leaves_rates_untouched(self, settings):
+        settings.EXCHANGE_RATE_API_KEY = "key"
+        call_command("initialize_currencies", stdout=io.StringIO())
+        metrics.reset()
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                "https://v6.exchangerate-api.com/v6/key/latest/USD", status_code=503, text="down"
+            )
+            result = update_exchange_rates()
+
+        assert result["updated"] == 0
+        assert set(ExchangeRate.objects.values_list("rate", flat=True)) == {Decimal("1.0000")}
+        assert metrics.counter("fx.refresh.failures") == 1
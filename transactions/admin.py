@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from .models import WalletTransaction, Deposit
+from .models import WalletTransaction, Deposit, PayoutBatch, PayoutItem
 
 # Register your models here.
 
 
 admin.site.register(WalletTransaction)
 admin.site.register(Deposit)
+admin.site.register(PayoutBatch)
+admin.site.register(PayoutItem)
@@ -0,0 +1,142 @@
+"""
+Wallet balance engine
+
+All balance movements go through here so they are safe under concurrency:
+
+- the affected wallet rows are locked with ``select_for_update`` in ascending
+  id order, so two transfers between the same pair of wallets can never
+  deadlock each other;
+- balances change through conditional ``F()`` updates (``balance >= amount``
+  for debits), so the database rather than a stale Python copy decides
+  whether funds are available and only the balance column is written;
+- the ledger rows for a transfer are written in a single ``bulk_create``.
+
+Time spent waiting for the row locks is recorded in ``utils.metrics`` under
+``wallet.lock_wait``.
+"""
+
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from transactions.models import WalletTransaction
+from utils.metrics import metrics
+from walletservice.models import Wallet
+
+
+class InsufficientFunds(Exception):
+    """The wallet balance does not cover the requested debit"""
+
+    def __init__(self, wallet_id, amount):
+        super().__init__(f"Wallet {wallet_id} has insufficient funds for {amount}")
+        self.wallet_id = wallet_id
+        self.amount = amount
+
+
+@dataclass
+class Movement:
+    """Balance of one wallet before and after a posting"""
+
+    wallet_id: int
+    balance_before: Decimal
+    balance_after: Decimal
+
+
+@dataclass
+class TransferResult:
+    sender: Movement
+    recipient: Movement
+    entries: list = field(default_factory=list)
+
+
+def lock_wallets(*wallet_ids):
+    """
+    Lock the given wallets for the current transaction, in id order, and
+    return them keyed by id. Must be called inside ``transaction.atomic``.
+    """
+    started = time.perf_counter()
+    wallets = (
+        Wallet.objects.select_for_update().filter(id__in=sorted(set(wallet_ids))).order_by("id")
+    )
+    locked = {wallet.id: wallet for wallet in wallets}
+    metrics.observe("wallet.lock_wait", time.perf_counter() - started)
+    missing = set(wallet_ids) - set(locked)
+    if missing:
+        raise Wallet.DoesNotExist(f"Wallet(s) {sorted(missing)} not found")
+    return locked
+
+
+def _debit(wallet, amount):
+    updated = Wallet.objects.filter(id=wallet.id, balance__gte=amount).update(
+        balance=F("balance") - amount, modified_on=timezone.now()
+    )
+    if not updated:
+        metrics.incr("wallet.insufficient_funds")
+        raise InsufficientFunds(wallet.id, amount)
+    return Movement(wallet.id, wallet.balance, wallet.balance - amount)
+
+
+def _credit(wallet, amount):
+    Wallet.objects.filter(id=wallet.id).update(
+        balance=F("balance") + amount, modified_on=timezone.now()
+    )
+    return Movement(wallet.id, wallet.balance, wallet.balance + amount)
+
+
+@transaction.atomic
+def debit(wallet_id, amount):
+    """Take ``amount`` from a wallet, raising ``InsufficientFunds`` if it would go negative"""
+    wallet = lock_wallets(wallet_id)[wallet_id]
+    return _debit(wallet, Decimal(amount))
+
+
+@transaction.atomic
+def credit(wallet_id, amount):
+    """Add ``amount`` to a wallet"""
+    wallet = lock_wallets(wallet_id)[wallet_id]
+    return _credit(wallet, Decimal(amount))
+
+
+@transaction.atomic
+def transfer(
+    sender_id, recipient_id, amount, fee=Decimal("0.00"), record=True, credit_amount=None, **entry
+):
+    """
+    Move ``amount`` from one wallet to another, charging ``fee`` to the sender.
+
+    ``credit_amount`` is what the recipient receives when it differs from
+    ``amount``, e.g. a cross-currency transfer settled at a quoted rate.
+    When ``record`` is set, one ``WalletTransaction`` row is written per leg
+    (sender then recipient) with that leg's amount and balances before and
+    after, plus any extra ``entry`` fields such as ``reference`` or ``note``.
+    """
+    if sender_id == recipient_id:
+        raise ValueError("Cannot transfer to the same wallet")
+    amount = Decimal(amount)
+    fee = Decimal(fee)
+    credit_amount = amount if credit_amount is None else Decimal(credit_amount)
+    with metrics.time("wallet.transfer"):
+        wallets = lock_wallets(sender_id, recipient_id)
+        sender = _debit(wallets[sender_id], amount + fee)
+        recipient = _credit(wallets[recipient_id], credit_amount)
+        result = TransferResult(sender, recipient)
+        if record:
+            result.entries = WalletTransaction.objects.bulk_create(
+                [
+                    WalletTransaction(
+                        sender_wallet_id=sender_id,
+                        recipient_wallet_id=recipient_id,
+                        amount=leg_amount,
+                        fee=fee,
+                        balance_before=movement.balance_before,
+                        balance_after=movement.balance_after,
+                        **entry,
+                    )
+                    for movement, leg_amount in ((sender, amount), (recipient, credit_amount))
+                ]
+            )
+    return result
@@ -0,0 +1,127 @@
+"""
+Unified, keyset-paginated ledger of a user's deposits, wallet transfers and
+bank withdrawals
+
+The three tables are merged with a single ``UNION ALL`` ordered newest first
+by ``(date, kind, id)`` in the database, and pages are addressed by an opaque
+cursor holding the sort key of the last row returned. Each branch only reads
+rows older than the cursor through the ``(user, date)`` /
+``(sender_wallet, date)`` / ``(recipient_wallet, date)`` indexes, so a page
+costs the same however long the history is.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db import connection
+from django.db.models import CharField, Q, Value
+from django.utils.dateparse import parse_datetime
+
+from transactions.models import Deposit, Transaction, WalletTransaction
+from walletservice.models import Wallet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+FIELDS = (
+    "kind",
+    "id",
+    "date",
+    "amount",
+    "fee",
+    "balance_before",
+    "balance_after",
+    "order",
+    "reference",
+    "note",
+    "gateway",
+    "transaction_type",
+    "payment_type",
+    "status",
+)
+ORDERING = ("-date", "-kind", "-id")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    key = {"d": row["date"].isoformat(), "k": row["kind"], "i": row["id"]}
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date = parse_datetime(key["d"])
+        if date is None:
+            raise ValueError(key["d"])
+        return date, str(key["k"]), int(key["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def search_filter(query):
+    return (
+        Q(reference__icontains=query)
+        | Q(amount__icontains=query)
+        | Q(date__icontains=query)
+        | Q(payment_type__icontains=query)
+    )
+
+
+def before(kind, position):
+    """Rows of a branch that sort after ``position`` in newest-first order"""
+    date, last_kind, last_id = position
+    if kind < last_kind:
+        return Q(date__lte=date)
+    if kind > last_kind:
+        return Q(date__lt=date)
+    return Q(date__lt=date) | Q(date=date, id__lt=last_id)
+
+
+def branches(user):
+    wallet_ids = list(Wallet.objects.filter(user=user).values_list("id", flat=True))
+    return [
+        ("deposit", Deposit.objects.filter(user=user)),
+        ("transfer", WalletTransaction.objects.filter(sender_wallet_id__in=wallet_ids)),
+        # Transfers between two of the user's own wallets are already in the sent branch
+        (
+            "transfer",
+            WalletTransaction.objects.filter(recipient_wallet_id__in=wallet_ids).exclude(
+                sender_wallet_id__in=wallet_ids
+            ),
+        ),
+        ("withdrawal", Transaction.objects.filter(user=user)),
+    ]
+
+
+def ledger_page(user, cursor=None, page_size=DEFAULT_PAGE_SIZE, search=""):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``user``'s ledger, newest
+    first. ``rows`` are dicts with the keys in ``FIELDS``; ``next_cursor`` is
+    ``None`` on the last page.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    position = decode_cursor(cursor) if cursor else None
+    limit = page_size + 1
+    # PostgreSQL and MySQL can order and limit each branch, letting every
+    # branch stop after ``limit`` index entries before the rows are merged
+    per_branch_limit = connection.features.supports_slicing_ordering_in_compound
+
+    queries = []
+    for kind, queryset in branches(user):
+        if position:
+            queryset = queryset.filter(before(kind, position))
+        if search:
+            queryset = queryset.filter(search_filter(search))
+        queryset = queryset.annotate(kind=Value(kind, output_field=CharField())).values(*FIELDS)
+        queryset = queryset.order_by(*ORDERING)[:limit] if per_branch_limit else queryset.order_by()
+        queries.append(queryset)
+
+    first, *rest = queries
+    rows = list(first.union(*rest, all=True).order_by(*ORDERING)[:limit])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import export
+from utils.helpers import parse_bound
+
+
+class Command(BaseCommand):
+    help = "Streams every deposit, wallet transfer and withdrawal to a file (or stdout) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(export.FORMATS), default="ndjson")
+        parser.add_argument("--start", help="Earliest date or ISO datetime to include")
+        parser.add_argument("--end", help="Last date to include, or an exclusive ISO datetime")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+        parser.add_argument(
+            "--chunk-size", type=int, default=export.CHUNK_SIZE, help="Rows fetched per round trip"
+        )
+        parser.add_argument("--output", "-o", help="Destination file, defaults to stdout")
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_bound(options["start"])
+            end = parse_bound(options["end"], end=True)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        chunks = export.export(
+            options["format"],
+            start,
+            end,
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                written = sum(output.write(chunk) for chunk in chunks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
+        else:
+            target = sys.stdout.buffer
+            for chunk in chunks:
+                target.write(chunk)
+            target.flush()
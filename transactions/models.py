@@ -65,6 +65,9 @@ class Transaction(models.Model):
     status = models.CharField(max_length=40, default='success', blank=True)
     date = models.DateTimeField(auto_now_add=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["user", "date"], name="transaction_user_date_idx")]
+
 
 class WalletTransaction(models.Model):
     sender_wallet = models.ForeignKey("walletservice.Wallet", related_name='sent_transactions', on_delete=models.SET_NULL, null=True, blank=True)
@@ -102,6 +105,12 @@ class WalletTransaction(models.Model):
     status = models.CharField(max_length=40, default='success', blank=True)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["sender_wallet", "date"], name="wallettx_sender_date_idx"),
+            models.Index(fields=["recipient_wallet", "date"], name="wallettx_recipient_date_idx"),
+        ]
+
     def __str__(self):
         return f"Transaction {self.reference} - {self.sender_wallet.user.username if self.sender_wallet else 'Unknown'} to {self.recipient_wallet.user.username if self.recipient_wallet else 'Unknown'} - {self.amount}"
 
@@ -121,5 +130,87 @@ class Deposit(models.Model):
     status = models.CharField(max_length=40, default='success', blank=True)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["user", "date"], name="deposit_user_date_idx")]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.reference} - {self.amount}"
+
+class PayoutBatch(models.Model):
+    """
+    A merchant's bulk wallet-to-bank disbursement (see ``transactions.payouts``).
+
+    The wallet is debited ``total_amount`` once when the batch is created;
+    items that fail are credited back as ``refunded_amount``. A batch stays
+    ``unconfirmed`` while any of its transfers is unconfirmed.
+    ``heartbeat_at`` is refreshed as a worker makes progress on the batch.
+    """
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    UNCONFIRMED = "unconfirmed"
+    COMPLETED = "completed"
+    PARTIAL = "partial"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (PROCESSING, "Processing"),
+        (UNCONFIRMED, "Awaiting confirmation"),
+        (COMPLETED, "Completed"),
+        (PARTIAL, "Partially failed"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey("userservice.Users", on_delete=models.SET_NULL, null=True, blank=True)
+    wallet = models.ForeignKey("walletservice.Wallet", on_delete=models.SET_NULL, null=True, blank=True)
+    reference = models.CharField(max_length=100, unique=True)
+    currency = models.CharField(max_length=10, default="NGN")
+    total_amount = models.DecimalField(decimal_places=2, max_digits=20, default=0.00)
+    refunded_amount = models.DecimalField(decimal_places=2, max_digits=20, default=0.00)
+    item_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="payoutbatch_user_created_idx"),
+            models.Index(fields=["status", "heartbeat_at"], name="payoutbatch_status_hb_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.reference} - {self.item_count} payouts - {self.status}"
+
+
+class PayoutItem(models.Model):
+    """One transfer of a ``PayoutBatch``; ``provider_status`` is Paystack's status for it"""
+    PENDING = "pending"
+    SUBMITTED = "submitted"
+    UNCONFIRMED = "unconfirmed"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SUBMITTED, "Submitted"),
+        (UNCONFIRMED, "Unconfirmed"),
+        (FAILED, "Failed"),
+    ]
+
+    batch = models.ForeignKey(PayoutBatch, related_name="items", on_delete=models.CASCADE)
+    bank_code = models.CharField(max_length=100)
+    account_number = models.CharField(max_length=100)
+    account_name = models.CharField(max_length=255, default="", blank=True)
+    amount = models.DecimalField(decimal_places=2, max_digits=20, validators=[MinValueValidator(Decimal("0.01"))])
+    narration = models.CharField(max_length=255, default="", blank=True)
+    reference = models.CharField(max_length=100, unique=True)
+    recipient_code = models.CharField(max_length=100, default="", blank=True)
+    transfer_code = models.CharField(max_length=100, default="", blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    provider_status = models.CharField(max_length=40, default="", blank=True)
+    error = models.TextField(default="", blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["batch", "status"], name="payoutitem_batch_status_idx")]
+
     def __str__(self):
-        return f"{self.user.email} - {self.reference} - {self.amount}"
\ No newline at end of file
+        return f"{self.reference} - {self.account_number} - {self.amount} - {self.status}"
@@ -0,0 +1,333 @@
+"""
+Bulk wallet-to-bank payouts
+
+``create_batch`` debits the merchant's wallet once, under the wallet lock,
+for the whole batch and records one ``PayoutItem`` per transfer, then queues
+``process_payout_batch``. Processing resolves every account through
+``userservice.recipients.resolve_many`` (cached recipient codes, concurrent
+Paystack calls for the rest) and submits the transfers through Paystack's
+bulk transfer API, ``PAYOUT_CHUNK_SIZE`` at a time. Items are updated chunk
+by chunk so the batch can be polled while it runs.
+
+Items that could not be resolved or that Paystack rejected are credited back
+to the wallet in a single refund. If a chunk gets no answer at all, each of
+its transfers is looked up by reference. Paystack queues bulk transfers, so
+one it does not know yet may still be paid: those transfers are left
+``unconfirmed`` without a refund and the batch stays ``unconfirmed`` too.
+
+``sweep`` (the ``sweep_payout_batches`` beat task) picks up what a lost task
+or worker left behind: it re-queues batches still ``queued`` after
+``PAYOUT_STALE_AFTER`` seconds, resumes ``processing`` batches whose
+heartbeat is that old from their ``pending`` items, and once
+``PAYOUT_CONFIRM_AFTER`` seconds have passed looks up unconfirmed transfers
+again, refunding those Paystack still does not know. Refunds are worked out
+from the batch's failed items and ``refunded_amount`` under the batch lock,
+so settling a batch twice credits nothing the second time.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from transactions import engine
+from transactions.models import PayoutBatch, PayoutItem, Transaction
+from userservice import recipients
+from utils.api import Paystack
+from utils.helpers import get_random_string
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ITEM_FIELDS = [
+    "account_name",
+    "recipient_code",
+    "transfer_code",
+    "status",
+    "provider_status",
+    "error",
+    "updated_at",
+]
+
+
+def create_batch(user, wallet, payouts):
+    """
+    Debit ``wallet`` for every payout and queue the batch. ``payouts`` are
+    dicts with ``bank_code``, ``account_number``, ``amount`` and optionally
+    ``narration``. Raises ``engine.InsufficientFunds``.
+    """
+    reference = f"bp-{get_random_string(12).lower()}"
+    total = sum((Decimal(payout["amount"]) for payout in payouts), Decimal("0.00"))
+    with transaction.atomic():
+        movement = engine.debit(wallet.id, total)
+        batch = PayoutBatch.objects.create(
+            user=user,
+            wallet=wallet,
+            reference=reference,
+            currency=wallet.currency,
+            total_amount=total,
+            item_count=len(payouts),
+        )
+        PayoutItem.objects.bulk_create(
+            PayoutItem(
+                batch=batch,
+                bank_code=payout["bank_code"],
+                account_number=payout["account_number"],
+                amount=Decimal(payout["amount"]),
+                narration=payout.get("narration")
+                or f"Payout from {user.first_name} {user.last_name} via OjaPay",
+                reference=f"{reference}-{position:05d}",
+            )
+            for position, payout in enumerate(payouts, start=1)
+        )
+        Transaction.objects.create(
+            order=reference,
+            reference=reference,
+            amount=total,
+            user=user,
+            balance_before=movement.balance_before,
+            balance_after=movement.balance_after,
+            gateway="OjaPay",
+            note=f"Bulk payout of {len(payouts)} transfers",
+            transaction_type="Bulk Payout",
+            status=PayoutBatch.QUEUED,
+        )
+        transaction.on_commit(lambda: queue(batch.id))
+    metrics.incr("payouts.items", len(payouts))
+    return batch
+
+
+def queue(batch_id):
+    from transactions.tasks import process_payout_batch
+
+    try:
+        process_payout_batch.delay(batch_id)
+    except Exception:
+        logger.exception("Could not queue payout batch %s", batch_id)
+
+
+def _fail(items, error):
+    for item in items:
+        item.status = PayoutItem.FAILED
+        item.error = error
+
+
+def _lookup(items, settle):
+    """
+    Look each item up by reference. Transfers Paystack knows are submitted;
+    the rest are failed when ``settle`` is set and left unconfirmed otherwise.
+    Lookups that get no answer always leave the item unconfirmed.
+    """
+    for item in items:
+        try:
+            found = Paystack.verify_transfer(item.reference)
+        except RequestException as e:
+            item.status, item.error = (
+                PayoutItem.UNCONFIRMED,
+                f"Could not confirm with Paystack: {e}",
+            )
+            continue
+        if found.get("status"):
+            item.status, item.error = PayoutItem.SUBMITTED, ""
+            item.transfer_code = found["data"].get("transfer_code", "")
+            item.provider_status = found["data"].get("status", "")
+        elif settle:
+            _fail([item], found.get("message") or "Transfer not found")
+        else:
+            # A bulk transfer queued moments ago may not be visible yet
+            item.status, item.error = (
+                PayoutItem.UNCONFIRMED,
+                found.get("message") or "Transfer not found yet",
+            )
+
+
+def submit(items, currency):
+    """Send one chunk through Paystack's bulk transfer API and record the outcome on ``items``"""
+    transfers = [
+        {
+            "amount": int(item.amount * 100),
+            "reference": item.reference,
+            "reason": item.narration,
+            "recipient": item.recipient_code,
+        }
+        for item in items
+    ]
+    try:
+        with metrics.time("payouts.submit"):
+            response = Paystack.bulk_transfer(transfers, currency=currency)
+    except RequestException:
+        _lookup(items, settle=False)
+        return
+    if not response.get("status"):
+        _fail(items, response.get("message") or "Rejected by Paystack")
+        # A rejected chunk may carry a stale recipient code
+        for item in items:
+            recipients.invalidate(item.bank_code, item.account_number)
+        return
+    accepted = {row.get("reference"): row for row in response.get("data") or []}
+    for item in items:
+        row = accepted.get(item.reference)
+        if row is None:
+            _fail([item], "Not accepted by Paystack")
+        else:
+            item.status = PayoutItem.SUBMITTED
+            item.transfer_code = row.get("transfer_code", "")
+            item.provider_status = row.get("status", "")
+
+
+def process_batch(batch_id):
+    """Resolve, submit and settle a queued batch; returns the number of items per status"""
+    # Only one worker gets to process a batch
+    claimed = PayoutBatch.objects.filter(id=batch_id, status=PayoutBatch.QUEUED).update(
+        status=PayoutBatch.PROCESSING, heartbeat_at=timezone.now()
+    )
+    if not claimed:
+        return {}
+    return _run(PayoutBatch.objects.get(id=batch_id))
+
+
+def resume_batch(batch_id, stale_before):
+    """
+    Take over a ``processing`` batch whose heartbeat is older than
+    ``stale_before`` and finish it from its pending items. Pending items that
+    already carry a recipient code were in a chunk being submitted when the
+    worker stopped, so they are left for ``confirm_batch`` rather than sent
+    again.
+    """
+    claimed = PayoutBatch.objects.filter(
+        id=batch_id, status=PayoutBatch.PROCESSING, heartbeat_at__lt=stale_before
+    ).update(heartbeat_at=timezone.now())
+    if not claimed:
+        return {}
+    batch = PayoutBatch.objects.get(id=batch_id)
+    batch.items.filter(status=PayoutItem.PENDING).exclude(recipient_code="").update(
+        status=PayoutItem.UNCONFIRMED, error="Submission interrupted", updated_at=timezone.now()
+    )
+    return _run(batch)
+
+
+def confirm_batch(batch_id, settle_before):
+    """
+    Look up the unconfirmed transfers of a batch last worked on before
+    ``settle_before``, refunding those Paystack does not know
+    """
+    claimed = PayoutBatch.objects.filter(
+        id=batch_id, status=PayoutBatch.UNCONFIRMED, heartbeat_at__lt=settle_before
+    ).update(heartbeat_at=timezone.now())
+    if not claimed:
+        return {}
+    batch = PayoutBatch.objects.get(id=batch_id)
+    items = list(batch.items.filter(status=PayoutItem.UNCONFIRMED).order_by("id"))
+    _lookup(items, settle=True)
+    PayoutItem.objects.bulk_update(items, ITEM_FIELDS)
+    metrics.incr("payouts.failed", sum(item.status == PayoutItem.FAILED for item in items))
+    return _settle(batch)
+
+
+def _run(batch):
+    items = list(batch.items.filter(status=PayoutItem.PENDING).order_by("id"))
+
+    with metrics.time("payouts.resolve"):
+        resolved, errors = recipients.resolve_many(
+            {(item.bank_code, item.account_number) for item in items},
+            workers=getattr(settings, "PAYOUT_RESOLVE_CONCURRENCY", 8),
+        )
+    ready = []
+    for item in items:
+        account = (item.bank_code, item.account_number)
+        if account in errors:
+            _fail([item], errors[account])
+        else:
+            item.account_name = resolved[account].account_name
+            item.recipient_code = resolved[account].recipient_code
+            ready.append(item)
+    PayoutItem.objects.bulk_update(
+        [item for item in items if item.status == PayoutItem.FAILED], ITEM_FIELDS
+    )
+    PayoutBatch.objects.filter(id=batch.id).update(heartbeat_at=timezone.now())
+
+    size = getattr(settings, "PAYOUT_CHUNK_SIZE", 100)
+    for start in range(0, len(ready), size):
+        chunk = ready[start : start + size]
+        # Recorded before sending so a resumed batch knows this chunk may have gone out
+        PayoutItem.objects.bulk_update(chunk, ["account_name", "recipient_code"])
+        submit(chunk, batch.currency)
+        PayoutItem.objects.bulk_update(chunk, ITEM_FIELDS)
+        PayoutBatch.objects.filter(id=batch.id).update(heartbeat_at=timezone.now())
+
+    metrics.incr("payouts.failed", sum(item.status == PayoutItem.FAILED for item in items))
+    return _settle(batch)
+
+
+def _settle(batch):
+    """Refund failed items not refunded yet and set the batch status from its items"""
+    with transaction.atomic():
+        batch = PayoutBatch.objects.select_for_update().get(id=batch.id)
+        counts = dict(batch.items.values_list("status").annotate(count=Count("id")).order_by())
+        failed = batch.items.filter(status=PayoutItem.FAILED).aggregate(total=Sum("amount"))[
+            "total"
+        ] or Decimal("0.00")
+        refund = failed - batch.refunded_amount
+        if refund > 0:
+            movement = engine.credit(batch.wallet_id, refund)
+            refunds = Transaction.objects.filter(
+                order=batch.reference, transaction_type="Bulk Payout Refund"
+            ).count()
+            Transaction.objects.create(
+                order=batch.reference,
+                reference=f"{batch.reference}-refund" + (f"-{refunds + 1}" if refunds else ""),
+                amount=refund,
+                user_id=batch.user_id,
+                balance_before=movement.balance_before,
+                balance_after=movement.balance_after,
+                gateway="OjaPay",
+                note=f"Refund of failed payouts ({counts.get(PayoutItem.FAILED, 0)} in batch)",
+                transaction_type="Bulk Payout Refund",
+            )
+            batch.refunded_amount = failed
+        if counts.get(PayoutItem.UNCONFIRMED) or counts.get(PayoutItem.PENDING):
+            batch.status = PayoutBatch.UNCONFIRMED
+        elif not counts.get(PayoutItem.FAILED):
+            batch.status = PayoutBatch.COMPLETED
+        elif not counts.get(PayoutItem.SUBMITTED):
+            batch.status = PayoutBatch.FAILED
+        else:
+            batch.status = PayoutBatch.PARTIAL
+        if batch.status != PayoutBatch.UNCONFIRMED:
+            batch.completed_at = timezone.now()
+        batch.save(update_fields=["status", "refunded_amount", "completed_at"])
+        Transaction.objects.filter(reference=batch.reference).update(status=batch.status)
+    return counts
+
+
+def sweep(now=None):
+    """
+    Re-queue, resume or confirm batches left behind by a lost task or
+    worker; returns the number of batches handled per action
+    """
+    now = now or timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, "PAYOUT_STALE_AFTER", 900))
+    settle_before = now - timedelta(seconds=getattr(settings, "PAYOUT_CONFIRM_AFTER", 1800))
+    swept = {"requeued": 0, "resumed": 0, "confirmed": 0}
+
+    for batch_id in PayoutBatch.objects.filter(
+        status=PayoutBatch.QUEUED, created_at__lt=stale_before
+    ).values_list("id", flat=True):
+        queue(batch_id)
+        swept["requeued"] += 1
+    for batch_id in PayoutBatch.objects.filter(
+        status=PayoutBatch.PROCESSING, heartbeat_at__lt=stale_before
+    ).values_list("id", flat=True):
+        if resume_batch(batch_id, stale_before):
+            swept["resumed"] += 1
+    for batch_id in PayoutBatch.objects.filter(
+        status=PayoutBatch.UNCONFIRMED, heartbeat_at__lt=settle_before
+    ).values_list("id", flat=True):
+        if confirm_batch(batch_id, settle_before):
+            swept["confirmed"] += 1
+    return swept
@@ -2,15 +2,17 @@
 Serializer for Transaction Model
 """
 
+from decimal import Decimal
 from typing import Any, Dict
 
 from rest_framework import serializers
 
 from walletservice.models import Wallet
 
-from .models import Deposit, Transaction
+from .models import Deposit, PayoutBatch, PayoutItem, Transaction, WalletTransaction
 
-from merchantservice.serializers import RetrieveMerchantSerializer
+from merchantservice.serializers import RetrieveMerchantSerializer, UserSummarySerializer
+from utils.serializers import SparseFieldsMixin
 
 
 class DepositSerializer(serializers.ModelSerializer):
@@ -19,6 +21,81 @@ class DepositSerializer(serializers.ModelSerializer):
         model = Deposit
         fields = "__all__"
 
+
+class DepositListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Read-only deposit row for lists; build the queryset with ``project``"""
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Deposit
+        fields = "__all__"
+        read_only_fields = [field.name for field in Deposit._meta.fields]
+
+
+class WalletTransactionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Read-only wallet transfer row for lists; wallets are given by id"""
+
+    class Meta:
+        model = WalletTransaction
+        fields = "__all__"
+        read_only_fields = [field.name for field in WalletTransaction._meta.fields]
+
+
+class TransactionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Read-only withdrawal row for lists; build the queryset with ``project``"""
+    user = UserSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = "__all__"
+        read_only_fields = [field.name for field in Transaction._meta.fields]
+
+
+class PayoutRequestSerializer(serializers.Serializer):
+    """One transfer in a bulk payout request"""
+    bank_code = serializers.CharField(max_length=100)
+    account_number = serializers.RegexField(r"^\d{10}$", error_messages={"invalid": "Enter a 10-digit account number."})
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2, min_value=Decimal("1.00"))
+    narration = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+
+class PayoutItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PayoutItem
+        exclude = ("batch", "recipient_code")
+        read_only_fields = [field.name for field in PayoutItem._meta.fields]
+
+
+class PayoutBatchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PayoutBatch
+        exclude = ("user", "wallet", "heartbeat_at")
+        read_only_fields = [field.name for field in PayoutBatch._meta.fields]
+
+
+class LedgerEntrySerializer(SparseFieldsMixin, serializers.Serializer):
+    """
+    One row of the unified ledger (see ``transactions.ledger``).
+
+    ``kind`` is ``deposit``, ``transfer`` or ``withdrawal``; ``id`` is the
+    primary key within that kind's table.
+    """
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    date = serializers.DateTimeField()
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+    fee = serializers.DecimalField(max_digits=20, decimal_places=2)
+    balance_before = serializers.DecimalField(max_digits=20, decimal_places=2)
+    balance_after = serializers.DecimalField(max_digits=20, decimal_places=2)
+    order = serializers.CharField()
+    reference = serializers.CharField()
+    note = serializers.CharField()
+    gateway = serializers.CharField()
+    transaction_type = serializers.CharField()
+    payment_type = serializers.CharField()
+    status = serializers.CharField()
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     """
     Serializer for Transaction Model.
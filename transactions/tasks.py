@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from .payouts import process_batch, sweep
+
+
+@shared_task
+def process_payout_batch(batch_id):
+    """Resolve and submit the transfers of a bulk payout batch"""
+    return process_batch(batch_id)
+
+
+@shared_task
+def sweep_payout_batches():
+    """Re-queue, resume or confirm payout batches left behind by a lost task or worker"""
+    return sweep()
@@ -1,6 +1,6 @@
 from django.urls import re_path as path
 
-from transactions.views import DepositWallet, CombinedTransactionView, AllTransactionView
+from transactions.views import DepositWallet, CombinedTransactionView, AllTransactionView, TransactionExportView
 
 # from transactions.views import TransactionDetail, TransactionList, TransactionWalletList
 
@@ -10,6 +10,7 @@ urlpatterns = [
     path(r"^transactions/$", CombinedTransactionView.as_view(), name="transactions"),
     path(r"^transactions/(?P<ref>[\w-]+)/$", CombinedTransactionView.as_view(), name="user-transactions"),
     path(r"^all-transactions/$", AllTransactionView.as_view(), name="all-transactions"),
+    path(r"^all-transactions/export/$", TransactionExportView.as_view(), name="export-transactions"),
     # AllTransactionView
     # path("", TransactionList.as_view(), name="transaction-list"),
     # path(
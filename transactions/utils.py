@@ -4,24 +4,25 @@ Transaction Business Logic
 
 from decimal import Decimal
 
-from django.db import transaction
 from rest_framework import serializers
 
+from transactions import engine
 from transactions.models import Transaction
 
 
-@transaction.atomic
 def wallet_transaction(sender_wallet, receiver_wallet, transfer_amount, commission):
     """Transaction between two wallets"""
-    if sender_wallet.balance - transfer_amount < Decimal("0"):
+    try:
+        result = engine.transfer(
+            sender_wallet.id, receiver_wallet.id, transfer_amount, fee=commission, record=False
+        )
+    except engine.InsufficientFunds:
         raise serializers.ValidationError(
             f"User does not have enough money on wallet {sender_wallet.name}"
         )
 
-    sender_wallet.balance -= transfer_amount + commission
-    receiver_wallet.balance += transfer_amount
-    receiver_wallet.save()
-    sender_wallet.save()
+    sender_wallet.balance = result.sender.balance_after
+    receiver_wallet.balance = result.recipient.balance_after
 
 
 def commission_calculation(sender, receiver, transfer_amount):
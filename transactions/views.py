@@ -2,8 +2,11 @@
 Transaction Views
 """
 
+from itertools import groupby
+
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.db.models.query import QuerySet
 from rest_framework import generics, permissions, status
 from rest_framework.exceptions import ValidationError
@@ -11,12 +14,23 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 
 from amaps.permissions import IsSenderOrReceiverOwner, IsSenderOwner
+from transactions import export
+from transactions.ledger import DEFAULT_PAGE_SIZE, InvalidCursor, ledger_page
 from transactions.models import Deposit, WalletTransaction, Transaction
-from transactions.serializers import DepositSerializer, TransactionSerializer
+from transactions.serializers import (
+    DepositListSerializer,
+    DepositSerializer,
+    LedgerEntrySerializer,
+    TransactionListSerializer,
+    TransactionSerializer,
+    WalletTransactionListSerializer,
+)
 from transactions.utils import commission_calculation, wallet_transaction
 from userservice.models import Donation
+from utils.helpers import parse_bound
 
 # from .models import Transaction
 
@@ -28,17 +42,15 @@ class DepositWallet(APIView):
             serializer = DepositSerializer(deposit)
             return Response({"status": "success", "response": "", "data": serializer.data}, status=status.HTTP_200_OK)
         else:
-            deposits = Deposit.objects.all()
-            serializer = DepositSerializer(deposits, many=True)
+            context = {"request": request}
+            deposits = DepositListSerializer.project(Deposit.objects.all(), context)
+            serializer = DepositListSerializer(deposits, many=True, context=context)
             return Response({"status": "success", "response": "", "data": serializer.data}, status=status.HTTP_200_OK)
         
 
 class CombinedTransactionView(APIView):
     def get(self, request, ref=None):
         user = request.user
-        paginator = PageNumberPagination()
-        paginator.page_size = 1000  # Set the default page size
-
         search_query = request.GET.get('search', '')  # Get the search query from the request
         if ref:
             try:
@@ -64,51 +76,40 @@ class CombinedTransactionView(APIView):
                 return Response({"status": "error", "response": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         elif user:
             try:
-                # Combine all transactions
-                deposit_transactions = Deposit.objects.filter(user_id=user.id).order_by('-date')
-                wallet_transactions = WalletTransaction.objects.filter(sender_wallet__user_id=user.id).order_by('-date') | WalletTransaction.objects.filter(recipient_wallet__user_id=user.id).order_by('-date')
-                withdrawal_transactions = Transaction.objects.filter(user_id=user.id).order_by('-date')
-                # donation_transactions = Donation.objects.all().order_by('-date')
-                
-                # print("deposit transactions: ", list(deposit_transactions.values()))
-                # print()
-                # print("wallet transactions: ", list(wallet_transactions.values()))
-                # print()
-                # print("transactions: ", list(withdrawal_transactions.values()))
-
-                # Apply search filter
-                if search_query:
-                    deposit_transactions = deposit_transactions.filter(Q(reference__icontains=search_query) | Q(amount__icontains=search_query) | Q(date__icontains=search_query) | Q(payment_type__icontains=search_query))
-                    wallet_transactions = wallet_transactions.filter(Q(reference__icontains=search_query) | Q(amount__icontains=search_query) | Q(date__icontains=search_query) | Q(payment_type__icontains=search_query))
-                    withdrawal_transactions = withdrawal_transactions.filter(Q(reference__icontains=search_query) | Q(amount__icontains=search_query) | Q(date__icontains=search_query) | Q(payment_type__icontains=search_query))
-                    # donation_transactions = donation_transactions.filter(Q(reference__icontains=search_query) | Q(amount__icontains=search_query) | Q(date__icontains=search_query) | Q(payment_type__icontains=search_query))
-
-                # Combine all the querysets into one list
-                all_transactions = list(deposit_transactions) + list(wallet_transactions) + list(withdrawal_transactions)
-
-                # Paginate the combined list
-                paginated_transactions = paginator.paginate_queryset(all_transactions, request)
-                
-                # Serialize the paginated transactions
-                deposit_serializer = DepositSerializer(paginated_transactions, many=True)
-                result = paginator.get_paginated_response(deposit_serializer.data)
-                print("paginated transactions: ", result.data)
-                return paginator.get_paginated_response(deposit_serializer.data)
-
+                # One UNION ALL page of deposits, wallet transfers and withdrawals, newest first
+                rows, next_cursor = ledger_page(
+                    user,
+                    cursor=request.GET.get('cursor'),
+                    page_size=request.GET.get('page_size', DEFAULT_PAGE_SIZE),
+                    search=search_query,
+                )
+                next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None
+                serializer = LedgerEntrySerializer(rows, many=True, context={"request": request})
+                return Response({"next": next_url, "results": serializer.data}, status=status.HTTP_200_OK)
+
+            except (InvalidCursor, ValueError) as e:
+                return Response({"status": "error", "response": str(e)}, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
                 return Response({"status": "error", "response": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
        
 
 class AllTransactionView(APIView):
+    list_serializers = {
+        Deposit: DepositListSerializer,
+        WalletTransaction: WalletTransactionListSerializer,
+        Transaction: TransactionListSerializer,
+    }
+
     def get(self, request):
         paginator = PageNumberPagination()
         paginator.page_size = 100000  
+        context = {"request": request}
         try:
-            # Get all transactions
-            deposit_transactions = Deposit.objects.all().order_by('-date')
-            wallet_transactions = WalletTransaction.objects.all().order_by('-date')
-            withdrawal_transactions = Transaction.objects.all().order_by('-date')
+            # Get all transactions, each with only the columns its list serializer reads
+            deposit_transactions = DepositListSerializer.project(Deposit.objects.order_by('-date'), context)
+            wallet_transactions = WalletTransactionListSerializer.project(WalletTransaction.objects.order_by('-date'), context)
+            withdrawal_transactions = TransactionListSerializer.project(Transaction.objects.order_by('-date'), context)
             # donation_transactions = Donation.objects.all().order_by('-date')
 
             # Combine all the querysets into one list
@@ -116,12 +117,42 @@ class AllTransactionView(APIView):
             # Paginate the combined list
             paginated_transactions = paginator.paginate_queryset(all_transactions, request)
             
-            # Serialize the paginated transactions
-            deposit_serializer = DepositSerializer(paginated_transactions, many=True)
-            return paginator.get_paginated_response(deposit_serializer.data)
+            # Serialize the paginated transactions, one list serializer per run of the same kind
+            data = []
+            for model, rows in groupby(paginated_transactions, key=type):
+                data.extend(self.list_serializers[model](list(rows), many=True, context=context).data)
+            return paginator.get_paginated_response(data)
 
         except Exception as e:
             return Response({"status": "error", "response": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TransactionExportView(APIView):
+    """
+    Stream every transaction as NDJSON or CSV.
+
+    Query params: ``output`` (ndjson|csv; ``format`` is taken by DRF), ``start``/``end`` (ISO date or
+    datetime, ``end`` exclusive unless a bare date) and ``gzip=1``.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        fmt = request.GET.get('output', 'ndjson')
+        compress = request.GET.get('gzip') in ('1', 'true')
+        try:
+            start = parse_bound(request.GET.get('start'))
+            end = parse_bound(request.GET.get('end'), end=True)
+            chunks = export.export(fmt, start, end, compress=compress)
+        except ValueError as e:
+            return Response({"status": "error", "response": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            chunks, content_type="application/gzip" if compress else export.FORMATS[fmt]
+        )
+        response["Content-Disposition"] = f'attachment; filename="{export.filename(fmt, compress)}"'
+        return response
+
+
 '''       
 class TransactionList(generics.ListCreateAPIView):
     """
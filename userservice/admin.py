@@ -1,9 +1,10 @@
 from django.contrib import admin
 
-from .models import LoginAttempt, OTPVerification, Users
+from .models import LoginAttempt, OTPVerification, ResolvedRecipient, Users
 
 # Register your models here.
 
 admin.site.register(Users)
 admin.site.register(LoginAttempt)
 admin.site.register(OTPVerification)
+admin.site.register(ResolvedRecipient)
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class UserserviceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "userservice"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .identity import invalidate_on_change
+        from .models import Users
+        from .tags import index_user, unindex_user
+
+        post_save.connect(invalidate_on_change, sender=Users, dispatch_uid="identity-users-save")
+        post_delete.connect(invalidate_on_change, sender=Users, dispatch_uid="identity-users-delete")
+        post_save.connect(index_user, sender=Users, dispatch_uid="tag-index-users-save")
+        post_delete.connect(unindex_user, sender=Users, dispatch_uid="tag-index-users-delete")
@@ -1,11 +1,7 @@
-import json
-import os
 from datetime import datetime, date
-import geoip2 # type: ignore
 from django.conf import settings
 from django.contrib.auth import authenticate, login, update_session_auth_hash
 from django.contrib.auth.hashers import check_password, make_password
-from django.contrib.gis.geoip2 import GeoIP2
 from django.template.loader import render_to_string
 from django.utils import timezone
 from rest_framework import status, generics, permissions, viewsets
@@ -18,14 +14,20 @@ from amaps.sendmail import PlainEmail, SendMail
 from .serializers import RetrieveUserSerializer, UsersSerializer, RecipientSerializer, DonationSerializer
 from rest_framework_simplejwt.authentication import JWTAuthentication # type: ignore
 from utils.api import Paystack
-from utils.helpers import GenerateOTP, is_nigerian_phone_number, validate_password_strength
+from utils.countries import countries
+from utils.geo import geolocator
+from utils.helpers import is_nigerian_phone_number, validate_password_strength
 from walletservice.models import VirtualAccount, Wallet
 from walletservice.serializers import WalletSerializer
 import phonenumbers
 from phonenumbers.phonenumberutil import NumberParseException
 
 from . import constants
-from .models import LoginAttempt, OTPVerification, PreviousPassword, Users, Recipient, Donation
+from . import otp as otps
+from .identity import find_user
+from .ratelimit import audit, login_limiter
+from .tasks import record_login_failure, reset_login_attempts
+from .models import PreviousPassword, Users, Recipient, Donation
 
 
 class SignUp(APIView):
@@ -59,7 +61,7 @@ class SignUp(APIView):
             )
 
         # Check if email already exists
-        check_email = Users.objects.filter(email=email.lower()).exists()
+        check_email = find_user(email=email.lower()) is not None
         if check_email:
             return Response(
                 {"status": "error", "response": "Email already exists."},
@@ -80,9 +82,16 @@ class SignUp(APIView):
                 {"status": "error", "response": valid_email}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Store the canonical country name when the app sends a code or a known name
+        country_info = countries.lookup(country)
+        if country_info:
+            country = country_info.name
+
         # Validate and format the phone number
         try:
-            phone_obj = phonenumbers.parse(phone_number, None)  # None to auto-detect country code
+            # Numbers without a +prefix are read in the signup country's dialing plan
+            region = country_info.alpha2 if country_info else None
+            phone_obj = phonenumbers.parse(phone_number, region)
             print(f"PHONE NUMBER: Country Code: {phone_obj.country_code}, National Number: {phone_obj.national_number}")
             # Check if the phone number is a possible number
             if not phonenumbers.is_possible_number(phone_obj):
@@ -100,15 +109,14 @@ class SignUp(APIView):
             )
 
         # Check if phone number already exists
-        check_phone = Users.objects.filter(phone_number=mobile).exists()
+        check_phone = find_user(phone_number=mobile) is not None
         if check_phone:
             return Response(
                 {"status": "error", "response": "Phone number already exists."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Generate OTP and determine user type
-        otp = GenerateOTP(6)
+        # Determine user type
         user_type = "Customer" if user_type.lower() == "customer" else "Merchant"
 
         # Create user
@@ -126,15 +134,10 @@ class SignUp(APIView):
         obj.save()
 
         # Send OTP email
+        otp = otps.issue(obj.id, "signup", ttl=constants.SIGNUP_OTP_TTL)
         msg = f"Hi {last_name}, your OTP code is {otp} and is only valid till the next 24 hours."
         PlainEmail(msg, email.lower(), "OjaPay: Your OTP has arrived.")
 
-        # Handle OTP Verification
-        check_otp = OTPVerification.objects.filter(user=obj)
-        if check_otp.exists():
-            check_otp.delete()
-        OTPVerification.objects.create(user=obj, email_otp=make_password(otp))
-
         return Response(
             {
                 "status": "success",
@@ -154,31 +157,26 @@ class VerifyOTP(APIView):
 		currency = request.data.get("currency", None)
 		country = request.data.get("country", None)
 		print("code: ", code, "email: ", email, "currency: ", currency, "country: ", country)
-		check_email = Users.objects.filter(email=email.lower()).exists()
-		if check_email == False:
+		user = find_user(email=email.lower())
+		if user is None:
 			return Response(
 				{"status": "error", "response": "Invalid code/code has expired."},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
 
-		user = Users.objects.get(email=email.lower())
-		check_otp = OTPVerification.objects.filter(user=user).exists()
-		if check_otp == False:
-			return Response(
-				{"status": "error", "response": "Invalid code"},
-				status=status.HTTP_400_BAD_REQUEST,
-			)
-		otp = OTPVerification.objects.get(user=user)
-		if check_password(code, otp.email_otp) == False:
+		try:
+			otps.verify(user.id, "signup", code)
+		except otps.OTPError:
 			return Response(
 				{"status": "error", "response": "Invalid code or code has expired."},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
-		otp.delete()
-		# Check if the user's currency exist in Currency model
+		# Default the first wallet to the currency of the user's country
+		country = country or user.country
+		currency = (currency or countries.currency(country, default="NGN")).upper()
 		Wallet.objects.create(user=user, currency=currency, name=country)
 		user.is_activated = True
-		user.save()
+		user.save(update_fields=["is_activated"])
 		return Response(
 			{"status": "success", "response": "Validated Successfully."},
 			status=status.HTTP_200_OK,
@@ -200,34 +198,14 @@ class Login(APIView):
 				{"status": "error", "message": "All fields are required."},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
-		user = authenticate(username=email, password=password)
 		remote_address = request.META.get("HTTP_X_FORWARDED_FOR")
 		if remote_address:
 			ip_address = remote_address.split(",")[-1].strip()
 		else:
 			ip_address = request.META.get("REMOTE_ADDR")
-		geopath = os.path.join(settings.BASE_DIR, "staticfiles/geoip/GeoLite2-Country.mmdb")
-		try:
-			g = GeoIP2(path=geopath)
-			countrycode = g.country_code(ip_address)
-		except geoip2.errors.AddressNotFoundError:
-			countrycode = "NG"
-		# Get the country name and code
-		with open(
-			os.path.join(settings.BASE_DIR, "staticfiles/json/countries.json"),
-			encoding="utf8",
-		) as f:
-			data = json.load(f)
-			for keyval in data:
-				if countrycode == keyval["isoAlpha2"]:
-					code = keyval["currency"]["code"]
-					location = keyval["name"]
-
-		# Get the user agent values
-		browser = f"{request.user_agent.browser.family} {request.user_agent.browser.version_string}"
-		OS = f"{request.user_agent.os.family} {request.user_agent.os.version_string}"
-
-		if LoginAttempt.is_ip_locked(ip_address):
+		# Refuse locked-out clients before paying for a password hash
+		limiter = login_limiter(self)
+		if limiter.is_locked(ip_address, email):
 			return Response(
 				{
 					"status": "error",
@@ -235,6 +213,14 @@ class Login(APIView):
 				},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
+		user = authenticate(username=email, password=password)
+		countrycode = geolocator.country_code(ip_address, default="NG")
+		location = countries.name(countrycode, default=countrycode)
+
+		# Get the user agent values
+		browser = f"{request.user_agent.browser.family} {request.user_agent.browser.version_string}"
+		OS = f"{request.user_agent.os.family} {request.user_agent.os.version_string}"
+
 		if user is not None:
 			# Check if the user account is locked
 			if user.is_locked:
@@ -252,7 +238,8 @@ class Login(APIView):
 				serializer = self.serializer_class(user, data=request.data)
 				if serializer.is_valid():
 					serializer.save()
-				LoginAttempt.reset_attempts(ip_address)
+				if limiter.reset(ip_address, email):
+					audit(reset_login_attempts, ip_address)
 
 				# Check if the user logged in from a new device
 				if user.last_login_ip != ip_address or OS != user.last_login_user_agent:
@@ -279,7 +266,7 @@ class Login(APIView):
 					# Return a default wallet structure if no records are found
 					default_wallet = {
 						"id": user.id,
-						"currency": "NGN",
+						"currency": countries.currency(user.country, default="NGN"),
 						"balance": 0.0
         		}
 					user_wallet = [default_wallet]
@@ -306,20 +293,19 @@ class Login(APIView):
 
 		else:
 			# Login failed, increase login attempts
-			LoginAttempt.add_attempt(ip_address)
-			remaining_attempts = self.max_login_attempts - LoginAttempt.get_attempts(ip_address)
+			verdict = limiter.register_failure(ip_address, email)
+			audit(record_login_failure, ip_address, email, verdict.attempts, verdict.locked)
 
-			if remaining_attempts > 0:
+			if not verdict.locked:
 				return Response(
 					{
 						"status": "error",
-						"response": f"Invalid login credentials. You have {remaining_attempts} attempts remaining.",
+						"response": f"Invalid login credentials. You have {verdict.remaining} attempts remaining.",
 					},
 					status=status.HTTP_401_UNAUTHORIZED,
 				)
 			else:
-				# Lock the user's account for 15 minutes
-				LoginAttempt.lock_user(ip_address)
+				# The limiter holds the lock for 15 minutes; the audit task locks the accounts
 				return Response(
 					{
 						"status": "error",
@@ -396,20 +382,17 @@ class UpdateWalletPin(APIView):
 			user = request.user
 			wallet_pin = request.data.get("wallet_pin", None)
 			code = request.data.get("otp", None)
-			check_otp = OTPVerification.objects.filter(user=user).exists()
-			if check_otp == False:
-				return Response({"status": "error", "response": "Invalid code or code has expired."}, status=status.HTTP_400_BAD_REQUEST)
-			otp = OTPVerification.objects.get(user=user)
-			if check_password(code, otp.email_otp) == False:
+			if len(wallet_pin or "") != 4:
+				return Response({"status": "error", "response": "Wallet pin must not be more or less than 4 digits"}, status=status.HTTP_400_BAD_REQUEST)
+			try:
+				otps.verify(user.id, "wallet_pin", code)
+			except otps.OTPError:
 				return Response({"status": "error", "response": "Invalid code or code has expired."}, status=status.HTTP_400_BAD_REQUEST)
 			# if otp.expiry.replace(tzinfo=pytz.UTC) < datetime.now().replace(tzinfo=pytz.UTC):
 			# 	return Response({"status": False, "message": "code has expired. Kindly request another."}, status=status.HTTP_400_BAD_REQUEST)
 
-			if len(wallet_pin) > 4 or len(wallet_pin) < 4:
-				return Response({"status": "error", "response": "Wallet pin must not be more or less than 4 digits"}, status=status.HTTP_400_BAD_REQUEST)
 			user.wallet_pin = make_password(wallet_pin)
 			user.save()
-			otp.delete()
 			title2 = f"Transaction Pin Changed"
 			note2 = f"Transaction Pin changed occurred from your account recently."
 			# CreateActivityNotification(user, "Notice", title2, note2)
@@ -430,10 +413,7 @@ class UpdateWalletPin(APIView):
 	# permission_classes = [IsUserActive]
 	def get(self, request):
 		user = request.user
-		otp = GenerateOTP(4)
-		check_otp = OTPVerification.objects.filter(user=user).last()
-		check_otp.delete() if check_otp != None else ''
-		save_otp = OTPVerification.objects.create(user=user,email_otp=make_password(otp))
+		otp = otps.issue(user.id, "wallet_pin", length=4)
 		# Send OTP
 		msg = f"Hi {user.last_name}, your OTP code for updating your wallet pin is {otp} and is only valid till the next 5 minutes."
 		# try:
@@ -1 +1,2 @@
 MAX_LOGIN_ATTEMPTS = 3
+SIGNUP_OTP_TTL = 24 * 60 * 60  # 24 hours in seconds
@@ -0,0 +1,115 @@
+"""
+Read-through user lookup cache
+
+``get_user(email=...)``, ``get_user(username=...)`` (the ojapay tag),
+``get_user(phone_number=...)`` and ``get_user(id=...)`` resolve through the
+cache before the database. Each identifier maps to the user's id, and the id
+to the user's ``CACHED_FIELDS``, so an entry is dropped in one place when
+the user changes: ``Users.save``/``delete`` signals call ``invalidate_users``,
+and queryset ``update()`` callers on ``Users`` call ``invalidate_changed``. A hit is
+only served if the entry still carries the identifier it was looked up by,
+so an entry left under a changed email or tag falls through to the database.
+
+Password and PIN hashes never reach the shared cache: a hit is a ``Users``
+with every other field deferred, loaded from the database on first access.
+Saving one only writes the fields it has loaded, so callers that change a
+user pass ``update_fields`` for just what they changed.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+
+from utils.metrics import metrics
+
+KEY_PREFIX = "userservice:identity"
+IDENTIFIERS = ("id", "email", "username", "phone_number")
+CACHED_FIELDS = IDENTIFIERS + ("first_name", "last_name")
+
+
+def _cache():
+    return caches[getattr(settings, "IDENTITY_CACHE", "default")]
+
+
+def _ttl():
+    return getattr(settings, "IDENTITY_CACHE_TTL", 300)
+
+
+def _user_key(user_id):
+    return f"{KEY_PREFIX}:user:{user_id}"
+
+
+def _lookup_key(field, value):
+    digest = hashlib.sha256(str(value).encode()).hexdigest()[:32]
+    return f"{KEY_PREFIX}:{field}:{digest}"
+
+
+def _field(lookup):
+    if len(lookup) != 1:
+        raise TypeError("get_user() takes exactly one identifier")
+    ((field, value),) = lookup.items()
+    field = "id" if field == "pk" else field
+    if field not in IDENTIFIERS:
+        raise TypeError(f"Cannot look users up by '{field}'; use one of {', '.join(IDENTIFIERS)}")
+    return field, value
+
+
+def get_user(**lookup):
+    """The user with the given identifier; raises ``Users.DoesNotExist`` like ``Users.objects.get``"""
+    from .models import Users
+
+    field, value = _field(lookup)
+    cache = _cache()
+    user_id = value if field == "id" else cache.get(_lookup_key(field, value))
+    if user_id is not None:
+        fields = cache.get(_user_key(user_id))
+        if fields is not None and str(fields[field]) == str(value):
+            metrics.incr("identity.hits")
+            return _deferred_user(Users, fields)
+
+    metrics.incr("identity.misses")
+    user = Users.objects.get(**{field: value})
+    remember(user)
+    return user
+
+
+def find_user(**lookup):
+    """Like ``get_user`` but returns ``None`` when there is no such user"""
+    from .models import Users
+
+    try:
+        return get_user(**lookup)
+    except Users.DoesNotExist:
+        return None
+
+
+def _deferred_user(model, fields):
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in fields]
+    return model.from_db(router.db_for_read(model), names, [fields[name] for name in names])
+
+
+def remember(user):
+    entries = {_user_key(user.pk): {field: getattr(user, field) for field in CACHED_FIELDS}}
+    for field in IDENTIFIERS[1:]:
+        value = getattr(user, field)
+        if value:
+            entries[_lookup_key(field, value)] = user.pk
+    _cache().set_many(entries, _ttl())
+
+
+def invalidate_users(*user_ids):
+    _cache().delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+def invalidate_changed(*user_ids):
+    """Drop users just written to, for ``update()`` callers that bypass the signals"""
+    invalidate_users(*user_ids)
+    # Again once the change is visible, in case a reader re-cached the old row meanwhile
+    transaction.on_commit(lambda: invalidate_users(*user_ids))
+
+
+def invalidate_on_change(sender, instance, **kwargs):
+    """post_save/post_delete receiver for ``Users``"""
+    invalidate_changed(instance.pk)
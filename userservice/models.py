@@ -13,6 +13,7 @@ from django.core.validators import MinValueValidator
 from walletservice.models import Wallet
 
 from .constants import MAX_LOGIN_ATTEMPTS
+from .identity import invalidate_changed
 
 
 class UserManager(BaseUserManager):
@@ -76,9 +77,9 @@ class Users(AbstractUser):
     phone_number = models.CharField(max_length=20, unique=True)
     user_type = models.CharField(max_length=100, default="Admin", choices=USER_TYPE)
     address = models.CharField(max_length=255, null=True, blank=True)
-    username = models.CharField(max_length=255, null=True, blank=True)
+    username = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     email = models.EmailField(unique=True)
-    last_login_ip = models.GenericIPAddressField(null=True, blank=True)
+    last_login_ip = models.GenericIPAddressField(null=True, blank=True, db_index=True)
     last_login_user_agent = models.TextField(null=True, blank=True)
     is_locked = models.BooleanField(default=False)
     is_activated = models.BooleanField(default=False)
@@ -226,7 +227,10 @@ class LoginAttempt(models.Model):
 
     @classmethod
     def lock_user(cls, ip_address):
-        Users.objects.filter(last_login_ip=ip_address).update(is_locked=True)
+        users = Users.objects.filter(last_login_ip=ip_address)
+        user_ids = list(users.values_list("id", flat=True))
+        users.update(is_locked=True)
+        invalidate_changed(*user_ids)
 
     @classmethod
     def add_attempt(cls, ip_address):
@@ -262,7 +266,10 @@ class LoginAttempt(models.Model):
         cls.objects.filter(ip_address=ip_address).update(
             attempts=0, last_attempt_time=timezone.now()
         )
-        Users.objects.filter(last_login_ip=ip_address).update(is_locked=False)
+        users = Users.objects.filter(last_login_ip=ip_address)
+        user_ids = list(users.values_list("id", flat=True))
+        users.update(is_locked=False)
+        invalidate_changed(*user_ids)
 
     @classmethod
     def is_ip_locked(cls, ip_address=None):
@@ -320,6 +327,21 @@ class OTPVerification(models.Model):
         current_user.save()
 
 
+class OneTimePasscode(models.Model):
+    """
+    A live one-time passcode (see ``userservice.otp``). ``scope`` is a digest
+    of ``(user, purpose, context)``; only a keyed HMAC of the code is kept.
+    """
+
+    scope = models.CharField(max_length=64, unique=True)
+    digest = models.CharField(max_length=64)
+    expires_at = models.DateTimeField(db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope[:12]} - expires {self.expires_at}"
+
+
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
@@ -372,6 +394,27 @@ class SavedBeneficiary(models.Model):
         super(SavedBeneficiary, self).save(*args, **kwargs)
 
 
+class ResolvedRecipient(models.Model):
+    """
+    A bank account already resolved and registered as a Paystack transfer
+    recipient, shared by every user paying it (see ``userservice.recipients``).
+    """
+
+    bank_code = models.CharField(max_length=100)
+    account_number = models.CharField(max_length=100)
+    account_name = models.CharField(max_length=255)
+    recipient_code = models.CharField(max_length=100)
+    resolved_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bank_code", "account_number"], name="resolved_recipient_account_uniq")
+        ]
+
+    def __str__(self):
+        return f"{self.account_name} - {self.account_number} ({self.bank_code})"
+
+
 class MerchantCountries(models.Model):
     AFRICA_CHOICES = [
         ("NGA", "Nigeria"),
@@ -0,0 +1,118 @@
+"""
+One-time passcodes
+
+Codes are kept in the ``OneTimePasscode`` table, one row per ``(user,
+purpose, context)`` looked up through a unique scope digest, so a transfer
+OTP cannot approve a payout and issuing one never writes to ``Wallet``. A
+table rather than the cache, because a code has to survive until it expires
+(a day for signup) and be checked by whichever process gets the request.
+Only a keyed HMAC of the code is stored; checking one is a single SHA-256,
+not a PBKDF2 run, which is safe because a code expires and the number of
+wrong guesses is capped at ``OTP_MAX_ATTEMPTS`` before the code is discarded.
+
+A verified code is consumed; whoever deletes the row first wins, so a
+replayed request cannot reuse it. ``purge_expired`` (the
+``purge_expired_otps`` beat task) clears codes nobody used.
+"""
+
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from userservice.models import OneTimePasscode
+from utils.metrics import metrics
+
+
+class OTPError(Exception):
+    pass
+
+
+class OTPExpired(OTPError):
+    pass
+
+
+class OTPInvalid(OTPError):
+    pass
+
+
+def _secret():
+    return (getattr(settings, "OTP_HMAC_KEY", None) or settings.SECRET_KEY).encode()
+
+
+def _scope(user_id, purpose, context):
+    return hashlib.sha256(f"{user_id}:{purpose}:{context}".encode()).hexdigest()
+
+
+def _digest(user_id, purpose, context, code):
+    message = f"{user_id}:{purpose}:{context}:{code}".encode()
+    return hmac.new(_secret(), message, hashlib.sha256).hexdigest()
+
+
+def generate(length=6):
+    return f"{secrets.randbelow(10**length):0{length}d}"
+
+
+def issue(user_id, purpose, context="", length=6, ttl=None):
+    """Create a code for ``(user, purpose, context)``, replacing any earlier one, and return it"""
+    ttl = ttl or getattr(settings, "OTP_TTL", 300)
+    code = generate(length)
+    OneTimePasscode.objects.update_or_create(
+        scope=_scope(user_id, purpose, context),
+        defaults={
+            "digest": _digest(user_id, purpose, context, code),
+            "expires_at": timezone.now() + timedelta(seconds=ttl),
+            "attempts": 0,
+        },
+    )
+    metrics.incr(f"otp.{purpose}.issued")
+    return code
+
+
+def verify(user_id, purpose, code, context=""):
+    """
+    Consume the code for ``(user, purpose, context)``.
+
+    Raises ``OTPExpired`` when there is no live code (never issued, expired,
+    already used or discarded after too many attempts) and ``OTPInvalid`` for
+    a wrong code.
+    """
+    entry = (
+        OneTimePasscode.objects.filter(
+            scope=_scope(user_id, purpose, context), expires_at__gt=timezone.now()
+        )
+        .values("id", "digest")
+        .first()
+    )
+    if entry is None:
+        metrics.incr(f"otp.{purpose}.expired")
+        raise OTPExpired("OTP expired")
+    if not hmac.compare_digest(
+        entry["digest"], _digest(user_id, purpose, context, str(code or "").strip())
+    ):
+        metrics.incr(f"otp.{purpose}.invalid")
+        guessed = OneTimePasscode.objects.filter(id=entry["id"])
+        guessed.update(attempts=F("attempts") + 1)
+        guessed.filter(attempts__gte=getattr(settings, "OTP_MAX_ATTEMPTS", 5)).delete()
+        raise OTPInvalid("Invalid OTP")
+    # Matching the digest as well keeps a code reissued meanwhile alive
+    deleted, _ = OneTimePasscode.objects.filter(id=entry["id"], digest=entry["digest"]).delete()
+    if not deleted:
+        # A concurrent request consumed it first
+        raise OTPExpired("OTP expired")
+    metrics.incr(f"otp.{purpose}.verified")
+    return True
+
+
+def discard(user_id, purpose, context=""):
+    OneTimePasscode.objects.filter(scope=_scope(user_id, purpose, context)).delete()
+
+
+def purge_expired():
+    """Delete codes that expired unused; returns how many"""
+    deleted, _ = OneTimePasscode.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
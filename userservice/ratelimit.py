@@ -0,0 +1,126 @@
+"""
+Login rate limiting
+
+Failed logins are counted in the cache (``settings.LOGIN_RATE_LIMIT_CACHE``,
+which must be shared by every process, Redis by default) with a
+sliding-window counter per client IP and per account: the estimate for the
+last ``window`` seconds is the current fixed bucket plus the previous one
+weighted by how much of it still overlaps the window. Reaching ``limit``
+sets a lock key that expires after ``lockout`` seconds.
+
+A login that does not fail touches nothing but the cache. The
+``LoginAttempt`` audit rows and the account locks are written by Celery tasks
+(``userservice.tasks``) after a failure or a reset, so a credential-stuffing
+burst costs cache increments rather than row writes.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "userservice:login"
+
+
+@dataclass
+class Verdict:
+    attempts: int
+    remaining: int
+    locked: bool
+
+
+def audit(task, *args):
+    """Queue an audit task once the surrounding transaction commits; never fail the login over it"""
+
+    def send():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.warning(f"Could not queue {task.name}: {e}")
+
+    transaction.on_commit(send)
+
+
+class LoginRateLimiter:
+    def __init__(self, limit, window, lockout=None, cache_alias=None):
+        self.limit = limit
+        self.window = window
+        self.lockout = lockout or window
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias or getattr(settings, "LOGIN_RATE_LIMIT_CACHE", "default")]
+
+    @staticmethod
+    def subjects(ip_address, email=None):
+        subjects = []
+        if ip_address:
+            subjects.append(f"ip:{ip_address}")
+        if email:
+            # Hash so arbitrary input is always a valid cache key
+            digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+            subjects.append(f"account:{digest}")
+        return subjects
+
+    def _bucket_keys(self, subject, now):
+        bucket = int(now // self.window)
+        return f"{KEY_PREFIX}:{subject}:{bucket}", f"{KEY_PREFIX}:{subject}:{bucket - 1}"
+
+    def _lock_key(self, subject):
+        return f"{KEY_PREFIX}:{subject}:locked"
+
+    def is_locked(self, ip_address, email=None):
+        keys = [self._lock_key(subject) for subject in self.subjects(ip_address, email)]
+        return bool(keys) and bool(self.cache.get_many(keys))
+
+    def _hit(self, subject, now):
+        current, previous = self._bucket_keys(subject, now)
+        # Buckets outlive their own window so they can be weighted into the next one
+        self.cache.add(current, 0, self.window * 2)
+        try:
+            count = self.cache.incr(current)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.set(current, 1, self.window * 2)
+            count = 1
+        overlap = 1 - (now % self.window) / self.window
+        return count + (self.cache.get(previous) or 0) * overlap
+
+    def register_failure(self, ip_address, email=None):
+        """Count a failed login and lock the IP and account once either reaches ``limit``"""
+        now = time.time()
+        subjects = self.subjects(ip_address, email)
+        attempts = max((math.ceil(self._hit(subject, now)) for subject in subjects), default=0)
+        locked = attempts >= self.limit
+        if locked:
+            self.cache.set_many(
+                {self._lock_key(subject): now for subject in subjects}, self.lockout
+            )
+            metrics.incr("login.lockouts")
+        metrics.incr("login.failures")
+        return Verdict(attempts=attempts, remaining=max(0, self.limit - attempts), locked=locked)
+
+    def reset(self, ip_address, email=None):
+        """Forget failures after a successful login; returns whether there were any"""
+        now = time.time()
+        subjects = self.subjects(ip_address, email)
+        keys = [key for subject in subjects for key in self._bucket_keys(subject, now)]
+        had_failures = any(self.cache.get_many(keys).values())
+        if had_failures:
+            self.cache.delete_many(keys + [self._lock_key(subject) for subject in subjects])
+        return had_failures
+
+
+def login_limiter(view):
+    """The limiter configured by a login view's ``max_login_attempts`` and ``lockout_duration``"""
+    return LoginRateLimiter(limit=view.max_login_attempts, window=view.lockout_duration)
@@ -0,0 +1,108 @@
+"""
+Resolved bank transfer recipients
+
+A payout to a bank account needs its account name (``Paystack.resolveAccount``)
+and a Paystack transfer recipient code (``Paystack.init_transfer_rec``). Both
+are kept in ``ResolvedRecipient`` per ``(bank_code, account_number)`` for
+``RESOLVED_RECIPIENT_TTL`` seconds, so paying an account again takes only
+the transfer call. A transfer the provider rejects drops the entry
+(``invalidate``) and the next payout resolves the account afresh.
+``resolve_many`` does the same for a batch of accounts, with one query for
+the cached ones and concurrent Paystack calls for the rest.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from requests.exceptions import RequestException
+
+from utils.api import Paystack
+from utils.metrics import metrics
+
+from .models import ResolvedRecipient
+
+
+class RecipientError(Exception):
+    pass
+
+
+def _cutoff():
+    ttl = getattr(settings, "RESOLVED_RECIPIENT_TTL", 30 * 24 * 60 * 60)
+    return timezone.now() - timedelta(seconds=ttl)
+
+
+def cached(accounts):
+    """Fresh ``ResolvedRecipient`` rows for ``(bank_code, account_number)`` pairs, in one query"""
+    accounts = set(accounts)
+    rows = ResolvedRecipient.objects.filter(
+        account_number__in={account_number for _, account_number in accounts},
+        resolved_at__gte=_cutoff(),
+    )
+    found = {(row.bank_code, row.account_number): row for row in rows}
+    return {account: row for account, row in found.items() if account in accounts}
+
+
+def fetch(bank_code, account_number):
+    """Resolve the account and register it with Paystack; returns ``(account_name, recipient_code)``"""
+    account = Paystack.resolveAccount(bank_code, account_number)
+    if not account.get("status"):
+        raise RecipientError(account.get("message") or "Could not resolve account.")
+    account_name = account["data"]["account_name"]
+    registered = Paystack.init_transfer_rec(account_name, account_number, bank_code)
+    if not registered.get("status"):
+        raise RecipientError(registered.get("message") or "Could not create transfer recipient.")
+    return account_name, registered["data"]["recipient_code"]
+
+
+def store(bank_code, account_number, account_name, recipient_code):
+    recipient, _ = ResolvedRecipient.objects.update_or_create(
+        bank_code=bank_code,
+        account_number=account_number,
+        defaults={
+            "account_name": account_name,
+            "recipient_code": recipient_code,
+            "resolved_at": timezone.now(),
+        },
+    )
+    return recipient
+
+
+def resolve(bank_code, account_number):
+    """The ``ResolvedRecipient`` for the account; raises ``RecipientError`` if Paystack cannot resolve it"""
+    recipient = cached([(bank_code, account_number)]).get((bank_code, account_number))
+    if recipient is not None:
+        metrics.incr("recipients.hits")
+        return recipient
+    metrics.incr("recipients.misses")
+    return store(bank_code, account_number, *fetch(bank_code, account_number))
+
+
+def resolve_many(accounts, workers=8):
+    """
+    Resolve many accounts, calling Paystack for the uncached ones from
+    ``workers`` threads. Returns ``(recipients, errors)``, both keyed by
+    ``(bank_code, account_number)``; errors hold the failure message.
+    """
+    recipients = cached(accounts)
+    missing = set(accounts) - set(recipients)
+    metrics.incr("recipients.hits", len(recipients))
+    metrics.incr("recipients.misses", len(missing))
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, *account): account for account in missing}
+        # Rows are written from this thread only, on its connection
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                recipients[account] = store(*account, *future.result())
+            except RecipientError as e:
+                errors[account] = str(e)
+            except RequestException as e:
+                errors[account] = f"Could not reach Paystack: {e}"
+    return recipients, errors
+
+
+def invalidate(bank_code, account_number):
+    ResolvedRecipient.objects.filter(bank_code=bank_code, account_number=account_number).delete()
@@ -10,7 +10,7 @@ from .auth import (
     VerifyOTP,
     WalletPin,
 )
-from .wallets import FundWallet, UserWallet, WalletToBankTransfer, WalletTransfer, WalletToBankOTPValidation, WalletTransferValidation, FundWalletValidation
+from .wallets import BulkPayout, BulkPayoutDetail, BulkPayoutPrepare, FundWallet, RecipientSearch, UserWallet, WalletToBankTransfer, WalletTransfer, WalletToBankOTPValidation, WalletTransferValidation, FundWalletValidation
 
 urlpatterns = [
     url(r"^user$", UserProfile.as_view(), name="profile"),
@@ -30,6 +30,7 @@ urlpatterns = [
     ),
     url(r"^user/wallet/transfer/$", WalletTransfer.as_view(), name="wallet_transfer"),
     url(r"^user/wallet/transfer/validation$", WalletTransferValidation.as_view(), name="wallet_transfer_validation"),
+    url(r"^user/wallet/recipients/search/$", RecipientSearch.as_view(), name="wallet_recipient_search"),
     url(
         r"^user/wallet/fetch-banks/$",
         WalletToBankTransfer.as_view(),
@@ -45,5 +46,8 @@ urlpatterns = [
         WalletToBankOTPValidation.as_view(),
         name="wallet_bank_otp_validation",
     ),
+    url(r"^user/wallet/bulk-payouts/$", BulkPayout.as_view(), name="wallet_bulk_payouts"),
+    url(r"^user/wallet/bulk-payouts/prepare/$", BulkPayoutPrepare.as_view(), name="wallet_bulk_payouts_prepare"),
+    url(r"^user/wallet/bulk-payouts/(?P<reference>[\w-]+)/$", BulkPayoutDetail.as_view(), name="wallet_bulk_payout"),
     url(r"^user/getuser/$", GetCurrentUser.as_view(), name="get_user")
 ]
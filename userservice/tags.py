@@ -0,0 +1,266 @@
+"""
+Ojapay tag autocomplete
+
+``tag_index`` keeps every active user's ojapay tag (``Users.username``) and
+merchant ``business_name`` in a sorted array of ``(key, user_id)`` pairs, so a
+prefix lookup is a ``bisect`` to the first key at or after the prefix and a
+scan while keys still start with it. Business names are also indexed word by
+word, so "foods" finds "Mama Put Foods".
+
+The index is built from the database on the first lookup and kept current by
+``Users`` post_save/post_delete signals (``userservice.apps``). Signals only
+reach the process that saved the row, so an index older than
+``TAG_INDEX_MAX_AGE`` seconds is rebuilt in a background thread while the old
+one keeps serving. Saves signalled while a build reads the table are replayed
+onto the new index before it is installed.
+
+``suggest`` ranks the caller's recent transfer recipients first, then shorter
+tags, then alphabetically.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    user_id: int
+    tag: str
+    name: str
+    business_name: str
+
+    def as_data(self):
+        return {"ojapay_tag": self.tag, "name": self.name, "business_name": self.business_name}
+
+
+def _keys(tag, business_name):
+    keys = set()
+    if tag:
+        keys.add(tag.lower())
+    if business_name:
+        name = business_name.lower()
+        keys.add(name)
+        keys.update(name.split())
+    return keys
+
+
+class TagIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+        self._users = {}
+        self._built_at = 0.0
+        self._rebuilding = False
+        # (user_id, user or None) for saves and deletes signalled during a build
+        self._pending = None
+
+    # Building
+
+    def _load(self):
+        from .models import Users
+
+        entries = []
+        users = {}
+        rows = (
+            Users.objects.filter(is_active=True)
+            .exclude(username__isnull=True, business_name__isnull=True)
+            .values_list("id", "username", "first_name", "last_name", "business_name")
+            .iterator(chunk_size=5000)
+        )
+        for user_id, tag, first_name, last_name, business_name in rows:
+            suggestion = self._suggestion(user_id, tag, first_name, last_name, business_name)
+            if suggestion is None:
+                continue
+            users[user_id] = suggestion
+            entries.extend((key, user_id) for key in _keys(tag, business_name))
+        entries.sort()
+        return entries, users
+
+    def _suggestion(self, user_id, tag, first_name, last_name, business_name):
+        if not (tag or business_name):
+            return None
+        name = " ".join(part for part in (first_name, last_name) if part)
+        return Suggestion(user_id, tag or "", name, business_name or "")
+
+    def _build(self):
+        self._pending = []
+        try:
+            entries, users = self._load()
+        except Exception:
+            self._pending = None
+            raise
+        return entries, users
+
+    def _install(self, entries, users):
+        self._entries, self._users = entries, users
+        pending, self._pending = self._pending or [], None
+        for user_id, user in pending:
+            self._remove(user_id)
+            if user is not None:
+                self._add(user)
+        self._built_at = time.monotonic()
+        metrics.set_gauge("tag_index.size", len(self._entries))
+
+    def _ensure_built(self):
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    with metrics.time("tag_index.build"):
+                        self._install(*self._build())
+        elif self._stale():
+            self._rebuild_in_background()
+
+    def _stale(self):
+        max_age = getattr(settings, "TAG_INDEX_MAX_AGE", 600)
+        return bool(max_age) and time.monotonic() - self._built_at > max_age
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def rebuild():
+            try:
+                entries, users = self._build()
+                with self._lock:
+                    self._install(entries, users)
+            except Exception:
+                logger.exception("Could not rebuild the ojapay tag index")
+            finally:
+                self._rebuilding = False
+                # The thread's own connection would otherwise stay open until the server drops it
+                connection.close()
+
+        threading.Thread(target=rebuild, name="tag-index-rebuild", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries = None
+            self._users = {}
+            self._pending = None
+
+    # Incremental maintenance
+
+    def _remove(self, user_id):
+        previous = self._users.pop(user_id, None)
+        if previous is None:
+            return
+        for key in _keys(previous.tag, previous.business_name):
+            position = bisect_left(self._entries, (key, user_id))
+            if position < len(self._entries) and self._entries[position] == (key, user_id):
+                del self._entries[position]
+
+    def _add(self, user):
+        if not user.is_active:
+            return
+        suggestion = self._suggestion(
+            user.pk, user.username, user.first_name, user.last_name, user.business_name
+        )
+        if suggestion is None:
+            return
+        self._users[user.pk] = suggestion
+        for key in _keys(suggestion.tag, suggestion.business_name):
+            insort(self._entries, (key, user.pk))
+
+    def _journal(self, user_id, user):
+        # Appending needs no lock, so a save never waits for a build that is reading the table
+        pending = self._pending
+        if pending is not None:
+            pending.append((user_id, user))
+
+    def update(self, user):
+        """Re-index ``user`` after a save; a no-op until the index has been built"""
+        self._journal(user.pk, user)
+        if self._entries is None:
+            return
+        with self._lock:
+            self._remove(user.pk)
+            self._add(user)
+
+    def discard(self, user_id):
+        self._journal(user_id, None)
+        if self._entries is None:
+            return
+        with self._lock:
+            self._remove(user_id)
+
+    # Lookups
+
+    def matches(self, prefix, limit):
+        """Up to ``limit`` users with a key starting with ``prefix``, in key order"""
+        self._ensure_built()
+        prefix = prefix.lower()
+        entries, users = self._entries, self._users
+        found = {}
+        position = bisect_left(entries, (prefix,))
+        while position < len(entries) and len(found) < limit:
+            key, user_id = entries[position]
+            if not key.startswith(prefix):
+                break
+            if user_id in users:
+                found.setdefault(user_id, users[user_id])
+            position += 1
+        return list(found.values())
+
+    def get(self, user_id):
+        self._ensure_built()
+        return self._users.get(user_id)
+
+
+tag_index = TagIndex()
+
+
+def index_user(sender, instance, **kwargs):
+    tag_index.update(instance)
+
+
+def unindex_user(sender, instance, **kwargs):
+    tag_index.discard(instance.pk)
+
+
+def recent_counterparties(user, limit=50):
+    """Ids of the users ``user`` sent wallet transfers to, most recent first"""
+    from transactions.models import WalletTransaction
+
+    recipients = (
+        WalletTransaction.objects.filter(sender_wallet__user=user, recipient_wallet__isnull=False)
+        .order_by("-date")
+        .values_list("recipient_wallet__user_id", flat=True)[:limit]
+    )
+    return list(dict.fromkeys(user_id for user_id in recipients if user_id != user.pk))
+
+
+def suggest(user, prefix, limit=10):
+    """Autocomplete ``prefix`` for ``user``; counterparties first, then shorter tags"""
+    prefix = prefix.strip().lstrip("@").lower()
+    if not prefix:
+        return []
+    with metrics.time("tag_index.suggest"):
+        ranked = []
+        for user_id in recent_counterparties(user):
+            suggestion = tag_index.get(user_id)
+            if suggestion and any(
+                key.startswith(prefix) for key in _keys(suggestion.tag, suggestion.business_name)
+            ):
+                ranked.append(suggestion)
+        # Scan past the limit so the ranking has shorter tags to choose from
+        others = [
+            suggestion
+            for suggestion in tag_index.matches(prefix, limit * 5)
+            if suggestion.user_id != user.pk and suggestion not in ranked
+        ]
+        others.sort(
+            key=lambda suggestion: (len(suggestion.tag or suggestion.business_name), suggestion.tag)
+        )
+    return (ranked + others)[:limit]
@@ -0,0 +1,44 @@
+from celery import shared_task
+from django.db.models import F
+from django.utils import timezone
+
+
+@shared_task
+def record_login_failure(ip_address, email, attempts, locked):
+    """
+    Audit a failed login counted by ``userservice.ratelimit``.
+
+    Keeps the per-IP ``LoginAttempt`` row in step with the limiter and, when
+    the attempt tripped the lockout, locks the accounts last seen on that IP.
+    """
+    from .models import LoginAttempt, Users
+
+    now = timezone.now()
+    user_id = (
+        Users.objects.filter(email=(email or "").lower()).values_list("id", flat=True).first()
+        or Users.objects.filter(last_login_ip=ip_address).values_list("id", flat=True).first()
+    )
+    updated = LoginAttempt.objects.filter(ip_address=ip_address).update(
+        user_id=user_id, attempts=F("attempts") + 1, last_attempt_time=now
+    )
+    if not updated:
+        LoginAttempt.objects.get_or_create(
+            ip_address=ip_address,
+            defaults={"user_id": user_id, "attempts": attempts, "last_attempt_time": now},
+        )
+    if locked:
+        LoginAttempt.lock_user(ip_address)
+
+
+@shared_task
+def reset_login_attempts(ip_address):
+    from .models import LoginAttempt
+
+    LoginAttempt.reset_attempts(ip_address)
+
+
+@shared_task
+def purge_expired_otps():
+    from .otp import purge_expired
+
+    return purge_expired()
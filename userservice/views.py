@@ -1,14 +1,9 @@
-import json
-import os
-
-import geoip2
 import pyotp
 import requests
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.tokens import default_token_generator
-from django.contrib.gis.geoip2 import GeoIP2
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -26,15 +21,20 @@ from rest_framework_simplejwt.token_blacklist.models import (
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from amaps.sendmail import SendMail
+from utils.countries import countries
+from utils.geo import geolocator
 
 # import custom modules
 from . import constants
-from .models import LoginAttempt, OTPVerification, Users
+from .identity import find_user, get_user
+from .models import OTPVerification, Users
+from .ratelimit import audit, login_limiter
 from .serializers import (
     OTPVerificationSerializer,
     RetrieveUserSerializer,
     UsersSerializer,
 )
+from .tasks import record_login_failure, reset_login_attempts
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -51,17 +51,14 @@ class SignupView(generics.CreateAPIView):
         password = request.data.get("password")
         email = request.data.get("email")
         # Check if user already exist
-        try:
-            user = Users.objects.get(email=email)
-        except Users.DoesNotExist:
-            user = None
+        user = find_user(email=email)
         # If user does not exist, create user
         if user is None:
             serializer = self.get_serializer(data=request.data)
 
             if serializer.is_valid():
                 serializer.save(is_active=False, password=make_password(password))
-                user = Users.objects.get(email=email)
+                user = get_user(email=email)
                 return Response(
                     {
                         "status": "success",
@@ -92,10 +89,7 @@ class SendEmailOTPView(generics.CreateAPIView):
 
     def post(self, request, *args, **kwargs) -> Response:
         email = request.data.get("email")
-        try:
-            user = Users.objects.get(email=email)
-        except Users.DoesNotExist:
-            user = None
+        user = find_user(email=email)
         # Generate email OTPs
         email_otp = pyotp.TOTP(pyotp.random_base32()).now()
 
@@ -150,10 +144,7 @@ class SendPhoneOTPView(generics.CreateAPIView):
 
     def post(self, request, *args, **kwargs) -> Response:
         phone_number = request.data.get("phone_number")
-        try:
-            user = Users.objects.get(phone_number=phone_number)
-        except Users.DoesNotExist:
-            user = None
+        user = find_user(phone_number=phone_number)
         # generate phone OTP
         phone_otp = pyotp.TOTP(pyotp.random_base32()).now()
         if user is not None:
@@ -215,10 +206,7 @@ class VerifyOTPView(APIView):
         phone_otp = request.data.get("phone_otp")
         email_otp = request.data.get("email_otp")
 
-        try:
-            user = Users.objects.get(email=email)
-        except Users.DoesNotExist:
-            user = None
+        user = find_user(email=email)
 
         if user is not None:
             try:
@@ -279,40 +267,15 @@ class LoginView(generics.CreateAPIView):
         email = request.data.get("email", "")
         password = request.data.get("password", "")
 
-        try:
-            user = authenticate(email=email, password=password)
-        except Users.DoesNotExist:
-            user = None
         # Check if the IP is locked
         remote_address = request.META.get("HTTP_X_FORWARDED_FOR")
         if remote_address:
             ip_address = remote_address.split(",")[-1].strip()
         else:
             ip_address = request.META.get("REMOTE_ADDR")
-        geopath = os.path.join(
-            settings.BASE_DIR, "staticfiles/geoip/GeoLite2-Country.mmdb"
-        )
-        try:
-            g = GeoIP2(path=geopath)
-            countrycode = g.country_code(ip_address)
-        except geoip2.errors.AddressNotFoundError:
-            countrycode = "NG"
-        # Get the country name and code
-        with open(
-            os.path.join(settings.BASE_DIR, "staticfiles/json/countries.json"),
-            encoding="utf8",
-        ) as f:
-            data = json.load(f)
-            for keyval in data:
-                if countrycode == keyval["isoAlpha2"]:
-                    code = keyval["currency"]["code"]
-                    location = keyval["name"]
-
-        # Get the user agent values
-        browser = f"{request.user_agent.browser.family} {request.user_agent.browser.version_string}"
-        OS = f"{request.user_agent.os.family} {request.user_agent.os.version_string}"
-
-        if LoginAttempt.is_ip_locked(ip_address):
+        # Refuse locked-out clients before paying for a password hash
+        limiter = login_limiter(self)
+        if limiter.is_locked(ip_address, email):
             return Response(
                 {
                     "status": "error",
@@ -320,6 +283,17 @@ class LoginView(generics.CreateAPIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            user = authenticate(email=email, password=password)
+        except Users.DoesNotExist:
+            user = None
+        countrycode = geolocator.country_code(ip_address, default="NG")
+        location = countries.name(countrycode, default=countrycode)
+
+        # Get the user agent values
+        browser = f"{request.user_agent.browser.family} {request.user_agent.browser.version_string}"
+        OS = f"{request.user_agent.os.family} {request.user_agent.os.version_string}"
+
         if user is not None:
             # Check if the user account is locked
             if user.is_locked:
@@ -337,7 +311,8 @@ class LoginView(generics.CreateAPIView):
                 serializer = self.get_serializer(user, data=request.data)
                 if serializer.is_valid():
                     serializer.save()
-                LoginAttempt.reset_attempts(ip_address)
+                if limiter.reset(ip_address, email):
+                    audit(reset_login_attempts, ip_address)
 
                 # Check if the user logged in from a new device
                 if user.last_login_ip != ip_address or OS != user.last_login_user_agent:
@@ -376,22 +351,19 @@ class LoginView(generics.CreateAPIView):
 
         else:
             # Login failed, increase login attempts
-            LoginAttempt.add_attempt(ip_address)
-            remaining_attempts = self.max_login_attempts - LoginAttempt.get_attempts(
-                ip_address
-            )
+            verdict = limiter.register_failure(ip_address, email)
+            audit(record_login_failure, ip_address, email, verdict.attempts, verdict.locked)
 
-            if remaining_attempts > 0:
+            if not verdict.locked:
                 return Response(
                     {
                         "status": "error",
-                        "response": f"Invalid login credentials. You have {remaining_attempts} attempts remaining.",
+                        "response": f"Invalid login credentials. You have {verdict.remaining} attempts remaining.",
                     },
                     status=status.HTTP_401_UNAUTHORIZED,
                 )
             else:
-                # Lock the user's account for 15 minutes
-                LoginAttempt.lock_user(ip_address)
+                # The limiter holds the lock for 15 minutes; the audit task locks the accounts
                 return Response(
                     {
                         "status": "error",
@@ -408,10 +380,7 @@ class ForgotPasswordView(APIView):
 
     def post(self, request):
         email = request.data.get("email", "")
-        try:
-            user = Users.objects.get(email=email)
-        except Users.DoesNotExist:
-            user = None
+        user = find_user(email=email)
 
         if user is not None:
             current_site = settings.CLIENT_SITE
@@ -1,22 +1,35 @@
+import hashlib
 from decimal import Decimal
 from django.utils import timezone
 import uuid
 from django.conf import settings
-import pyotp
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication  # type: ignore
 from django.db import transaction
+from django.db.models import Count
 from rest_framework import permissions
 from amaps.sendmail import PlainEmail, SendMail
-from transactions.models import Deposit, Transaction, WalletTransaction
+from transactions import engine
+from transactions import payouts as payouts_service
+from transactions.models import Deposit, PayoutBatch, Transaction
+from transactions.serializers import PayoutBatchSerializer, PayoutItemSerializer, PayoutRequestSerializer
+from userservice import otp as otps
+from userservice import recipients
+from userservice.identity import get_user
+from userservice.tags import suggest
 from userservice.models import Users
 from django.contrib.auth.hashers import check_password
 from utils.api import CoralPay, Paystack
+from utils.banks import BankDirectoryUnavailable, bank_directory
 from django.template.loader import render_to_string
+from paymentgatewayservice.views import gateway_unavailable
+from requests.exceptions import RequestException
 from utils.helpers import get_random_string
 from walletservice.models import Wallet
+from walletservice.quotes import QuoteError, issue_quote, peek_quote, release_quote, take_quote
+from walletservice.rates import UnknownCurrency
 from walletservice.serializers import WalletSerializer
 
 
@@ -99,19 +112,22 @@ class FundWalletValidation(APIView):
         description = f"Funding {customer_name}'s NGN Wallet"
         trace_id = get_random_string(10)
         product_id = get_random_string(8)
-        init_payment = coralpay.invoke_payment(
-            user.email,
-            customer_name,
-            user.phone_number,
-            user.unique_uid,
-            title,
-            description,
-            trace_id,
-            product_id,
-            amount,
-            currency,
-            return_url,
-        )
+        try:
+            init_payment = coralpay.invoke_payment(
+                user.email,
+                customer_name,
+                user.phone_number,
+                user.unique_uid,
+                title,
+                description,
+                trace_id,
+                product_id,
+                amount,
+                currency,
+                return_url,
+            )
+        except RequestException as e:
+            return gateway_unavailable(e)
         print("INIT PAYMENT: ", init_payment)
         obj = Deposit(
             order=product_id,
@@ -133,10 +149,7 @@ class FundWalletValidation(APIView):
             "transaction_id": init_payment["transactionId"],
         }
 
-        otp = pyotp.TOTP(pyotp.random_base32()).now()
-        wallet.otp_code = otp
-        wallet.otp_expiry = timezone.now() + timezone.timedelta(minutes=5)
-        wallet.save()
+        otp = otps.issue(user.id, "wallet_funding", wallet.id)
 
         # Send OTP email
         msg = f"Hi {user.first_name}, your OTP code is {otp} and is only valid till the next 5 minutes."
@@ -183,15 +196,11 @@ class FundWallet(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if timezone.now() > wallet.otp_expiry:
-            return Response(
-                {"status": "error", "response": "OTP expired"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if otp != str(wallet.otp_code):
+        try:
+            otps.verify(user.id, "wallet_funding", otp, wallet.id)
+        except otps.OTPError as e:
             return Response(
-                {"status": "error", "response": "Invalid OTP"},
+                {"status": "error", "response": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
@@ -215,7 +224,10 @@ class FundWallet(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         coralpay = CoralPay()
-        verify = coralpay.verify_payment(reference)
+        try:
+            verify = coralpay.verify_payment(reference)
+        except RequestException as e:
+            return gateway_unavailable(e)
         print("PAYMENT VERIFICATION: ", verify)
         obj = Deposit.objects.filter(reference=reference).last()
         if not obj:
@@ -228,15 +240,26 @@ class FundWallet(APIView):
                 {"status": "error", "response": "Payment already checked."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        user = Users.objects.get(email=obj.user.email)
+        user = obj.user
         wallet = Wallet.objects.get(currency=currency, user=user)
         if verify["responseMessage"] == "Successful":
-            obj.balance_after = Decimal(verify["amount"]) + wallet.balance
-            obj.payment_type = verify["channel"]
-            obj.status = "success"
-            obj.save()
-            wallet.balance += obj.amount
-            wallet.save()
+            with transaction.atomic():
+                # Only the request that flips the deposit to success credits the wallet
+                claimed = (
+                    Deposit.objects.filter(pk=obj.pk)
+                    .exclude(status="success")
+                    .update(status="success", payment_type=verify["channel"])
+                )
+                if not claimed:
+                    return Response(
+                        {"status": "error", "response": "Payment already checked."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                movement = engine.credit(wallet.id, obj.amount)
+                Deposit.objects.filter(pk=obj.pk).update(
+                    balance_before=movement.balance_before,
+                    balance_after=movement.balance_after,
+                )
             message = render_to_string(
                 "userservice/wallet_topup_notification.html",
                 {
@@ -269,6 +292,26 @@ class FundWallet(APIView):
             )
 
 
+class RecipientSearch(APIView):
+    """Autocomplete ojapay tags and merchant names for WalletTransfer"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        if len(query.strip().lstrip("@")) < 2:
+            return Response(
+                {"status": "error", "response": "Type at least 2 characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = [suggestion.as_data() for suggestion in suggest(request.user, query, limit)]
+        return Response({"status": "success", "response": results}, status=status.HTTP_200_OK)
+
+
 class WalletTransfer(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -288,7 +331,7 @@ class WalletTransfer(APIView):
         recipient_currency = request.data.get("recipient_currency", "")
         print("RECIPIENT CURRENCY: ", recipient_currency)
         donor_wallet = Wallet.objects.get(user=user, currency=donor_currency)
-        recipient = Users.objects.get(username=recipient_username)
+        recipient = get_user(username=recipient_username)
 
         try:
             if recipient_currency:
@@ -304,12 +347,11 @@ class WalletTransfer(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
                 data={
                     "status": "error",
-                    "response": f"Recipient does not have a {donor_currency} wallet.",
+                    "response": f"Recipient does not have a {recipient_currency or donor_currency} wallet.",
                 },
             )
 
         amount = Decimal(amount)
-        recipient_amount = Decimal(recipient_wallet.balance)
 
         if not check_password(wallet_pin, user.wallet_pin):
             return Response(
@@ -329,10 +371,27 @@ class WalletTransfer(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        otp = pyotp.TOTP(pyotp.random_base32()).now()
-        donor_wallet.otp_code = otp
-        donor_wallet.otp_expiry = timezone.now() + timezone.timedelta(minutes=5)
-        donor_wallet.save()
+        data = {
+            "donor": f"{user.first_name} {user.last_name}",
+            "recipient": f"{recipient.first_name} {recipient.last_name}",
+            "amount": f"{donor_currency.upper()} {amount:,.2f}",
+            "description": note,
+        }
+        if recipient_wallet.currency != donor_wallet.currency:
+            # Lock the rate now; WalletTransferValidation settles at this quote
+            try:
+                quote = issue_quote(user.id, donor_wallet.currency, recipient_wallet.currency, amount)
+            except UnknownCurrency:
+                return Response(
+                    {
+                        "status": "error",
+                        "response": f"No exchange rate from {donor_wallet.currency} to {recipient_wallet.currency}.",
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            data.update(quote.as_data())
+
+        otp = otps.issue(user.id, "wallet_transfer", donor_wallet.id)
 
         # Send OTP email
         msg = f"Hi {user.first_name}, your OTP code is {otp} and is only valid till the next 5 minutes."
@@ -342,12 +401,7 @@ class WalletTransfer(APIView):
             {
                 "status": "success",
                 "response": "OTP sent. Please verify.",
-                "data": {
-                    "donor": f"{user.first_name} {user.last_name}",
-                    "recipient": f"{recipient.first_name} {recipient.last_name}",
-                    "amount": f"{donor_currency.upper()} {recipient_amount:,.2f}",
-                    "description": note,
-                },
+                "data": data,
             }
         )
 
@@ -366,7 +420,7 @@ class WalletTransferValidation(APIView):
         donor_currency = request.data.get("donor_currency", "")
         recipient_currency = request.data.get("recipient_currency", "")
         donor_wallet = Wallet.objects.get(user=user, currency=donor_currency)
-        recipient = Users.objects.get(username=recipient_username)
+        recipient = get_user(username=recipient_username)
 
         try:
             if recipient_currency:
@@ -382,19 +436,15 @@ class WalletTransferValidation(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
                 data={
                     "status": "error",
-                    "response": f"Recipient does not have a {donor_currency} wallet.",
+                    "response": f"Recipient does not have a {recipient_currency or donor_currency} wallet.",
                 },
             )
 
-        if timezone.now() > donor_wallet.otp_expiry:
-            return Response(
-                {"status": "error", "response": "OTP expired"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if otp != str(donor_wallet.otp_code):
+        try:
+            otps.verify(user.id, "wallet_transfer", otp, donor_wallet.id)
+        except otps.OTPError as e:
             return Response(
-                {"status": "error", "response": "Invalid OTP"},
+                {"status": "error", "response": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
         amount = Decimal(amount)
@@ -412,51 +462,63 @@ class WalletTransferValidation(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if donor_wallet.balance >= amount:
-                # Generate order and reference
-                order = str(uuid.uuid4())
-                reference = str(uuid.uuid4())
-
-                with transaction.atomic():
-                    # Create transaction for sender
-                    WalletTransaction.objects.create(
-                        sender_wallet=donor_wallet,
-                        recipient_wallet=recipient_wallet,
-                        amount=amount,
-                        fee=Decimal("0.00"),  # Assuming no fee for this example
-                        balance_before=donor_wallet.balance,
-                        balance_after=donor_wallet.balance - amount,
-                        order=order,
-                        reference=reference,
-                        note=note,
-                        gateway="internal",
-                        transaction_type="Wallet Transfer",
-                        payment_type="wallet",
-                        status="success",
+            credit_amount = amount
+            quote = None
+            if recipient_wallet.currency != donor_wallet.currency:
+                # Settle at the rate quoted at the OTP step
+                try:
+                    quote = peek_quote(request.data.get("quote_id"), user.id)
+                except QuoteError as e:
+                    return Response(
+                        {"status": "error", "response": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
-
-                    # Create transaction for recipient
-                    WalletTransaction.objects.create(
-                        sender_wallet=donor_wallet,
-                        recipient_wallet=recipient_wallet,
-                        amount=amount,
-                        fee=Decimal("0.00"),
-                        balance_before=recipient_wallet.balance,
-                        balance_after=recipient_wallet.balance + amount,
-                        order=order,
-                        reference=reference,
-                        note=note,
-                        gateway="internal",
-                        transaction_type="Wallet Transfer",
-                        payment_type="wallet",
-                        status="success",
+                if (quote.from_currency, quote.to_currency, quote.amount) != (
+                    donor_wallet.currency,
+                    recipient_wallet.currency,
+                    amount.quantize(Decimal("0.01")),
+                ):
+                    return Response(
+                        {"status": "error", "response": "Transfer does not match the quote."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                credit_amount = quote.converted
+
+            if quote is not None:
+                try:
+                    take_quote(quote.id, user.id)
+                except QuoteError as e:
+                    return Response(
+                        {"status": "error", "response": str(e)},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                    # Update wallet balances
-                    donor_wallet.balance -= amount
-                    recipient_wallet.balance += amount
-                    donor_wallet.save()
-                    recipient_wallet.save()
+            # Generate order and reference
+            order = str(uuid.uuid4())
+            reference = str(uuid.uuid4())
+            try:
+                engine.transfer(
+                    donor_wallet.id,
+                    recipient_wallet.id,
+                    amount,
+                    fee=Decimal("0.00"),  # Assuming no fee for this example
+                    credit_amount=credit_amount,
+                    order=order,
+                    reference=reference,
+                    note=note,
+                    gateway="internal",
+                    transaction_type="Wallet Transfer",
+                    payment_type="wallet",
+                    status="success",
+                )
+            except engine.InsufficientFunds:
+                if quote is not None:
+                    release_quote(quote)
+                return Response(
+                    {"status": "error", "response": "Insufficient balance"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            else:
                 if recipient.user_type == "Merchant":
                     tag = recipient.business_name
                 else:
@@ -480,7 +542,7 @@ class WalletTransferValidation(APIView):
                     "userservice/wallet_topup_notification.html",
                     {
                         "user": recipient.first_name,
-                        "amount": f"{donor_currency} {amount:,.2f}",
+                        "amount": f"{recipient_wallet.currency} {credit_amount:,.2f}",
                         "transaction_id": reference,
                         "payment_method": "Internal",
                         "datetime": timezone.now(),
@@ -494,11 +556,6 @@ class WalletTransferValidation(APIView):
                     {"status": "success", "response": "Transfer successful!"},
                     status=status.HTTP_200_OK,
                 )
-            else:
-                return Response(
-                    {"status": "error", "response": "Insufficient balance"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
         except Users.DoesNotExist:
             return Response(
                 {"status": "error", "response": "Recipient not found"},
@@ -534,10 +591,7 @@ class WalletToBankTransfer(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        otp = pyotp.TOTP(pyotp.random_base32()).now()
-        wallet.otp_code = otp
-        wallet.otp_expiry = timezone.now() + timezone.timedelta(minutes=5)
-        wallet.save()
+        otp = otps.issue(user.id, "bank_transfer", wallet.id)
 
         # Send OTP email
         msg = f"Hi {user.first_name}, your OTP code is {otp} and is only valid till the next 5 minutes."
@@ -557,11 +611,20 @@ class WalletToBankTransfer(APIView):
         )
 
     def get(self, request):
-        user = request.user
-        coral_pay = Paystack()
-        banks = coral_pay.fetchBanks()
+        # Served from the bank directory; ?q= narrows it by bank name
+        query = request.query_params.get("q", "")
+        try:
+            if query:
+                banks = [bank.data for bank in bank_directory.search("paystack", query)]
+            else:
+                banks = bank_directory.payload("paystack")["data"]
+        except BankDirectoryUnavailable:
+            return Response(
+                {"status": "error", "response": "Bank list is unavailable, please try again later."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         return Response(
-            {"status": "success", "response": "Banks returned", "data": banks["data"]},
+            {"status": "success", "response": "Banks returned", "data": banks},
             status=status.HTTP_200_OK,
         )
 
@@ -580,15 +643,11 @@ class WalletToBankOTPValidation(APIView):
         print("WALLET OBJECT: ", wallet)
         otp = request.data.get("otp")
 
-        if timezone.now() > wallet.otp_expiry:
-            return Response(
-                {"status": "error", "response": "OTP expired"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if otp != str(wallet.otp_code):
+        try:
+            otps.verify(user.id, "bank_transfer", otp, wallet.id)
+        except otps.OTPError as e:
             return Response(
-                {"status": "error", "response": "Invalid OTP"},
+                {"status": "error", "response": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
@@ -598,11 +657,6 @@ class WalletToBankOTPValidation(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        validate = Paystack.resolveAccount(bank_code, account_number)
-        print("VALIDATE PAYMENT: ", validate)
-        account_name = validate["data"]["account_name"]
-        print("ACCOUNT NAME: ", account_name)
-
         ref = get_random_string(8)
         if wallet.balance - Decimal(amount) < 0:
             return Response(
@@ -612,38 +666,72 @@ class WalletToBankOTPValidation(APIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        # Account name and recipient code are reused for accounts paid before
+        try:
+            recipient = recipients.resolve(bank_code, account_number)
+        except recipients.RecipientError as e:
+            return Response(
+                {"status": "error", "response": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except RequestException as e:
+            return gateway_unavailable(e)
+        account_name = recipient.account_name
         amt = Decimal(amount) * 100
         full_name = f"{user.first_name} {user.last_name}"
         narration = f"{ref}/Bank Transfer by {full_name} from OjaPay."
-        ps_transfer_id = Paystack.init_transfer_rec(
-            account_name, account_number, bank_code
-        )
-        transfer_code = ps_transfer_id["data"]["recipient_code"]
-        transfer = Paystack.init_transfer(transfer_code, str(amt), ref, narration)
+        try:
+            transfer = Paystack.init_transfer(recipient.recipient_code, str(amt), ref, narration)
+        except RequestException as e:
+            return gateway_unavailable(e)
         if transfer["status"] == False:
+            recipients.invalidate(bank_code, account_number)
             return Response(
                 {"status": "error", "response": transfer["message"]},
                 status=status.HTTP_400_BAD_REQUEST,
             )
         fee = 0
-        ins = Transaction.objects.create(
-            order=transfer["data"]["transfer_code"],
-            status=transfer["data"]["status"],
-            reference=ref,
-            fee=fee,
-            amount=Decimal(amount),
-            user=user,
-            balance_before=wallet.balance,
-            balance_after=wallet.balance - Decimal(amount),
-            gateway="OjaPay",
-            note=f"Transfer to {account_number} {user.first_name} {user.last_name} - {bank_name}",
-            transaction_type="Bank Transfer",
-        )
-        pay = Paystack.finalize_transfer(ins.order)
+        try:
+            with transaction.atomic():
+                movement = engine.debit(wallet.id, Decimal(amount) + fee)
+                ins = Transaction.objects.create(
+                    order=transfer["data"]["transfer_code"],
+                    status=transfer["data"]["status"],
+                    reference=ref,
+                    fee=fee,
+                    amount=Decimal(amount),
+                    user=user,
+                    balance_before=movement.balance_before,
+                    balance_after=movement.balance_after,
+                    gateway="OjaPay",
+                    note=f"Transfer to {account_number} {user.first_name} {user.last_name} - {bank_name}",
+                    transaction_type="Bank Transfer",
+                )
+        except engine.InsufficientFunds:
+            return Response(
+                {
+                    "status": "error",
+                    "response": "Insufficient fund. Please recharge and try again",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Only finalize once the wallet has actually been debited
+        try:
+            Paystack.finalize_transfer(ins.order)
+        except RequestException:
+            # The wallet is debited and Paystack may or may not have the
+            # transfer finalized: leave it for reconciliation, not a retry
+            Transaction.objects.filter(pk=ins.pk).update(status="unconfirmed")
+            return Response(
+                {
+                    "status": "pending",
+                    "response": "Transfer submitted and awaiting confirmation",
+                    "data": {"reference": ins.reference, "amount": f"{ins.amount:,.2f}"},
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
 
         amt = ins.amount
-        wallet.balance -= Decimal(amount) + fee
-        wallet.save()
         data = {
             "reference": ins.reference,
             "amount": f"{ins.amount:,.2f}",
@@ -673,3 +761,141 @@ class WalletToBankOTPValidation(APIView):
             {"status": "success", "response": "Transfer in process", "data": data},
             status=status.HTTP_200_OK,
         )
+
+
+def _payout_batch(request):
+    """
+    Check the wallet PIN and the payouts of a bulk payout request. Returns
+    ``(wallet, payouts, None)``, or ``(None, None, response)`` to send back.
+    """
+    user = request.user
+    currency = request.data.get("currency", "NGN").upper()
+
+    def rejected(message, code=status.HTTP_400_BAD_REQUEST, **extra):
+        return None, None, Response({"status": "error", "response": message, **extra}, status=code)
+
+    if not check_password(request.data.get("wallet_pin"), user.wallet_pin):
+        return rejected("Incorrect pin entered.")
+    if currency != "NGN":
+        return rejected("Bulk payouts are only available from NGN wallets.")
+    serializer = PayoutRequestSerializer(data=request.data.get("payouts") or [], many=True)
+    if not serializer.is_valid():
+        return rejected("Invalid payouts.", errors=serializer.errors)
+    payouts = serializer.validated_data
+    max_items = settings.PAYOUT_BATCH_MAX_ITEMS
+    if not 0 < len(payouts) <= max_items:
+        return rejected(f"Send between 1 and {max_items} payouts.")
+    wallet = Wallet.objects.filter(user=user, currency=currency).first()
+    if wallet is None:
+        return rejected(f"You do not have a {currency} wallet.", status.HTTP_404_NOT_FOUND)
+    return wallet, payouts, None
+
+
+def _payout_otp_context(wallet, payouts):
+    """Scope a bulk payout OTP to the wallet and to exactly these payouts"""
+    listed = "\n".join(
+        f"{payout['bank_code']}:{payout['account_number']}:{payout['amount']}:{payout.get('narration', '')}"
+        for payout in payouts
+    )
+    return f"{wallet.id}:{hashlib.sha256(listed.encode()).hexdigest()}"
+
+
+class BulkPayoutPrepare(APIView):
+    """First step of a bulk payout: check the batch and email an OTP that approves exactly it"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        wallet, payouts, error = _payout_batch(request)
+        if error:
+            return error
+        total = sum(payout["amount"] for payout in payouts)
+        if wallet.balance < total:
+            return Response(
+                {"status": "error", "response": "Insufficient fund. Please recharge and try again"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        otp = otps.issue(user.id, "bulk_payout", _payout_otp_context(wallet, payouts))
+
+        # Send OTP email
+        msg = f"Hi {user.first_name}, your OTP code is {otp} and is only valid till the next 5 minutes."
+        PlainEmail(msg, user.email.lower(), "OjaPay: Your OTP has arrived.")
+
+        return Response(
+            {
+                "status": "success",
+                "response": "OTP sent. Please verify.",
+                "data": {"count": len(payouts), "amount": f"{wallet.currency} {total:,.2f}"},
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkPayout(APIView):
+    """
+    Pay many bank accounts from one wallet, approved by the wallet PIN and
+    the OTP from ``BulkPayoutPrepare``; the batch is processed in the background
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        wallet, payouts, error = _payout_batch(request)
+        if error:
+            return error
+        try:
+            otps.verify(user.id, "bulk_payout", request.data.get("otp"), _payout_otp_context(wallet, payouts))
+        except otps.OTPError as e:
+            return Response(
+                {"status": "error", "response": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            batch = payouts_service.create_batch(user, wallet, payouts)
+        except engine.InsufficientFunds:
+            return Response(
+                {
+                    "status": "error",
+                    "response": "Insufficient fund. Please recharge and try again",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {"status": "success", "response": "Payouts queued", "data": PayoutBatchSerializer(batch).data},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    def get(self, request):
+        context = {"request": request}
+        batches = PayoutBatchSerializer.project(
+            PayoutBatch.objects.filter(user=request.user).order_by("-created_at"), context
+        )[:50]
+        return Response(
+            {"status": "success", "response": PayoutBatchSerializer(batches, many=True, context=context).data},
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkPayoutDetail(APIView):
+    """A batch with per-status counts and its items; ?status= filters the items"""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, reference):
+        batch = PayoutBatch.objects.filter(user=request.user, reference=reference).first()
+        if batch is None:
+            return Response(
+                {"status": "error", "response": "Payout batch not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        context = {"request": request}
+        items = batch.items.order_by("id")
+        if request.query_params.get("status"):
+            items = items.filter(status=request.query_params["status"])
+        summary = dict(batch.items.values_list("status").annotate(count=Count("id")).order_by())
+        data = PayoutBatchSerializer(batch).data
+        data["summary"] = summary
+        data["items"] = PayoutItemSerializer(PayoutItemSerializer.project(items, context), many=True, context=context).data
+        return Response({"status": "success", "response": data}, status=status.HTTP_200_OK)
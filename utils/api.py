@@ -1,6 +1,6 @@
 import hashlib
 from django.conf import settings
-import requests, json
+import json
 from datetime import datetime
 from requests.auth import HTTPBasicAuth
 import os
@@ -8,6 +8,10 @@ import time
 from django.conf import settings
 
 from utils.helpers import encode_base64, generate_unique_reference, hash_sha512
+from utils.banks import bank_directory
+from utils.http import gateway
+from utils.singleflight import coalesced
+from utils.tokens import TokenManager
 # from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -27,8 +31,9 @@ class Paystack:
 	def __init__(self):
 		# self.api_key = os.getenv('API_KEY')
 		# self.api_secret = os.getenv('API_SECRET')
-		self.base_url = "https://api.paystack.co"
+		self.base_url = settings.PAYSTACK_BASE_URL
 
+	@coalesced("paystack.banks", key=lambda self: None)
 	def fetchBanks(self):
 		url = f"{self.base_url}/bank"
 		headers = {
@@ -39,11 +44,12 @@ class Paystack:
 			"country": "nigeria",
 			"currency": "NGN",
 		}
-		x = requests.get(url, headers=headers, params=params)
+		x = gateway.get(url, headers=headers, params=params, endpoint="paystack.banks")
 		return x.json()
 	
+	@coalesced("paystack.resolve_account")
 	def resolveAccount(bank_code, account_number):
-		url = f"https://api.paystack.co/bank/resolve"
+		url = f"{settings.PAYSTACK_BASE_URL}/bank/resolve"
 		headers = {
 			"Authorization": f"Bearer {paystack_key}",
 			"Content-Type": "application/json"
@@ -52,20 +58,20 @@ class Paystack:
 			"bank_code": bank_code,
 			"account_number": account_number
 		}
-		x = requests.get(url, headers=headers, params=params)
+		x = gateway.get(url, headers=headers, params=params, endpoint="paystack.resolve_account")
 		return x.json()
 	
 	def fetch_customer(email):
-		url = f"https://api.paystack.co/customer/{email}"
+		url = f"{settings.PAYSTACK_BASE_URL}/customer/{email}"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
 		}
-		x = requests.get(url, headers=headers)
+		x = gateway.get(url, headers=headers, endpoint="paystack.fetch_customer")
 		return x.json()
 	
 	def update_customer(email, fname, lname, mobile):
-		url = f"https://api.paystack.co/customer/{email}"
+		url = f"{settings.PAYSTACK_BASE_URL}/customer/{email}"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -75,11 +81,11 @@ class Paystack:
 			"last_name": fname,
 			"phone": mobile
 		}
-		x = requests.put(url, headers=headers, data=json.dumps(data))
+		x = gateway.put(url, headers=headers, data=json.dumps(data), endpoint="paystack.update_customer")
 		return x.json()
 
 	def create_customer(email,first_name,last_name,phone):
-		url = f"https://api.paystack.co/customer"
+		url = f"{settings.PAYSTACK_BASE_URL}/customer"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -90,11 +96,11 @@ class Paystack:
 			"last_name": first_name,
 			"phone": phone
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.create_customer")
 		return x.json()
 	
 	def validate_customer(customer,first_name,last_name):
-		url = f"https://api.paystack.co/customer/{customer}/identification"
+		url = f"{settings.PAYSTACK_BASE_URL}/customer/{customer}/identification"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -105,11 +111,11 @@ class Paystack:
 			"first_name": first_name,
 			"last_name": last_name
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.validate_customer")
 		return x.json()
 	
 	def whitelist_customer(customer):
-		url = f"https://api.paystack.co/customer/set_risk_action"
+		url = f"{settings.PAYSTACK_BASE_URL}/customer/set_risk_action"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -118,11 +124,11 @@ class Paystack:
 			"customer": customer,
 			"risk_action": "allow"
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(data))
+		x = gateway.post(url, headers=headers, data=json.dumps(data), endpoint="paystack.whitelist_customer")
 		return x.json()
 	
 	def virtual_account(customer, fname, lname, bank):
-		url = f"https://api.paystack.co/dedicated_account"
+		url = f"{settings.PAYSTACK_BASE_URL}/dedicated_account"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -133,11 +139,11 @@ class Paystack:
 			"first_name": fname,
 			"last_name": lname
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.virtual_account")
 		return x.json()
 	
 	def init_payment(email, amount, ref, callback):
-		url = f"https://api.paystack.co/transaction/initialize"
+		url = f"{settings.PAYSTACK_BASE_URL}/transaction/initialize"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -149,20 +155,21 @@ class Paystack:
 			"currency": "NGN",
 			"callback_url": callback
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.init_payment")
 		return x.json()
 	
+	@coalesced("paystack.verify_payment")
 	def verify_payment(ref):
-		url = f"https://api.paystack.co/transaction/verify/{ref}"
+		url = f"{settings.PAYSTACK_BASE_URL}/transaction/verify/{ref}"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
 		}
-		x = requests.get(url, headers=headers)
+		x = gateway.get(url, headers=headers, endpoint="paystack.verify_payment")
 		return x.json()
 	
 	def init_transfer(customer, amount, ref, note):
-		url = f"https://api.paystack.co/transfer"
+		url = f"{settings.PAYSTACK_BASE_URL}/transfer"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -175,11 +182,11 @@ class Paystack:
 			"recipient": customer,
 			"reference": ref
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.init_transfer")
 		return x.json()
 	
 	def finalize_transfer(transfer):
-		url = f"https://api.paystack.co/transfer/finalize_transfer"
+		url = f"{settings.PAYSTACK_BASE_URL}/transfer/finalize_transfer"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -187,11 +194,11 @@ class Paystack:
 		datum = {
 			"transfer_code": transfer
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.finalize_transfer")
 		return x.json()
 	
 	def init_transfer_rec(name, account_nummber, code):
-		url = f"https://api.paystack.co/transferrecipient"
+		url = f"{settings.PAYSTACK_BASE_URL}/transferrecipient"
 		headers = {
 			"Content-Type": "application/json",
 			"Authorization": f"Bearer {paystack_key}"
@@ -203,7 +210,31 @@ class Paystack:
 			"bank_code": code,
 			"currency": "NGN"
 		}
-		x = requests.post(url, headers=headers, data=json.dumps(datum))
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.transfer_recipient")
+		return x.json()
+
+	def bulk_transfer(transfers, currency="NGN"):
+		# Up to 100 transfers per call; each needs amount (kobo), reference, reason and recipient
+		url = f"{settings.PAYSTACK_BASE_URL}/transfer/bulk"
+		headers = {
+			"Content-Type": "application/json",
+			"Authorization": f"Bearer {paystack_key}"
+		}
+		datum = {
+			"currency": currency,
+			"source": "balance",
+			"transfers": transfers
+		}
+		x = gateway.post(url, headers=headers, data=json.dumps(datum), endpoint="paystack.bulk_transfer")
+		return x.json()
+
+	@coalesced("paystack.verify_transfer")
+	def verify_transfer(reference):
+		url = f"{settings.PAYSTACK_BASE_URL}/transfer/verify/{reference}"
+		headers = {
+			"Authorization": f"Bearer {paystack_key}"
+		}
+		x = gateway.get(url, headers=headers, endpoint="paystack.verify_transfer")
 		return x.json()
 
 
@@ -211,10 +242,16 @@ class CoralPay:
 	def __init__(self):
 		# self.api_key = os.getenv('API_KEY')
 		# self.api_secret = os.getenv('API_SECRET')
-		self.base_url = "https://testdev.coralpay.com:5000/GwApi/api/v1"
-		self.account_url = "http://sandbox1.coralpay.com:8080/paywithtransfer/moneytransfer/apis"
-		self.token = self.getToken().get('token')
-		self.key = self.getToken().get('key')
+		self.base_url = settings.CORALPAY_GWAPI_URL
+		self.account_url = settings.CORALPAY_ACCOUNT_URL
+
+	@property
+	def token(self):
+		return coralpay_tokens.get().get('token')
+
+	@property
+	def key(self):
+		return coralpay_tokens.get().get('key')
 
 	def getToken(self):
 		url = f"{self.base_url}/Authentication"
@@ -228,13 +265,16 @@ class CoralPay:
 			"terminalId": terminal_id
 		}
 
-		response = requests.post(url=url, headers=headers, data=json.dumps(datum))
+		response = gateway.post(url=url, headers=headers, data=json.dumps(datum), endpoint="coralpay.authentication")
 		if response.status_code == 200:
 			return response.json()
 		else:
 			raise Exception(f"Failed to get token: {response.status_code}, {response.text}")
 
-	def getBanks(self):
+	def getBanks(self, fresh=False):
+		if not fresh:
+			# Served from the bank directory, which calls back here with fresh=True
+			return bank_directory.payload("coralpay_account")
 		url = f"{self.account_url}/listOfBanks/"
 		reference_no = generate_unique_reference()
 		username = settings.CORALPAY_DPWT_USERNAME
@@ -246,28 +286,31 @@ class CoralPay:
 			"Content-Type": "application/json",
 			"Authorization": f"Basic {encoded_value}",
 		}
-		response = requests.get(url=url, headers=headers)
+		response = gateway.get(url=url, headers=headers, endpoint="coralpay.banks")
 		if response.status_code == 200:
 			return response.json()
 		else:
 			raise Exception(f"Failed to get banks: {response.status_code}, {response.text}")
 		
 	
-	def generate_signature(self, merchant_id, trace_id, timestamp):
-		signature_string = f"{merchant_id}{trace_id}{timestamp}{self.key}"
+	def generate_signature(self, merchant_id, trace_id, timestamp, key=None):
+		signature_string = f"{merchant_id}{trace_id}{timestamp}{key or self.key}"
 		signature = hashlib.sha256(signature_string.encode()).hexdigest()
 		return signature
 
 
 	def invoke_payment(self, customer_email, customer_name, customer_phone, token_user_id, title, description, trace_id, product_id, amount, currency, return_url):
 		url = f"{self.base_url}/InvokePayment"
+		# Read token and key together so a refresh between the two cannot
+		# pair a bearer token with a signature from different credentials.
+		credentials = coralpay_tokens.get()
 		headers = {
 			"Content-Type": "application/json",
-			"Authorization": f"Bearer {self.token}"
+			"Authorization": f"Bearer {credentials.get('token')}"
 		}
 
 		timestamp = int(time.time())
-		signature = self.generate_signature(merchant_id, trace_id, timestamp)
+		signature = self.generate_signature(merchant_id, trace_id, timestamp, credentials.get('key'))
 
 		request_payload = {
 			"requestHeader": {
@@ -293,22 +336,28 @@ class CoralPay:
 			"returnUrl": return_url
 		}
 
-		response = requests.post(url=url, headers=headers, data=json.dumps(request_payload))
+		response = gateway.post(url=url, headers=headers, data=json.dumps(request_payload), endpoint="coralpay.invoke_payment")
 		if response.status_code == 200:
 			return response.json()
 		else:
+			if response.status_code == 401:
+				coralpay_tokens.invalidate(credentials)
 			raise Exception(f"Failed to invoke payment: {response.status_code}, {response.text}")
 	
 
+	@coalesced("coralpay.transaction_query", key=lambda self, trace_id: trace_id)
 	def verify_payment(self, trace_id):
 		url = f"{self.base_url}/TransactionQuery"
+		# Read token and key together so a refresh between the two cannot
+		# pair a bearer token with a signature from different credentials.
+		credentials = coralpay_tokens.get()
 		headers = {
 			"Content-Type": "application/json",
-			"Authorization": f"Bearer {self.token}"
+			"Authorization": f"Bearer {credentials.get('token')}"
 		}
 
 		timestamp = int(time.time())
-		signature = self.generate_signature(merchant_id, trace_id, timestamp)
+		signature = self.generate_signature(merchant_id, trace_id, timestamp, credentials.get('key'))
 
 		request_payload = {
 			"requestHeader": {
@@ -320,10 +369,12 @@ class CoralPay:
 			"traceId": trace_id
 		}
 
-		response = requests.post(url=url, headers=headers, data=json.dumps(request_payload))
+		response = gateway.post(url=url, headers=headers, data=json.dumps(request_payload), endpoint="coralpay.transaction_query")
 		if response.status_code == 200:
 			return response.json()
 		else:
+			if response.status_code == 401:
+				coralpay_tokens.invalidate(credentials)
 			raise Exception(f"Failed to invoke payment: {response.status_code}, {response.text}")
 
 
@@ -352,10 +403,16 @@ class CoralPay:
 		print(username)
 		print(hashed_value)
 
-		response = requests.post(url=url, headers=headers, data=json.dumps(request_payload))
+		response = gateway.post(url=url, headers=headers, data=json.dumps(request_payload), endpoint="coralpay.static_account")
 		if response.status_code == 200:
 			return response.json()
 		else:
 			raise Exception(f"Failed to generate reserved account: {response.status_code}, {response.text}")
 
 
+coralpay_tokens = TokenManager(
+	"coralpay",
+	lambda: CoralPay().getToken(),
+	ttl=getattr(settings, "CORALPAY_TOKEN_TTL", 3600),
+	refresh_margin=getattr(settings, "CORALPAY_TOKEN_REFRESH_MARGIN", 60),
+)
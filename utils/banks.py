@@ -0,0 +1,266 @@
+"""
+Bank directory
+
+Bank lists change a few times a year, so the views that show them read
+``bank_directory`` instead of calling the provider on every request. Each
+provider's last good response is kept in the cache (``BANK_DIRECTORY_CACHE``,
+no expiry) with the time it was fetched, and every process holds a parsed
+``BankIndex`` of it for lookup by code, prefix search and fuzzy search.
+
+A copy older than ``BANK_DIRECTORY_TTL`` seconds is still served while the
+``refresh_bank_directory`` Celery task fetches a new one
+(stale-while-revalidate); if the provider is down the old copy simply stays.
+Only a process that has never seen a copy calls the provider inline. Beat
+also refreshes every provider on a schedule (``amaps.celery``).
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from rapidfuzz import fuzz, process
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "utils:banks"
+NAME_KEYS = ("name", "bankName", "BankName", "bank_name")
+CODE_KEYS = ("code", "bankCode", "BankCode", "bank_code", "cbnCode")
+
+
+class BankDirectoryUnavailable(Exception):
+    """No copy of the provider's bank list exists and the provider could not be reached"""
+
+
+def normalize(name):
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def bank_items(payload):
+    """The list of bank objects in a provider response, wherever the provider put it"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for value in payload.values():
+            items = bank_items(value)
+            if items and isinstance(items[0], dict):
+                return items
+    return []
+
+
+def _first(item, keys):
+    for key in keys:
+        if item.get(key) not in (None, ""):
+            return str(item[key])
+    return ""
+
+
+@dataclass(frozen=True, slots=True)
+class Bank:
+    code: str
+    name: str
+    key: str
+    data: dict = field(compare=False, hash=False)
+
+
+class BankIndex:
+    def __init__(self, items):
+        self.banks = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            name = _first(item, NAME_KEYS)
+            if name:
+                self.banks.append(Bank(_first(item, CODE_KEYS), name, normalize(name), item))
+        self.by_code = {bank.code: bank for bank in self.banks if bank.code}
+        # Whole names and every word in them, so "first" and "fcmb" both match
+        self.prefixes = sorted(
+            {
+                (word, position)
+                for position, bank in enumerate(self.banks)
+                for word in (bank.key, *bank.key.split())
+            }
+        )
+        self.keys = [bank.key for bank in self.banks]
+
+    def __len__(self):
+        return len(self.banks)
+
+    def lookup(self, code):
+        return self.by_code.get(str(code))
+
+    def prefix(self, query):
+        query = normalize(query)
+        found = {}
+        position = bisect.bisect_left(self.prefixes, (query,))
+        while position < len(self.prefixes) and self.prefixes[position][0].startswith(query):
+            bank_position = self.prefixes[position][1]
+            found.setdefault(bank_position, self.banks[bank_position])
+            position += 1
+        return sorted(found.values(), key=lambda bank: bank.key)
+
+    def search(self, query, limit=10):
+        """Prefix matches by name, then fuzzy matches scoring at least ``BANK_SEARCH_MIN_SCORE``"""
+        if not normalize(query):
+            return []
+        results = self.prefix(query)[:limit]
+        if len(results) < limit:
+            seen = {id(bank) for bank in results}
+            matches = process.extract(
+                normalize(query),
+                self.keys,
+                scorer=fuzz.WRatio,
+                limit=limit,
+                score_cutoff=getattr(settings, "BANK_SEARCH_MIN_SCORE", 75),
+            )
+            for _, _, position in matches:
+                bank = self.banks[position]
+                if id(bank) not in seen and len(results) < limit:
+                    seen.add(id(bank))
+                    results.append(bank)
+        return results
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    payload: object
+    fetched_at: float
+    index: BankIndex
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+def _paystack():
+    from utils.api import Paystack
+
+    return Paystack().fetchBanks()
+
+
+def _coralpay():
+    from paymentgatewayservice import calls
+    from utils.http import gateway
+
+    response = gateway.send(calls.get_bank_list())
+    response.raise_for_status()
+    return response.json()
+
+
+def _coralpay_account():
+    from utils.api import CoralPay
+
+    return CoralPay().getBanks(fresh=True)
+
+
+def _coralpay_ussd():
+    from paymentgatewayservice import calls
+    from utils.http import gateway
+
+    response = gateway.send(calls.ussd_bank_list({}))
+    response.raise_for_status()
+    return response.json()
+
+
+PROVIDERS = {
+    "paystack": _paystack,
+    "coralpay": _coralpay,
+    "coralpay_account": _coralpay_account,
+    "coralpay_ussd": _coralpay_ussd,
+}
+
+
+class BankDirectory:
+    def __init__(self, providers=PROVIDERS):
+        self.providers = providers
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        return caches[getattr(settings, "BANK_DIRECTORY_CACHE", "default")]
+
+    def _ttl(self):
+        return getattr(settings, "BANK_DIRECTORY_TTL", 24 * 60 * 60)
+
+    def _key(self, provider):
+        return f"{KEY_PREFIX}:{provider}"
+
+    def _install(self, provider, entry):
+        snapshot = Snapshot(
+            entry["payload"], entry["fetched_at"], BankIndex(bank_items(entry["payload"]))
+        )
+        with self._lock:
+            self._snapshots[provider] = snapshot
+        return snapshot
+
+    def snapshot(self, provider):
+        """The newest copy of ``provider``'s bank list, scheduling a refresh once it is stale"""
+        if provider not in self.providers:
+            raise KeyError(provider)
+        snapshot = self._snapshots.get(provider)
+        if snapshot is not None and snapshot.age < self._ttl():
+            metrics.incr("banks.hits")
+            return snapshot
+
+        # Another process may already have refreshed the shared copy
+        entry = self._cache().get(self._key(provider))
+        if entry is not None and (snapshot is None or entry["fetched_at"] > snapshot.fetched_at):
+            snapshot = self._install(provider, entry)
+        if snapshot is None:
+            metrics.incr("banks.misses")
+            return self.refresh(provider)
+        if snapshot.age >= self._ttl():
+            metrics.incr("banks.stale")
+            self._schedule_refresh(provider)
+        return snapshot
+
+    def refresh(self, provider):
+        """Fetch ``provider``'s list now; raises ``BankDirectoryUnavailable`` if that fails"""
+        try:
+            with metrics.time(f"banks.refresh.{provider}"):
+                payload = self.providers[provider]()
+        except Exception as e:
+            logger.warning("Could not refresh the %s bank list: %s", provider, e)
+            raise BankDirectoryUnavailable(provider) from e
+        if not BankIndex(bank_items(payload)):
+            logger.warning("The %s bank list came back empty: %r", provider, payload)
+            raise BankDirectoryUnavailable(provider)
+        entry = {"payload": payload, "fetched_at": time.time()}
+        self._cache().set(self._key(provider), entry, None)
+        return self._install(provider, entry)
+
+    def _schedule_refresh(self, provider):
+        # One refresh per provider per minute across all processes
+        if not self._cache().add(f"{self._key(provider)}:refreshing", True, 60):
+            return
+        from paymentgatewayservice.tasks import refresh_bank_directory
+
+        try:
+            refresh_bank_directory.delay(provider)
+        except Exception:
+            logger.exception("Could not queue a refresh of the %s bank list", provider)
+
+    def payload(self, provider):
+        """The provider's response as it was last fetched, for views that relay it unchanged"""
+        return self.snapshot(provider).payload
+
+    def lookup(self, provider, code):
+        return self.snapshot(provider).index.lookup(code)
+
+    def search(self, provider, query, limit=10):
+        return self.snapshot(provider).index.search(query, limit)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+bank_directory = BankDirectory()
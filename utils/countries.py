@@ -0,0 +1,95 @@
+"""
+Country metadata registry
+
+``staticfiles/json/countries.json`` carries a base64 flag image per country
+and is several hundred KB; it is parsed once per process, on first use, and
+only the fields the services need are kept. Lookups are dict hits keyed by
+ISO alpha-2, ISO alpha-3 or (case-insensitive) country name, and the
+international dialing code comes from ``phonenumbers``' region metadata.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+
+import phonenumbers
+from django.conf import settings
+
+
+@dataclass(frozen=True, slots=True)
+class Country:
+    alpha2: str
+    alpha3: str
+    name: str
+    currency: str | None
+    dialing_code: int | None
+
+
+class CountryRegistry:
+    def __init__(self, path=None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._by_code = None
+        self._by_name = None
+
+    @property
+    def path(self):
+        return str(self._path or os.path.join(settings.BASE_DIR, "staticfiles/json/countries.json"))
+
+    def _load(self):
+        if self._by_code is None:
+            with self._lock:
+                if self._by_code is None:
+                    with open(self.path, encoding="utf8") as f:
+                        data = json.load(f)
+                    by_code, by_name = {}, {}
+                    for entry in data:
+                        country = Country(
+                            alpha2=entry["isoAlpha2"],
+                            alpha3=entry["isoAlpha3"],
+                            name=entry["name"],
+                            currency=(entry.get("currency") or {}).get("code") or None,
+                            dialing_code=phonenumbers.country_code_for_region(entry["isoAlpha2"])
+                            or None,
+                        )
+                        by_code[country.alpha2] = by_code[country.alpha3] = country
+                        by_name[country.name.casefold()] = country
+                    self._by_name = by_name
+                    self._by_code = by_code
+        return self._by_code
+
+    def get(self, code, default=None):
+        """The country for an ISO alpha-2 or alpha-3 code"""
+        if not code:
+            return default
+        return self._load().get(code.strip().upper(), default)
+
+    def by_name(self, name, default=None):
+        if not name:
+            return default
+        self._load()
+        return self._by_name.get(name.strip().casefold(), default)
+
+    def lookup(self, value, default=None):
+        """Resolve a code or a country name, as sent by the apps"""
+        return self.get(value) or self.by_name(value) or default
+
+    def name(self, code, default=None):
+        country = self.get(code)
+        return country.name if country else default
+
+    def currency(self, value, default=None):
+        country = self.lookup(value)
+        return (country and country.currency) or default
+
+    def __iter__(self):
+        self._load()
+        return iter(self._by_name.values())
+
+    def __len__(self):
+        self._load()
+        return len(self._by_name)
+
+
+countries = CountryRegistry()
@@ -0,0 +1,97 @@
+"""
+Process-wide IP geolocation
+
+The GeoLite2 country database is opened once per process in memory-mapped
+mode (pages are shared between workers through the OS page cache) and
+lookups go through a bounded LRU keyed by IP, so repeat logins from the same
+address never touch the database. Hit and miss counts are available from
+``geolocator.stats()``.
+"""
+
+import functools
+import ipaddress
+import logging
+import os
+import threading
+
+import geoip2.database
+import geoip2.errors
+import maxminddb
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GeoLocator:
+    def __init__(self, path=None, cache_size=None):
+        self._path = path
+        self._cache_size = cache_size
+        self._reader = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+        self._lookup = None
+
+    @property
+    def path(self):
+        return str(self._path or settings.GEOIP_COUNTRY_DB)
+
+    def reader(self):
+        if self._reader is None and not self._unavailable:
+            with self._lock:
+                if self._reader is None and not self._unavailable:
+                    if os.path.exists(self.path):
+                        self._reader = geoip2.database.Reader(self.path, mode=maxminddb.MODE_MMAP)
+                    else:
+                        # Keep serving logins with the default country rather than failing them
+                        logger.warning(
+                            "GeoIP database %s not found; using the default country", self.path
+                        )
+                        self._unavailable = True
+        return self._reader
+
+    def _country_code(self, ip_address):
+        reader = self.reader()
+        if reader is None:
+            return None
+        try:
+            return reader.country(ip_address).country.iso_code
+        except (geoip2.errors.AddressNotFoundError, ValueError):
+            return None
+
+    def _cached(self):
+        if self._lookup is None:
+            size = self._cache_size or getattr(settings, "GEOIP_CACHE_SIZE", 4096)
+            self._lookup = functools.lru_cache(maxsize=size)(self._country_code)
+        return self._lookup
+
+    def country_code(self, ip_address, default=None):
+        """ISO alpha-2 code for ``ip_address``, or ``default`` if it cannot be located"""
+        if not ip_address:
+            return default
+        try:
+            # Normalise so equivalent spellings share one cache entry
+            ip_address = str(ipaddress.ip_address(ip_address.strip()))
+        except ValueError:
+            return default
+        return self._cached()(ip_address) or default
+
+    def stats(self):
+        info = self._cached().cache_info()
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = None
+            self._unavailable = False
+            if self._lookup is not None:
+                self._lookup.cache_clear()
+
+
+geolocator = GeoLocator()
@@ -6,6 +6,10 @@ import math
 import random
 import secrets
 import re
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 
 def generate_random_string(length=25) -> str:
@@ -152,4 +156,25 @@ def get_random_string(length):
     letters = string.ascii_lowercase
     characters = string.ascii_letters + string.digits
     result_str = ''.join(random.choice(characters) for i in range(length))
-    return f"OjaPAY_{result_str}"
\ No newline at end of file
+    return f"OjaPAY_{result_str}"
+
+
+def parse_bound(value, end=False):
+    """
+    Parse an ISO date or datetime. A bare date used as the ``end`` bound
+    covers that whole day.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    elif moment is None:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD or an ISO datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
@@ -0,0 +1,262 @@
+"""
+Pooled HTTP transport for outbound payment gateway calls
+
+Every Paystack and CoralPay request goes through ``gateway`` so that
+connections to the same host are kept alive and reused instead of paying
+a fresh TCP + TLS handshake per call. Pool sizes and timeouts come from
+``settings.GATEWAY_HTTP``; per-call latency is recorded in
+``utils.metrics.metrics`` under ``gateway.<endpoint>``. Calls pass through
+the endpoint's circuit breaker and idempotent ones are retried within a
+budget (``utils.resilience``). ``async_gateway`` offers the same behaviour to
+async views.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import metrics
+from utils.resilience import CircuitOpenError, circuits
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 32,
+    "POOL_BLOCK": False,
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 30.0,
+    "ASYNC_MAX_CONNECTIONS": 512,
+    "ASYNC_MAX_PER_HOST": 256,
+    "HOSTS": {},
+}
+
+
+def gateway_options(host=None):
+    """Resolve transport options, applying any per-host overrides"""
+    configured = getattr(settings, "GATEWAY_HTTP", {})
+    options = {**DEFAULTS, **configured}
+    if host:
+        options.update(options["HOSTS"].get(host, {}))
+    return options
+
+
+class GatewayTransport:
+    """Keeps one pooled ``requests.Session`` per upstream host"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _build_session(self, host):
+        options = gateway_options(host)
+        adapter = HTTPAdapter(
+            pool_connections=options["POOL_CONNECTIONS"],
+            pool_maxsize=options["POOL_MAXSIZE"],
+            pool_block=options["POOL_BLOCK"],
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def session_for(self, url):
+        host = urlsplit(url).netloc
+        if self._pid != os.getpid():
+            # Sockets must not be shared with a parent process after a fork
+            # (gunicorn --preload, celery prefork), so start with fresh pools.
+            with self._lock:
+                self._sessions = {}
+                self._pid = os.getpid()
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._build_session(host)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method, url, endpoint=None, idempotent=None, **kwargs):
+        host = urlsplit(url).netloc
+        if "timeout" not in kwargs:
+            options = gateway_options(host)
+            kwargs["timeout"] = (options["CONNECT_TIMEOUT"], options["READ_TIMEOUT"])
+        key = endpoint or host
+        name = f"gateway.{key}"
+        breaker = circuits.breaker(key)
+        circuits.budget(key).deposit()
+        delays = circuits.retry_delays(key, idempotent)
+        breaker.before()
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session_for(url).request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                metrics.observe(name, time.perf_counter() - started, error=True)
+                logger.warning("%s %s failed", method, name, exc_info=True)
+                breaker.record_failure()
+                if not self._retry(breaker, delays):
+                    raise
+                continue
+            failed = response.status_code >= 500
+            metrics.observe(name, time.perf_counter() - started, error=failed)
+            if not failed:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            if not self._retry(breaker, delays):
+                return response
+
+    @staticmethod
+    def _retry(breaker, delays):
+        """Wait out the next backoff delay; False when no retry is allowed"""
+        delay = next(delays, None)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        try:
+            breaker.before()
+        except CircuitOpenError:
+            return False
+        return True
+
+    def get(self, url, endpoint=None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint=None, **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def put(self, url, endpoint=None, **kwargs):
+        return self.request("PUT", url, endpoint=endpoint, **kwargs)
+
+    def send(self, call):
+        """Send a prepared ``GatewayCall``"""
+        return self.request(
+            call.method, call.url, endpoint=call.endpoint, headers=call.headers, data=call.data
+        )
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+class AsyncResponse:
+    """The subset of ``requests.Response`` the gateway views rely on"""
+
+    def __init__(self, status_code, body, headers):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncGatewayTransport:
+    """
+    Non-blocking counterpart of ``GatewayTransport`` built on aiohttp.
+
+    aiohttp sessions are bound to the event loop that created them, so one
+    session (with its own keep-alive pool) is kept per running loop. Network
+    failures are re-raised as the matching ``requests`` exceptions so callers
+    handle both transports the same way.
+    """
+
+    def __init__(self):
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _session(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            options = gateway_options()
+            connector = aiohttp.TCPConnector(
+                limit=options["ASYNC_MAX_CONNECTIONS"],
+                limit_per_host=options["ASYNC_MAX_PER_HOST"],
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    async def request(self, method, url, endpoint=None, timeout=None, idempotent=None, **kwargs):
+        host = urlsplit(url).netloc
+        if timeout is None:
+            options = gateway_options(host)
+            timeout = (options["CONNECT_TIMEOUT"], options["READ_TIMEOUT"])
+        connect_timeout, read_timeout = timeout
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        key = endpoint or host
+        name = f"gateway.{key}"
+        breaker = circuits.breaker(key)
+        circuits.budget(key).deposit()
+        delays = circuits.retry_delays(key, idempotent)
+        breaker.before()
+        while True:
+            started = time.perf_counter()
+            try:
+                async with self._session().request(
+                    method, url, timeout=client_timeout, **kwargs
+                ) as response:
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                metrics.observe(name, time.perf_counter() - started, error=True)
+                logger.warning("%s %s failed", method, name, exc_info=True)
+                breaker.record_failure()
+                if await self._retry(breaker, delays):
+                    continue
+                if isinstance(exc, asyncio.TimeoutError):
+                    raise requests.exceptions.Timeout(str(exc)) from exc
+                raise requests.exceptions.ConnectionError(str(exc)) from exc
+            failed = response.status >= 500
+            metrics.observe(name, time.perf_counter() - started, error=failed)
+            if not failed:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+                if await self._retry(breaker, delays):
+                    continue
+            return AsyncResponse(response.status, body, dict(response.headers))
+
+    @staticmethod
+    async def _retry(breaker, delays):
+        delay = next(delays, None)
+        if delay is None:
+            return False
+        await asyncio.sleep(delay)
+        try:
+            breaker.before()
+        except CircuitOpenError:
+            return False
+        return True
+
+    async def send(self, call):
+        return await self.request(
+            call.method, call.url, endpoint=call.endpoint, headers=call.headers, data=call.data
+        )
+
+    async def close(self):
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+gateway = GatewayTransport()
+async_gateway = AsyncGatewayTransport()
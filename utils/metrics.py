@@ -0,0 +1,118 @@
+"""
+In-process metrics shared by the gateway clients and background jobs
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Timer:
+    """Latency samples for a single named operation"""
+
+    def __init__(self, name, sample_size=1024):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._samples.append(seconds)
+            if error:
+                self.errors += 1
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        index = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+        return samples[index]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide collection of timers, counters and gauges"""
+
+    def __init__(self):
+        self._timers = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name):
+        timer = self._timers.get(name)
+        if timer is None:
+            with self._lock:
+                timer = self._timers.setdefault(name, Timer(name))
+        return timer
+
+    def observe(self, name, seconds, error=False):
+        self.timer(name).observe(seconds, error=error)
+
+    @contextmanager
+    def time(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(name, time.perf_counter() - started, error=True)
+            raise
+        self.observe(name, time.perf_counter() - started)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def set_gauge(self, name, value):
+        self._gauges[name] = value
+
+    def snapshot(self, prefix=""):
+        return {
+            "timers": {
+                name: timer.snapshot()
+                for name, timer in sorted(self._timers.items())
+                if name.startswith(prefix)
+            },
+            "counters": {
+                name: value
+                for name, value in sorted(self._counters.items())
+                if name.startswith(prefix)
+            },
+            "gauges": {
+                name: value
+                for name, value in sorted(self._gauges.items())
+                if name.startswith(prefix)
+            },
+        }
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = MetricsRegistry()
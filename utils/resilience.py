@@ -0,0 +1,247 @@
+"""
+Circuit breakers and retry budgets for outbound gateway calls
+
+``GatewayTransport`` and ``AsyncGatewayTransport`` (``utils.http``) run every
+call through the ``circuits`` registry, which keeps one ``CircuitBreaker``
+and one ``RetryBudget`` per endpoint name for the whole process.
+
+A breaker opens after ``FAILURE_THRESHOLD`` consecutive failures (transport
+errors and 5xx responses). While open, calls fail at once with
+``CircuitOpenError`` and never reach the network. After
+``RECOVERY_TIMEOUT`` seconds it is half-open and lets
+``HALF_OPEN_MAX_CALLS`` probes through: a success closes it, a failure opens
+it again. ``CircuitOpenError`` is a ``RequestException``; views answer it,
+like any call that got no response, with a 503 whose ``Retry-After`` comes
+from ``retry_after``.
+
+Only endpoints listed in ``IDEMPOTENT_ENDPOINTS`` are retried, at most
+``RETRY_ATTEMPTS`` times with full-jitter exponential backoff. Each retry
+also spends a token from the endpoint's budget. Every call earns
+``RETRY_BUDGET_RATIO`` of a token, and ``RETRY_BUDGET_MIN_PER_SECOND``
+tokens trickle in regardless. Retries therefore stay a bounded fraction of
+traffic instead of multiplying load on a struggling upstream.
+
+Options come from ``settings.GATEWAY_RESILIENCE``, with per-endpoint
+overrides under ``"ENDPOINTS"``. Breaker state is published as the gauge
+``gateway.circuit.<endpoint>.state`` (0 closed, 1 half-open, 2 open).
+"""
+
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from requests.exceptions import RequestException
+
+from utils.metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DEFAULTS = {
+    "FAILURE_THRESHOLD": 5,
+    "RECOVERY_TIMEOUT": 30.0,
+    "HALF_OPEN_MAX_CALLS": 1,
+    "RETRY_ATTEMPTS": 2,
+    "RETRY_BACKOFF": 0.2,
+    "RETRY_BACKOFF_MAX": 2.0,
+    "RETRY_BUDGET_RATIO": 0.2,
+    "RETRY_BUDGET_MIN_PER_SECOND": 1.0,
+    "IDEMPOTENT_ENDPOINTS": (),
+    "ENDPOINTS": {},
+}
+
+
+def resilience_options(endpoint=None):
+    """Resolve breaker and retry options, applying any per-endpoint overrides"""
+    configured = getattr(settings, "GATEWAY_RESILIENCE", {})
+    options = {**DEFAULTS, **configured}
+    if endpoint:
+        options.update(options["ENDPOINTS"].get(endpoint, {}))
+    return options
+
+
+class CircuitOpenError(RequestException):
+    """The endpoint's circuit is open, so the call was not attempted"""
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Circuit for {endpoint} is open; retry in {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def retry_after(error):
+    """Seconds a client should wait before retrying a call that failed with ``error``, if known"""
+    seconds = getattr(error, "retry_after", None)
+    return None if seconds is None else max(1, math.ceil(seconds))
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _publish(self):
+        metrics.set_gauge(f"gateway.circuit.{self.name}.state", STATE_GAUGE[self._state])
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state, self._probes = HALF_OPEN, 0
+            self._publish()
+
+    def _open(self):
+        self._state, self._opened_at = OPEN, time.monotonic()
+        metrics.incr(f"gateway.circuit.{self.name}.opened")
+        self._publish()
+
+    def before(self):
+        """Admit a call or raise ``CircuitOpenError``"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            retry_after = max(self.recovery_timeout - (time.monotonic() - self._opened_at), 0.0)
+        metrics.incr(f"gateway.circuit.{self.name}.rejected")
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._publish()
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def reset(self):
+        with self._lock:
+            self._state, self._failures, self._probes = CLOSED, 0, 0
+            self._publish()
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a share of calls plus a small floor per second"""
+
+    def __init__(self, ratio=0.2, min_per_second=1.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(10.0 * min_per_second, 1.0)
+        self._balance = min_per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._balance = min(
+            self.capacity, self._balance + (now - self._updated) * self.min_per_second
+        )
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._balance = min(self.capacity, self._balance + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class Circuits:
+    """Process-wide breakers and retry budgets, one of each per endpoint"""
+
+    def __init__(self):
+        self._breakers = {}
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    options = resilience_options(endpoint)
+                    breaker = CircuitBreaker(
+                        endpoint,
+                        failure_threshold=options["FAILURE_THRESHOLD"],
+                        recovery_timeout=options["RECOVERY_TIMEOUT"],
+                        half_open_max_calls=options["HALF_OPEN_MAX_CALLS"],
+                    )
+                    self._breakers[endpoint] = breaker
+        return breaker
+
+    def budget(self, endpoint):
+        budget = self._budgets.get(endpoint)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.get(endpoint)
+                if budget is None:
+                    options = resilience_options(endpoint)
+                    budget = RetryBudget(
+                        options["RETRY_BUDGET_RATIO"], options["RETRY_BUDGET_MIN_PER_SECOND"]
+                    )
+                    self._budgets[endpoint] = budget
+        return budget
+
+    def retry_delays(self, endpoint, idempotent=None):
+        """
+        Backoff delays for the retries ``endpoint`` may make, generated lazily
+        so each one is only granted (and paid for from the budget) when
+        the previous attempt has failed.
+        """
+        options = resilience_options(endpoint)
+        if idempotent is None:
+            idempotent = endpoint in options["IDEMPOTENT_ENDPOINTS"]
+        if not idempotent:
+            return
+        budget = self.budget(endpoint)
+        for attempt in range(options["RETRY_ATTEMPTS"]):
+            if not budget.withdraw():
+                metrics.incr(f"gateway.retry_budget_exhausted.{endpoint}")
+                return
+            metrics.incr(f"gateway.retries.{endpoint}")
+            yield random.uniform(
+                0, min(options["RETRY_BACKOFF_MAX"], options["RETRY_BACKOFF"] * 2**attempt)
+            )
+
+    def states(self):
+        return {name: breaker.state for name, breaker in sorted(self._breakers.items())}
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+            self._budgets.clear()
+
+
+circuits = Circuits()
@@ -0,0 +1,42 @@
+"""
+Serializer helpers for list endpoints
+"""
+
+from rest_framework import serializers
+
+
+class SparseFieldsMixin:
+    """
+    Let callers pick the fields they need with ``?fields=id,amount,date``.
+
+    The selection comes from the ``fields`` keyword or the ``fields`` query
+    parameter of ``context["request"]``; unknown names are ignored and an
+    empty selection keeps every field. ``project`` narrows a queryset to the
+    columns the (selected) fields read, joining nested serializers with
+    ``select_related`` so a list costs one query.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            request = self.context.get("request")
+            fields = request.query_params.get("fields") if request is not None else None
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        wanted = {name.strip() for name in fields or () if name.strip()} & set(self.fields)
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+    @classmethod
+    def project(cls, queryset, context=None, fields=None):
+        related, columns = [], []
+        for field in cls(context=context or {}, fields=fields).fields.values():
+            if field.source == "*" or "." in field.source:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                related.append(field.source)
+                columns.extend(f"{field.source}__{child.source}" for child in field.fields.values())
+            else:
+                columns.append(field.source)
+        return queryset.select_related(*related).only(*columns)
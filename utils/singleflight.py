@@ -0,0 +1,144 @@
+"""
+Request coalescing (single-flight) for read-only gateway lookups
+
+Under load many requests ask a gateway for the same thing at once: client
+retries of one ``verify_payment``, ``resolveAccount`` for a popular account,
+the bank list after a deploy. ``SingleFlight.do`` lets the first caller for a
+key make the upstream call while concurrent callers with the same key wait
+for it and get the same result, or the same exception.
+
+A successful result can also be kept for ``ttl`` seconds, so the upstream sees
+at most one call per key per window. Failures are never kept. Results are
+shared between callers and must be treated as read-only.
+
+The ``coalesced`` decorator applies this to the lookups in ``utils.api``,
+with one group per endpoint name and windows from
+``settings.GATEWAY_COALESCE_TTL``. Waiting callers are counted as
+``singleflight.<endpoint>.shared``, cached results as ``.cached``, and
+upstream calls as ``.calls``.
+"""
+
+import functools
+import threading
+import time
+
+from django.conf import settings
+
+from utils.metrics import metrics
+
+# Expired results are only swept once a group holds this many
+MAX_RESULTS = 1024
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self._calls = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, ttl=0):
+        """Return ``fn()``, sharing one call among concurrent callers with the same ``key``"""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if self.clock() < cached[0]:
+                    metrics.incr(f"singleflight.{self.name}.cached")
+                    return cached[1]
+                del self._results[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f"singleflight.{self.name}.shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr(f"singleflight.{self.name}.calls")
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and ttl > 0:
+                    self._remember(key, call.result, ttl)
+            call.done.set()
+        return call.result
+
+    def _remember(self, key, result, ttl):
+        now = self.clock()
+        if len(self._results) >= MAX_RESULTS:
+            for stale in [k for k, (expires_at, _) in self._results.items() if expires_at <= now]:
+                del self._results[stale]
+        self._results[key] = (now + ttl, result)
+
+    def forget(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+class Flights:
+    """Process-wide single-flight groups, one per endpoint"""
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def group(self, endpoint):
+        group = self._groups.get(endpoint)
+        if group is None:
+            with self._lock:
+                group = self._groups.setdefault(endpoint, SingleFlight(endpoint))
+        return group
+
+    def reset(self):
+        with self._lock:
+            self._groups.clear()
+
+
+flights = Flights()
+
+
+def coalesce_ttl(endpoint):
+    return getattr(settings, "GATEWAY_COALESCE_TTL", {}).get(endpoint, 0)
+
+
+def coalesced(endpoint, key=None):
+    """
+    Coalesce concurrent calls to the decorated lookup. Calls are keyed on
+    their arguments, or on ``key(*args, **kwargs)`` when given (e.g. to
+    leave out ``self``).
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return flights.group(endpoint).do(
+                call_key, lambda: fn(*args, **kwargs), coalesce_ttl(endpoint)
+            )
+
+        return wrapper
+
+    return decorator
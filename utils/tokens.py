@@ -0,0 +1,87 @@
+"""
+Process-wide cache for gateway auth credentials
+"""
+
+import base64
+import json
+import logging
+import threading
+import time
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def jwt_expiry(token):
+    """Return the ``exp`` claim of a JWT as a unix timestamp, or None"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """
+    Caches the credentials returned by ``fetch`` until shortly before they
+    expire. Concurrent callers that find the cache stale share a single
+    refresh: the first one fetches while the rest wait on the lock and then
+    reuse its result.
+    """
+
+    def __init__(self, name, fetch, ttl=3600, refresh_margin=60, clock=time.time):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._credentials = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _expiry_for(self, credentials):
+        now = self.clock()
+        expires_in = credentials.get("expiresIn") or credentials.get("expires_in")
+        if expires_in:
+            try:
+                return now + float(expires_in)
+            except (TypeError, ValueError):
+                pass
+        claimed = jwt_expiry(credentials.get("token"))
+        if claimed:
+            return claimed
+        return now + self.ttl
+
+    def _is_fresh(self):
+        return (
+            self._credentials is not None and self.clock() < self._expires_at - self.refresh_margin
+        )
+
+    def get(self):
+        """Return the cached credentials dict, refreshing it when due"""
+        if self._is_fresh():
+            return self._credentials
+        with self._lock:
+            if not self._is_fresh():
+                with metrics.time(f"tokens.{self.name}.fetch"):
+                    credentials = self.fetch()
+                self._expires_at = self._expiry_for(credentials)
+                self._credentials = credentials
+                logger.info(
+                    "Refreshed %s token, valid for %.0fs",
+                    self.name,
+                    self._expires_at - self.clock(),
+                )
+            return self._credentials
+
+    def invalidate(self, credentials=None):
+        """
+        Drop the cached credentials. Passing the credentials that were
+        rejected avoids discarding a token another thread has just refreshed.
+        """
+        with self._lock:
+            if credentials is None or credentials is self._credentials:
+                self._credentials = None
+                self._expires_at = 0.0
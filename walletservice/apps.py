@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class WalletserviceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "walletservice"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .models import Currency, ExchangeRate
+        from .rates import rate_matrix_changed
+
+        for model in (Currency, ExchangeRate):
+            post_save.connect(rate_matrix_changed, sender=model, dispatch_uid=f"rate-matrix-{model.__name__}-save")
+            post_delete.connect(rate_matrix_changed, sender=model, dispatch_uid=f"rate-matrix-{model.__name__}-delete")
@@ -0,0 +1,112 @@
+"""
+Exchange-rate history and downsampled time series
+
+``record_rates`` appends every refreshed rate to ``ExchangeRateHistory`` and
+folds it into the minute, hour and day ``ExchangeRateRollup`` buckets that
+contain the refresh time, upserting all of them with one ``bulk_create``.
+``rate_series`` serves a range for one pair from the coarsest rollup that
+still gives enough points for the window, so a multi-year chart reads a few
+hundred day buckets rather than every raw refresh.
+"""
+
+from datetime import timedelta
+
+from .models import ExchangeRateHistory, ExchangeRateRollup
+
+RESOLUTIONS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+# Upper bound on points returned when the caller does not pick a resolution
+MAX_POINTS = 1000
+
+
+def truncate(moment, resolution):
+    if resolution == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_rates(rates, recorded_at):
+    """
+    Store ``{(from_currency_id, to_currency_id): rate}`` observed at ``recorded_at``.
+
+    Two bulk inserts regardless of how many pairs or resolutions: one for the
+    raw history and one upsert for the rollups, after a single read of the
+    buckets being extended.
+    """
+    if not rates:
+        return
+    ExchangeRateHistory.objects.bulk_create(
+        ExchangeRateHistory(
+            from_currency_id=from_id, to_currency_id=to_id, rate=rate, recorded_at=recorded_at
+        )
+        for (from_id, to_id), rate in rates.items()
+    )
+
+    buckets = {resolution: truncate(recorded_at, resolution) for resolution in RESOLUTIONS}
+    existing = {
+        (row.from_currency_id, row.to_currency_id, row.resolution): row
+        for row in ExchangeRateRollup.objects.filter(
+            bucket__in=set(buckets.values()), resolution__in=list(RESOLUTIONS)
+        )
+        if row.bucket == buckets[row.resolution]
+    }
+    rollups = []
+    for (from_id, to_id), rate in rates.items():
+        for resolution, bucket in buckets.items():
+            row = existing.get((from_id, to_id, resolution))
+            if row is None:
+                row = ExchangeRateRollup(
+                    from_currency_id=from_id,
+                    to_currency_id=to_id,
+                    resolution=resolution,
+                    bucket=bucket,
+                    open=rate,
+                    high=rate,
+                    low=rate,
+                    close=rate,
+                    samples=1,
+                )
+            else:
+                row.high = max(row.high, rate)
+                row.low = min(row.low, rate)
+                row.close = rate
+                row.samples += 1
+            rollups.append(row)
+    ExchangeRateRollup.objects.bulk_create(
+        rollups,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["from_currency", "to_currency", "resolution", "bucket"],
+        update_fields=["high", "low", "close", "samples"],
+    )
+
+
+def pick_resolution(start, end, max_points=MAX_POINTS):
+    """The finest resolution that covers ``[start, end)`` in at most ``max_points`` buckets"""
+    span = end - start
+    for resolution, step in RESOLUTIONS.items():
+        if span / step <= max_points:
+            return resolution
+    return "day"
+
+
+def rate_series(from_code, to_code, start, end, resolution=None):
+    """Return ``(resolution, rollup rows)`` for one pair, oldest bucket first"""
+    resolution = resolution or pick_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(
+            f"Unknown resolution '{resolution}', expected one of {', '.join(RESOLUTIONS)}"
+        )
+    rows = ExchangeRateRollup.objects.filter(
+        from_currency__code=from_code,
+        to_currency__code=to_code,
+        resolution=resolution,
+        bucket__gte=truncate(start, resolution),
+        bucket__lt=end,
+    ).order_by("bucket")
+    return resolution, rows.values("bucket", "open", "high", "low", "close", "samples")
@@ -75,8 +75,6 @@ class Wallet(models.Model):
     bank_code = models.CharField(max_length=100, default="", blank=True)
     account_name = models.CharField(max_length=100, default="", blank=True)
     account_number = models.CharField(max_length=100, default="", blank=True)
-    otp_code = models.CharField(max_length=6, blank=True, null=True)
-    otp_expiry = models.DateTimeField(null=True, blank=True)
     suspend = models.BooleanField(default=False)
     created_on = models.DateTimeField(auto_now_add=True, null=False)
     modified_on = models.DateTimeField(auto_now=True, null=False)
@@ -110,6 +108,63 @@ class ExchangeRate(models.Model):
         return f"1 {self.from_currency.code} = {self.rate} {self.to_currency.code}"
 
 
+class ExchangeRateHistory(models.Model):
+    """Append-only record of every rate written by update_exchange_rates"""
+
+    from_currency = models.ForeignKey(
+        Currency, related_name="+", on_delete=models.CASCADE
+    )
+    to_currency = models.ForeignKey(
+        Currency, related_name="+", on_delete=models.CASCADE
+    )
+    rate = models.DecimalField(max_digits=10, decimal_places=4)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["from_currency", "to_currency", "recorded_at"],
+                name="fx_history_pair_time_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recorded_at:%Y-%m-%d %H:%M} 1 {self.from_currency_id} = {self.rate} {self.to_currency_id}"
+
+
+class ExchangeRateRollup(models.Model):
+    """Open/high/low/close of a pair's rate per minute, hour or day bucket"""
+
+    RESOLUTION_CHOICES = [
+        ("minute", "Minute"),
+        ("hour", "Hour"),
+        ("day", "Day"),
+    ]
+
+    from_currency = models.ForeignKey(
+        Currency, related_name="+", on_delete=models.CASCADE
+    )
+    to_currency = models.ForeignKey(
+        Currency, related_name="+", on_delete=models.CASCADE
+    )
+    resolution = models.CharField(choices=RESOLUTION_CHOICES, max_length=6)
+    bucket = models.DateTimeField()
+    open = models.DecimalField(max_digits=10, decimal_places=4)
+    high = models.DecimalField(max_digits=10, decimal_places=4)
+    low = models.DecimalField(max_digits=10, decimal_places=4)
+    close = models.DecimalField(max_digits=10, decimal_places=4)
+    samples = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # Also the index behind range queries for one pair at one resolution
+            models.UniqueConstraint(
+                fields=["from_currency", "to_currency", "resolution", "bucket"],
+                name="fx_rollup_pair_bucket_uniq",
+            )
+        ]
+
+
 class CustomerBankAccount(models.Model):
     user = models.OneToOneField("userservice.Users", on_delete=models.CASCADE)
     bank_account_number = models.CharField(max_length=20)
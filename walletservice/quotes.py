@@ -0,0 +1,109 @@
+"""
+Locked FX quotes for cross-currency wallet transfers
+
+``WalletTransfer`` prices the transfer from the in-memory rate matrix and
+stores the quote for ``settings.FX_QUOTE_TTL`` seconds in
+``settings.FX_QUOTE_CACHE``, which every web process shares because the
+validation request may land on another worker; ``WalletTransferValidation``
+settles at exactly that rate. A quote can be taken once, by the user it was
+issued to, so neither step reads rates from the database or the rate API;
+a transfer that fails after taking it releases it for another attempt.
+"""
+
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+from utils.metrics import metrics
+
+from .rates import CENTS, get_rate_matrix
+
+KEY_PREFIX = "walletservice:fx-quote:"
+
+
+class QuoteError(Exception):
+    pass
+
+
+@dataclass
+class Quote:
+    id: str
+    user_id: int
+    from_currency: str
+    to_currency: str
+    amount: Decimal
+    rate: Decimal
+    converted: Decimal
+    expires_at: float
+
+    @property
+    def expires_in(self):
+        return max(0, int(self.expires_at - time.time()))
+
+    def as_data(self):
+        return {
+            "quote_id": self.id,
+            "rate": f"{self.rate:.4f}",
+            "amount": f"{self.from_currency} {self.amount:,.2f}",
+            "recipient_amount": f"{self.to_currency} {self.converted:,.2f}",
+            "expires_in": self.expires_in,
+        }
+
+
+def _cache():
+    return caches[getattr(settings, "FX_QUOTE_CACHE", "default")]
+
+
+def ttl():
+    return getattr(settings, "FX_QUOTE_TTL", 300)
+
+
+def issue_quote(user_id, from_currency, to_currency, amount):
+    """Price ``amount`` and lock the rate; raises ``UnknownCurrency`` for unpriced pairs"""
+    matrix = get_rate_matrix()
+    amount = Decimal(amount).quantize(CENTS)
+    converted = matrix.convert(amount, from_currency, to_currency)
+    quote = Quote(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        from_currency=from_currency,
+        to_currency=to_currency,
+        amount=amount,
+        rate=matrix.rate(from_currency, to_currency),
+        converted=converted,
+        expires_at=time.time() + ttl(),
+    )
+    _cache().set(KEY_PREFIX + quote.id, asdict(quote), ttl())
+    metrics.incr("fx.quotes.issued")
+    return quote
+
+
+def peek_quote(quote_id, user_id):
+    """The user's live quote, left in place for ``take_quote``"""
+    data = _cache().get(KEY_PREFIX + str(quote_id))
+    if data is None or data["user_id"] != user_id or data["expires_at"] < time.time():
+        metrics.incr("fx.quotes.rejected")
+        raise QuoteError("Quote expired or not found. Please request a new one.")
+    return Quote(**data)
+
+
+def take_quote(quote_id, user_id):
+    """Return and consume the quote; each quote settles at most one transfer"""
+    quote = peek_quote(quote_id, user_id)
+    # Whoever deletes the key owns the quote; a concurrent second taker loses
+    if not _cache().delete(KEY_PREFIX + quote.id):
+        metrics.incr("fx.quotes.rejected")
+        raise QuoteError("Quote has already been used.")
+    metrics.incr("fx.quotes.taken")
+    return quote
+
+
+def release_quote(quote):
+    """Put back a quote taken for a transfer that did not go through"""
+    if quote.expires_in:
+        _cache().set(KEY_PREFIX + quote.id, asdict(quote), quote.expires_in)
+        metrics.incr("fx.quotes.released")
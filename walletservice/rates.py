@@ -0,0 +1,167 @@
+"""
+Process-local exchange-rate matrix
+
+``get_rate_matrix()`` returns a ``RateMatrix`` built from the ``Currency`` and
+``ExchangeRate`` tables: currency codes map to indexes into a dense square
+table of rates, so a lookup is two dict hits and two list indexes and never
+touches the database. The matrix is rebuilt when the version stamp changes;
+``update_exchange_rates`` and saves through the ORM bump it once their
+transaction commits, so no process can load the old rows under the new
+stamp. The stamp lives in ``settings.EXCHANGE_RATE_MATRIX_CACHE``, which is
+shared by the web and Celery processes, and each process notices a new
+version within ``settings.EXCHANGE_RATE_MATRIX_CHECK_INTERVAL`` seconds.
+"""
+
+import threading
+import time
+import uuid
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import serializers
+
+VERSION_KEY = "walletservice:rate-matrix:version"
+CENTS = Decimal("0.01")
+ONE = Decimal("1")
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+class UnknownCurrency(KeyError):
+    pass
+
+
+class RateMatrix:
+    def __init__(self, currencies, rates, version=None):
+        """
+        ``currencies`` maps code to name; ``rates`` is an iterable of
+        ``(from_code, to_code, rate, last_updated)``.
+        """
+        self.version = version
+        self.names = dict(currencies)
+        self.codes = sorted(self.names)
+        self.index = {code: position for position, code in enumerate(self.codes)}
+        size = len(self.codes)
+        self.rates = [[None] * size for _ in range(size)]
+        self.updated = [[None] * size for _ in range(size)]
+        for position in range(size):
+            self.rates[position][position] = ONE
+        for from_code, to_code, rate, last_updated in rates:
+            if from_code in self.index and to_code in self.index:
+                row, column = self.index[from_code], self.index[to_code]
+                self.rates[row][column] = rate
+                self.updated[row][column] = last_updated
+
+    @classmethod
+    def load(cls, version=None):
+        from walletservice.models import Currency, ExchangeRate
+
+        currencies = Currency.objects.values_list("code", "name")
+        rates = ExchangeRate.objects.values_list(
+            "from_currency__code", "to_currency__code", "rate", "last_updated"
+        )
+        return cls(currencies, rates, version)
+
+    def position(self, code):
+        try:
+            return self.index[code]
+        except KeyError:
+            raise UnknownCurrency(code) from None
+
+    def rate(self, from_code, to_code):
+        """Units of ``to_code`` per unit of ``from_code``, or ``None`` if the pair is not priced"""
+        return self.rates[self.position(from_code)][self.position(to_code)]
+
+    def last_updated(self, from_code, to_code):
+        return self.updated[self.position(from_code)][self.position(to_code)]
+
+    def quote(self, from_code, to_code):
+        """The pair in ``ExchangeRateSerializer``'s shape"""
+        rate = self.rate(from_code, to_code)
+        updated = self.last_updated(from_code, to_code)
+        return {
+            "from_currency": {"code": from_code, "name": self.names[from_code]},
+            "to_currency": {"code": to_code, "name": self.names[to_code]},
+            "rate": None if rate is None else f"{rate:.4f}",
+            "last_updated": None if updated is None else DATETIME_FIELD.to_representation(updated),
+        }
+
+    def _required_rate(self, from_code, to_code):
+        rate = self.rate(from_code, to_code)
+        if rate is None:
+            raise UnknownCurrency(f"{from_code}/{to_code}")
+        return rate
+
+    def convert(self, amount, from_code, to_code, places=CENTS):
+        return (Decimal(amount) * self._required_rate(from_code, to_code)).quantize(
+            places, ROUND_HALF_UP
+        )
+
+    def convert_many(self, amounts, from_code, to_code, places=CENTS):
+        """Convert a batch of amounts for one pair, looking the rate up once"""
+        rate = self._required_rate(from_code, to_code)
+        return [(Decimal(amount) * rate).quantize(places, ROUND_HALF_UP) for amount in amounts]
+
+    def convert_batch(self, items, places=CENTS):
+        """Convert ``(amount, from_code, to_code)`` triples, e.g. balances across wallets"""
+        return [
+            self.convert(amount, from_code, to_code, places) for amount, from_code, to_code in items
+        ]
+
+
+def _cache():
+    return caches[getattr(settings, "EXCHANGE_RATE_MATRIX_CACHE", "default")]
+
+
+def current_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+class MatrixCache:
+    def __init__(self):
+        self._matrix = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        matrix = self._matrix
+        interval = getattr(settings, "EXCHANGE_RATE_MATRIX_CHECK_INTERVAL", 5)
+        if matrix is not None and time.monotonic() - self._checked_at < interval:
+            return matrix
+        version = current_version()
+        if matrix is None or matrix.version != version:
+            with self._lock:
+                matrix = self._matrix
+                if matrix is None or matrix.version != version:
+                    matrix = RateMatrix.load(version)
+                    self._matrix = matrix
+        self._checked_at = time.monotonic()
+        return matrix
+
+    def invalidate(self):
+        """Stamp a new version so every process reloads its matrix"""
+        _cache().set(VERSION_KEY, uuid.uuid4().hex, None)
+        self._checked_at = 0.0
+
+
+rate_matrix = MatrixCache()
+
+
+def get_rate_matrix():
+    return rate_matrix.get()
+
+
+def invalidate_rate_matrix(**kwargs):
+    rate_matrix.invalidate()
+
+
+def rate_matrix_changed(**kwargs):
+    """Signal handler for rate and currency writes: stamp a new version once they commit"""
+    transaction.on_commit(invalidate_rate_matrix)
@@ -99,3 +99,12 @@ class ExchangeRateSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExchangeRate
         fields = ["from_currency", "to_currency", "rate", "last_updated"]
+
+
+class ExchangeRatePointSerializer(serializers.Serializer):
+    bucket = serializers.DateTimeField()
+    open = serializers.DecimalField(max_digits=10, decimal_places=4)
+    high = serializers.DecimalField(max_digits=10, decimal_places=4)
+    low = serializers.DecimalField(max_digits=10, decimal_places=4)
+    close = serializers.DecimalField(max_digits=10, decimal_places=4)
+    samples = serializers.IntegerField()
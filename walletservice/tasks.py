@@ -1,32 +1,73 @@
 import logging
+import time
+
 from celery import shared_task
-from .utils.fetch_new_rate import fetch_new_rate
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from utils.metrics import metrics
+
+from .history import record_rates
+from .rates import invalidate_rate_matrix
+from .utils.cross_rates import cross_rates
+from .utils.fetch_new_rate import fetch_rate_table
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
 def update_exchange_rates():
+    """
+    Refresh every ExchangeRate pair from a single base-currency rate table.
+
+    One HTTP call fetches the table, all pairs are derived from it and the
+    changed rows are written with one ``bulk_update``, then appended to the
+    rate history and its rollups (``walletservice.history``). Timing and outcome are
+    recorded under ``fx.refresh`` in ``utils.metrics``.
+    """
     from .models import ExchangeRate
 
     logger.debug("Starting update_exchange_rates task...")
-    exchange_rates = ExchangeRate.objects.all()
-
-    for exchange_rate in exchange_rates:
-        try:
-            new_rate = fetch_new_rate(
-                exchange_rate.from_currency.code, exchange_rate.to_currency.code
-            )
-            logger.debug(
-                f"Fetched new rate: {new_rate} for {exchange_rate.from_currency.code} to {exchange_rate.to_currency.code}"
-            )
-            exchange_rate.rate = new_rate
-            exchange_rate.save()
-            logger.debug(
-                f"Updated exchange rate for {exchange_rate.from_currency.code} to {exchange_rate.to_currency.code}"
-            )
-        except Exception as e:
-            logger.error(
-                f"Failed to update exchange rate for {exchange_rate.from_currency.code} to {exchange_rate.to_currency.code}. Error: {e}",
-                exc_info=True,
-            )
+    base_currency = settings.EXCHANGE_RATE_BASE_CURRENCY
+    started = time.perf_counter()
+    try:
+        with metrics.time("fx.refresh.fetch"):
+            table = fetch_rate_table(base_currency)
+    except Exception as e:
+        metrics.incr("fx.refresh.failures")
+        metrics.observe("fx.refresh", time.perf_counter() - started, error=True)
+        logger.error(f"Failed to fetch the {base_currency} rate table. Error: {e}", exc_info=True)
+        return {"updated": 0, "missing": [], "error": str(e)}
+
+    exchange_rates = list(
+        ExchangeRate.objects.select_related("from_currency", "to_currency")
+    )
+    pairs = [(rate.from_currency.code, rate.to_currency.code) for rate in exchange_rates]
+    rates, missing = cross_rates(table, pairs)
+
+    now = timezone.now()
+    changed = []
+    for exchange_rate, pair in zip(exchange_rates, pairs):
+        if pair in rates:
+            exchange_rate.rate = rates[pair]
+            # bulk_update bypasses auto_now
+            exchange_rate.last_updated = now
+            changed.append(exchange_rate)
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_update(changed, ["rate", "last_updated"], batch_size=500)
+        record_rates(
+            {(rate.from_currency_id, rate.to_currency_id): rate.rate for rate in changed}, now
+        )
+    # bulk_update sends no signals, so stamp a new matrix version explicitly
+    invalidate_rate_matrix()
+
+    elapsed = time.perf_counter() - started
+    metrics.observe("fx.refresh", elapsed)
+    metrics.set_gauge("fx.refresh.pairs_updated", len(changed))
+    metrics.set_gauge("fx.refresh.pairs_missing", len(missing))
+    if missing:
+        metrics.incr("fx.refresh.missing_pairs", len(missing))
+        logger.warning(f"No {base_currency} rate for {len(missing)} pair(s): {missing}")
+    logger.info(f"Updated {len(changed)} exchange rates in {elapsed * 1000:.1f}ms")
+    return {"updated": len(changed), "missing": [f"{a}/{b}" for a, b in missing]}
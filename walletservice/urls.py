@@ -10,6 +10,7 @@ from .views import (
     WalletList,
     CurrencyListView,
     ExchangeRateView,
+    ExchangeRateHistoryView,
     WalletUpdateView,
 )
 
@@ -19,6 +20,11 @@ urlpatterns = [
     path("wallets/<int:pk>/fund/", FundWalletView.as_view(), name="fund-wallet"),
     path("currency-list/", CurrencyListView.as_view(), name="currency-list"),
     path("exchange-rate/", ExchangeRateView.as_view(), name="get-exchange-rate"),
+    path(
+        "exchange-rate/history/",
+        ExchangeRateHistoryView.as_view(),
+        name="exchange-rate-history",
+    ),
     path(
         "wallet-update/<int:user_id>/wallet/",
         WalletUpdateView.as_view(),
@@ -0,0 +1,29 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+# ExchangeRate.rate is DecimalField(max_digits=10, decimal_places=4)
+RATE_PLACES = Decimal("0.0001")
+RATE_MAX = Decimal("999999.9999")
+
+
+def cross_rates(table, pairs):
+    """
+    Derive ``from -> to`` rates for ``pairs`` from one base-currency table.
+
+    ``table`` maps each code to units per one unit of the base currency, so
+    ``rate(from, to) = table[to] / table[from]``. Each currency's reciprocal
+    is computed once and reused across all pairs it appears in. Returns
+    ``(rates, missing)``: rates keyed by ``(from, to)`` rounded to the column
+    precision, and the pairs that could not be priced.
+    """
+    inverse = {code: 1 / value for code, value in table.items() if value}
+    rates, missing = {}, []
+    for from_code, to_code in pairs:
+        if from_code not in inverse or to_code not in table:
+            missing.append((from_code, to_code))
+            continue
+        rate = (table[to_code] * inverse[from_code]).quantize(RATE_PLACES, rounding=ROUND_HALF_EVEN)
+        if rate > RATE_MAX:
+            missing.append((from_code, to_code))
+            continue
+        rates[(from_code, to_code)] = rate
+    return rates, missing
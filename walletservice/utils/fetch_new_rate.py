@@ -3,6 +3,8 @@ import logging
 from django.conf import settings
 from decimal import Decimal, InvalidOperation
 
+from utils.http import gateway
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,7 +16,7 @@ def fetch_new_rate(from_currency, to_currency):
 
     logger.info(f"Fetching rate from {url}")
     try:
-        response = requests.get(url)
+        response = gateway.get(url, endpoint="exchangerate.pair")
         logger.info(f"Received response status: {response.status_code}")
     except requests.RequestException as e:
         logger.error(f"Request failed for URL {url}. Error: {e}")
@@ -46,3 +48,33 @@ def fetch_new_rate(from_currency, to_currency):
             f"Failed to fetch exchange rate: {response.status_code} {response.text}"
         )
         raise Exception("Failed to fetch exchange rate due to non-200 response")
+
+
+def fetch_rate_table(base_currency):
+    """
+    Fetch the rates of every currency against ``base_currency`` in one call.
+
+    Returns ``{code: Decimal}`` with units of each currency per one unit of
+    ``base_currency``.
+    """
+    api_key = settings.EXCHANGE_RATE_API_KEY
+    url = f"{settings.EXCHANGE_RATE_API_URL}/{api_key}/latest/{base_currency}"
+    logger.info(f"Fetching {base_currency} rate table")
+    try:
+        response = gateway.get(url, endpoint="exchangerate.latest")
+    except requests.RequestException as e:
+        logger.error(f"Rate table request for {base_currency} failed. Error: {e}")
+        raise Exception("Failed to fetch exchange rates due to request error") from e
+
+    if response.status_code != 200:
+        logger.error(
+            f"Failed to fetch rate table: {response.status_code} {response.text}"
+        )
+        raise Exception("Failed to fetch exchange rates due to non-200 response")
+    try:
+        data = response.json()
+        rates = data["conversion_rates"]
+        return {code: Decimal(str(rate)) for code, rate in rates.items()}
+    except (ValueError, KeyError, TypeError, InvalidOperation) as e:
+        logger.error(f"Malformed rate table for {base_currency}. Error: {e}")
+        raise Exception("Failed to decode exchange rate table") from e
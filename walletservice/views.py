@@ -13,8 +13,11 @@ from userservice.models import Users
 from utils.helpers import *
 from django.conf import settings
 from django.utils import timezone
+from utils.helpers import parse_bound
 
 from .models import CustomerBankAccount, Wallet
+from .history import RESOLUTIONS, rate_series
+from .rates import UnknownCurrency, get_rate_matrix
 from .serializers import *
 from .serializers import FundWalletSerializer, WalletSerializer
 
@@ -193,28 +196,76 @@ class ExchangeRateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        matrix = get_rate_matrix()
         try:
-            from_currency = Currency.objects.get(code=from_currency_code)
-            to_currency = Currency.objects.get(code=to_currency_code)
-            exchange_rate = ExchangeRate.objects.get(
-                from_currency=from_currency, to_currency=to_currency
-            )
-        except Currency.DoesNotExist:
+            data = matrix.quote(from_currency_code, to_currency_code)
+        except UnknownCurrency:
             return Response(
                 {"status": "error", "response": "Invalid currency code"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        except ExchangeRate.DoesNotExist:
-            exchange_rate = ExchangeRate(
-                from_currency=from_currency, to_currency=to_currency
-            )
 
-        serializer = ExchangeRateSerializer(exchange_rate)
         return Response(
             {
                 "status": "success",
                 "response": "Exchange rate retrieved successfully",
-                "data": serializer.data,
+                "data": data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ExchangeRateHistoryView(APIView):
+    """
+    Rates for one pair over a time range, as open/high/low/close buckets.
+
+    Query params: ``from``, ``to``, ``start`` and ``end`` (ISO date or
+    datetime; ``end`` defaults to now and ``start`` to 30 days before it)
+    and an optional ``resolution`` (minute, hour or day). Without a
+    resolution the finest one giving at most 1000 points is used.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    max_points = 10000
+
+    def get(self, request, *args, **kwargs):
+        from_currency_code = request.query_params.get("from")
+        to_currency_code = request.query_params.get("to")
+        if not from_currency_code or not to_currency_code:
+            return Response(
+                {
+                    "status": "error",
+                    "response": "Both 'from' and 'to' currency codes are required",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            end = parse_bound(request.query_params.get("end"), end=True) or timezone.now()
+            start = parse_bound(request.query_params.get("start")) or end - timezone.timedelta(days=30)
+            resolution = request.query_params.get("resolution")
+            if start >= end:
+                raise ValueError("'start' must be before 'end'")
+            if resolution in RESOLUTIONS and (end - start) / RESOLUTIONS[resolution] > self.max_points:
+                raise ValueError(f"Range too long for {resolution} resolution")
+            resolution, points = rate_series(from_currency_code, to_currency_code, start, end, resolution)
+        except ValueError as e:
+            return Response(
+                {"status": "error", "response": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "status": "success",
+                "response": "Exchange rate history retrieved successfully",
+                "data": {
+                    "from": from_currency_code,
+                    "to": to_currency_code,
+                    "resolution": resolution,
+                    "points": ExchangeRatePointSerializer(points, many=True).data,
+                },
             },
             status=status.HTTP_200_OK,
         )